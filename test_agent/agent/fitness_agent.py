@@ -3,10 +3,30 @@ FitCoach AI - Personal Fitness & Nutrition Assistant
 Main Agent Core
 """
 import os
+import re
 import json
+import inspect
 from openai import OpenAI
 from typing import Dict, List, Optional
 from config.tools_config import get_all_tools, get_tool_function
+from tools.body_analysis_tools import prefetch_body_fat
+from tools.fridge_tools import prefetch_fridge_analysis
+from tools.nutrition_tools import prefetch_meal_photo
+from utils import prefetch
+from utils.image_prep import cached_thumbnail
+from utils.vision import image_content_part
+
+
+# Cheap intent guess for uploaded images: first matching tool is prefetched
+# Whole words only (stems spell out their endings), so "logic" or "cookie" start nothing
+VISION_INTENTS = [
+    ("estimate_body_fat", r"\b(body ?fat|bodyfat|body-fat|% ?fat|gr[aă]sime\w*|physique|how lean|shredded)\b"),
+    ("analyze_fridge", r"\b(fridge|frigider\w*|cook(?:s|ed|ing)?|g[aă]tesc|ingredients?|ingrediente|what can i make|recipes?|re[tț]et\w*)\b"),
+    ("track_calories", r"\b(calori\w*|kcal|macros?|ate|eaten|m[aâ]ncat|log(?:ged|ging)?|meals?|plate|lunch|dinner|breakfast|pr[aâ]nz\w*|cin[aă]|mic dejun)\b")
+]
+
+# Longest side of images attached to chat turns ("low" detail is read at 512 px)
+CHAT_IMAGE_MAX_SIDE = 512
 
 
 class FitnessAgent:
@@ -33,6 +53,8 @@ class FitnessAgent:
         self.conversation_history = []
         self.user_profile = {}
         self.tools = self._initialize_tools()
+        # Resolution of images attached to chat turns (vision tools use their own)
+        self.image_detail = "low"
         
     def _initialize_tools(self) -> List[Dict]:
         """
@@ -44,12 +66,14 @@ class FitnessAgent:
         # Get all tool definitions from config
         return get_all_tools()
     
-    def chat(self, user_message: str) -> str:
+    def chat(self, user_message: str, image_paths: Optional[List[str]] = None) -> str:
         """
         Main chat interface for the agent
         
         Args:
             user_message: User's input message
+            image_paths: Optional uploaded images, sent to the model as image
+                content parts so simple image questions need no vision tool
             
         Returns:
             Agent's response
@@ -57,52 +81,65 @@ class FitnessAgent:
         # Add user message to history
         self.conversation_history.append({
             "role": "user",
-            "content": user_message
+            "content": self._user_content(user_message, image_paths)
         })
+        user_index = len(self.conversation_history) - 1
         
-        # Create system message for the agent
-        system_message = self._create_system_message()
-        
-        # Prepare messages for API call
-        messages = [system_message] + self.conversation_history
+        # Start the likely vision tool alongside the first completion
+        prefetch_keys = self._start_vision_prefetch(user_message, image_paths) if image_paths else []
         
-        # Call OpenAI API with function calling
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            tools=self.tools if self.tools else None,
-            tool_choice="auto" if self.tools else None,
-            temperature=0.7  # Balanced creativity
-        )
-        
-        # Process response
-        assistant_message = response.choices[0].message
-        
-        # Handle function calls if present
-        if assistant_message.tool_calls:
-            # Process tool calls
-            tool_responses = self._process_tool_calls(assistant_message.tool_calls)
-            
-            # Add assistant message and tool responses to history
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": assistant_message.content,
-                "tool_calls": assistant_message.tool_calls
-            })
+        try:
+            # Create system message for the agent
+            system_message = self._create_system_message()
             
-            for tool_response in tool_responses:
-                self.conversation_history.append(tool_response)
+            # Prepare messages for API call
+            messages = [system_message] + self.conversation_history
             
-            # Get final response after tool execution
-            final_response = self.client.chat.completions.create(
+            # Call OpenAI API with function calling
+            response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[system_message] + self.conversation_history,
-                temperature=0.7
+                messages=messages,
+                tools=self.tools if self.tools else None,
+                tool_choice="auto" if self.tools else None,
+                temperature=0.7  # Balanced creativity
             )
             
-            final_message = final_response.choices[0].message.content
-        else:
-            final_message = assistant_message.content
+            # Process response
+            assistant_message = response.choices[0].message
+            
+            # Handle function calls if present
+            if assistant_message.tool_calls:
+                # Process tool calls
+                tool_responses = self._process_tool_calls(assistant_message.tool_calls)
+                
+                # Add assistant message and tool responses to history
+                self.conversation_history.append({
+                    "role": "assistant",
+                    "content": assistant_message.content,
+                    "tool_calls": assistant_message.tool_calls
+                })
+                
+                for tool_response in tool_responses:
+                    self.conversation_history.append(tool_response)
+                
+                # Get final response after tool execution
+                final_response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[system_message] + self.conversation_history,
+                    temperature=0.7
+                )
+                
+                final_message = final_response.choices[0].message.content
+            else:
+                final_message = assistant_message.content
+        
+        finally:
+            # Keep only the text (with image paths) in history so the images are not resent
+            # every turn, even when this turn failed
+            if image_paths:
+                self.conversation_history[user_index]["content"] = user_message
+            # Speculation the model did not use is dropped
+            prefetch.discard(*prefetch_keys)
         
         # Add assistant response to history
         self.conversation_history.append({
@@ -112,6 +149,50 @@ class FitnessAgent:
         
         return final_message
     
+    def _start_vision_prefetch(self, user_message: str, image_paths: List[str]) -> List:
+        """
+        Guess which vision tool the model will call and start it in the background
+        
+        Returns:
+            Prefetch keys to discard at the end of the turn
+        """
+        text = re.sub(r"\[[^\]]*\]", " ", user_message).lower()
+        intent = next((tool for tool, pattern in VISION_INTENTS if re.search(pattern, text)), None)
+        if intent is None:
+            return []
+        
+        print(f"🔮 [AGENT] Intent guess for uploaded image(s): {intent}")
+        try:
+            if intent == "estimate_body_fat":
+                key = prefetch_body_fat(image_paths[0])
+            elif intent == "analyze_fridge":
+                key = prefetch_fridge_analysis(image_paths, self.user_id)
+            else:
+                key = prefetch_meal_photo(image_paths[0])
+        except Exception as e:
+            print(f"⚠️ [AGENT] Prefetch not started: {str(e)}")
+            return []
+        return [key] if key else []
+    
+    def _user_content(self, user_message: str, image_paths: Optional[List[str]]):
+        """
+        Message content for a user turn
+        
+        Returns:
+            The plain text, or a list of content parts with the images attached
+        """
+        if not image_paths:
+            return user_message
+        
+        parts = [{"type": "text", "text": user_message}]
+        for path in image_paths:
+            try:
+                # A small cached JPEG is all a low-detail image part uses
+                parts.append(image_content_part(cached_thumbnail(path, CHAT_IMAGE_MAX_SIDE), detail=self.image_detail))
+            except OSError as e:
+                print(f"⚠️ [AGENT] Could not attach image {path}: {str(e)}")
+        return parts
+    
     def _create_system_message(self) -> Dict:
         """
         Create the system message that defines the agent's behavior
@@ -154,6 +235,21 @@ FORMATTING RULES:
 - For lists, use simple text with emojis or numbers
 - When using tools that return JSON data (like analyze_fridge), include the raw JSON data at the end of your response between [DATA] and [/DATA] tags for UI parsing
 
+DATA RULES:
+- Tracked meals are saved automatically; use get_nutrition_summary for today's totals and remaining calories instead of adding up earlier meals yourself
+- Omit remaining_calories in fridge tools when the user has a saved calorie target
+- For a photo of a meal, call track_calories with image_path directly (one call estimates foods, portions and macros)
+- Uploaded images are attached to the user's message and you can see them. Answer simple questions about an image yourself; call a vision tool (track_calories with image_path, analyze_fridge, estimate_body_fat, visualize_transformation) only when structured numbers are needed or the result should be logged or saved
+- Several fridge photos (shelves, door, freezer) go into ONE analyze_fridge call with image_paths, never one call per photo
+- Fridge photos are saved to the user's inventory; answer "what's in my fridge / what's expiring" with check_fridge_inventory instead of asking for a new photo
+- Measurements are saved by track_measurements; answer measurement progress questions with get_measurement_trends instead of earlier messages
+- When waist, neck and height (and hips for women) are known, call estimate_body_fat with the measurements and gender instead of a photo; use the photo only if measurements are missing or the user asks for photo analysis
+- Body fat over several progress photos (a timeline) is ONE estimate_body_fat_series call with all image_paths and their dates, never one estimate_body_fat call per photo
+- For a workout program call generate_workout_plan and present the plan it returns; do not write your own exercise list
+- Workout history is stored; answer strength/volume progress questions with analyze_workout_progress (no workout_history needed) and pass workout_history only to log sessions the user describes (replace_logged=true only when they correct sets already logged)
+- For personal bests ("what's my best bench?") call get_personal_records instead of analyzing the whole history
+- For "what should I lift next time" call suggest_progressive_overload and use its weights and reps as given
+
 Current user profile: """ + json.dumps(self.user_profile, indent=2)
         }
     
@@ -181,6 +277,10 @@ Current user profile: """ + json.dumps(self.user_profile, indent=2)
             
             if function_to_call:
                 try:
+                    # Per-user stores are keyed by the profile, never by the model
+                    if "user_id" in inspect.signature(function_to_call).parameters:
+                        function_args["user_id"] = self.user_id
+                    
                     # Call the function with the provided arguments
                     result = function_to_call(**function_args)
                     
@@ -214,6 +314,11 @@ Current user profile: """ + json.dumps(self.user_profile, indent=2)
         
         return tool_responses
     
+    @property
+    def user_id(self) -> str:
+        """Identifier for per-user data (ledger, inventory, history)"""
+        return str(self.user_profile.get("user_id") or self.user_profile.get("name") or "default")
+    
     def update_user_profile(self, profile_data: Dict):
         """
         Update user profile information
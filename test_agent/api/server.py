@@ -7,13 +7,14 @@ import sys
 from pathlib import Path
 from fastapi import FastAPI, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import List
-import shutil
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 from agent.fitness_agent import FitnessAgent
+from utils.uploads import THUMB_DIR, THUMB_URL_PREFIX, UnsupportedUpload, UploadTooLarge, collect_garbage, release_user, store_upload
 from dotenv import load_dotenv
 
 # Load environment
@@ -30,6 +31,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Thumbnails and before/after composites produced by the vision tools, for display in the UI
+THUMB_DIR.mkdir(parents=True, exist_ok=True)
+app.mount(THUMB_URL_PREFIX, StaticFiles(directory=str(THUMB_DIR)), name="thumbs")
+
 # Global agent instance
 agent = None
 
@@ -42,6 +47,12 @@ async def startup_event():
         print("✅ Agent initialized successfully")
     except Exception as e:
         print(f"❌ Failed to initialize agent: {e}")
+    
+    # Drop upload blobs no conversation references any more
+    try:
+        collect_garbage()
+    except Exception as e:
+        print(f"⚠️ Upload cleanup skipped: {e}")
 
 class ChatResponse(BaseModel):
     response: str
@@ -67,30 +78,31 @@ async def chat(
         # Handle multiple images if provided
         image_paths = []
         if images:
-            # Save images temporarily
-            upload_dir = Path("data/uploads")
-            upload_dir.mkdir(parents=True, exist_ok=True)
-            
-            for idx, image in enumerate(images):
-                image_path = upload_dir / f"{idx}_{image.filename}"
-                with image_path.open("wb") as buffer:
-                    shutil.copyfileobj(image.file, buffer)
-                image_paths.append(str(image_path))
+            # Stream into the content-addressed store (hashed while writing, deduplicated)
+            for image in images:
+                stored = await store_upload(image, user_id=agent.user_id)
+                if stored["path"] not in image_paths:
+                    image_paths.append(stored["path"])
             
             # Add image references to message
             if len(image_paths) == 1:
                 message = f"{message}\n\n[Image uploaded: {image_paths[0]}]"
             elif len(image_paths) == 2:
-                message = f"{message}\n\n[2 images uploaded for transformation comparison: before={image_paths[0]}, after={image_paths[1]}]"
+                message = f"{message}\n\n[2 images uploaded (before/after for a transformation comparison, or several photos of one fridge): first={image_paths[0]}, second={image_paths[1]}]"
             else:
                 images_str = ", ".join(image_paths)
                 message = f"{message}\n\n[{len(image_paths)} images uploaded: {images_str}]"
         
-        # Get agent response
-        response = agent.chat(message)
+        # Get agent response (images are attached to the turn, paths stay in the text for tools)
+        response = agent.chat(message, image_paths=image_paths)
         
         return ChatResponse(response=response, success=True)
         
+    except (UploadTooLarge, UnsupportedUpload) as e:
+        return ChatResponse(
+            response=f"❌ Upload rejected: {str(e)}",
+            success=False
+        )
     except Exception as e:
         return ChatResponse(
             response=f"❌ Error: {str(e)}",
@@ -103,6 +115,8 @@ async def reset_chat():
     global agent
     if agent:
         agent.reset_conversation()
+        # Images of the old conversation are deleted at the next upload cleanup
+        release_user(agent.user_id)
         return {"success": True, "message": "Chat reset"}
     return {"success": False, "message": "Agent not initialized"}
 
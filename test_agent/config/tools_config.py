@@ -5,8 +5,12 @@ Consolidates all tool definitions from different modules
 from tools.nutrition_tools import (
     NUTRITION_TOOLS,
     calculate_tdee,
+    log_weight,
     generate_meal_plan,
-    track_calories
+    track_calories,
+    set_calorie_target,
+    get_nutrition_summary,
+    check_fridge_inventory
 )
 from tools.fridge_tools import (
     FRIDGE_TOOLS,
@@ -16,13 +20,17 @@ from tools.fridge_tools import (
 from tools.workout_tools import (
     WORKOUT_TOOLS,
     generate_workout_plan,
-    analyze_workout_progress
+    analyze_workout_progress,
+    get_personal_records,
+    suggest_progressive_overload
 )
 from tools.body_analysis_tools import (
     BODY_ANALYSIS_TOOLS,
     calculate_bmi,
     estimate_body_fat,
+    estimate_body_fat_series,
     track_measurements,
+    get_measurement_trends,
     visualize_transformation
 )
 from tools.route_tools import (
@@ -59,8 +67,12 @@ ALL_TOOLS = (
 TOOL_FUNCTIONS = {
     # Nutrition tools
     "calculate_tdee": calculate_tdee,
+    "log_weight": log_weight,
     "generate_meal_plan": generate_meal_plan,
     "track_calories": track_calories,
+    "set_calorie_target": set_calorie_target,
+    "get_nutrition_summary": get_nutrition_summary,
+    "check_fridge_inventory": check_fridge_inventory,
     
     # Fridge tools
     "analyze_fridge": analyze_fridge,
@@ -69,11 +81,15 @@ TOOL_FUNCTIONS = {
     # Workout tools
     "generate_workout_plan": generate_workout_plan,
     "analyze_workout_progress": analyze_workout_progress,
+    "get_personal_records": get_personal_records,
+    "suggest_progressive_overload": suggest_progressive_overload,
     
     # Body analysis tools
     "calculate_bmi": calculate_bmi,
     "estimate_body_fat": estimate_body_fat,
+    "estimate_body_fat_series": estimate_body_fat_series,
     "track_measurements": track_measurements,
+    "get_measurement_trends": get_measurement_trends,
     "visualize_transformation": visualize_transformation,
     
     # Route tools
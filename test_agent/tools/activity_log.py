@@ -0,0 +1,130 @@
+"""
+Activity Log for FitCoach AI
+Endurance activities synced from Strava, one row per activity
+
+Rows are keyed by the source's activity id and carry a digest of their
+fields, so a sync that fetches an activity again only writes it when it
+was edited upstream.
+"""
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+
+from utils.database import get_connection
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    user_id TEXT NOT NULL,
+    activity_id INTEGER NOT NULL,
+    start_epoch INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    sport TEXT NOT NULL,
+    name TEXT,
+    distance_m REAL NOT NULL,
+    moving_time_s INTEGER NOT NULL,
+    elevation_gain_m REAL,
+    average_heartrate REAL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (user_id, activity_id)
+) WITHOUT ROWID;
+"""
+
+_COLUMNS = ["activity_id", "start_epoch", "day", "sport", "name", "distance_m", "moving_time_s",
+            "elevation_gain_m", "average_heartrate"]
+
+
+def from_strava(activity: Dict) -> Dict:
+    """Activity row from a Strava SummaryActivity"""
+    started = datetime.fromisoformat(activity["start_date"].replace("Z", "+00:00"))
+    local = activity.get("start_date_local") or activity["start_date"]
+    return {
+        "activity_id": int(activity["id"]),
+        "start_epoch": int(started.timestamp()),
+        "day": date.fromisoformat(local[:10]).toordinal(),
+        "sport": activity.get("sport_type") or activity.get("type") or "Workout",
+        "name": activity.get("name"),
+        "distance_m": float(activity.get("distance") or 0),
+        "moving_time_s": int(activity.get("moving_time") or 0),
+        "elevation_gain_m": activity.get("total_elevation_gain"),
+        "average_heartrate": activity.get("average_heartrate")
+    }
+
+
+def _digest(row: Dict) -> str:
+    return hashlib.blake2b(json.dumps([row[c] for c in _COLUMNS]).encode(), digest_size=12).hexdigest()
+
+
+def save_activities(user_id: str, rows: List[Dict]) -> Tuple[int, int, int]:
+    """
+    Upsert activities, writing only new or changed ones
+
+    Returns:
+        (new, updated, unchanged) counts
+    """
+    if not rows:
+        return 0, 0, 0
+    conn = get_connection(_SCHEMA)
+    ids = [row["activity_id"] for row in rows]
+    stored = dict(conn.execute(
+        f"SELECT activity_id, digest FROM activities WHERE user_id = ? AND activity_id IN ({', '.join('?' for _ in ids)})",
+        [user_id, *ids]
+    ).fetchall())
+
+    writes, new, updated = [], 0, 0
+    for row in rows:
+        digest = _digest(row)
+        previous = stored.get(row["activity_id"])
+        if previous == digest:
+            continue
+        new += previous is None
+        updated += previous is not None
+        writes.append((user_id, *(row[c] for c in _COLUMNS), digest))
+
+    with conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO activities (user_id, {', '.join(_COLUMNS)}, digest) "
+            f"VALUES (?, {', '.join('?' for _ in _COLUMNS)}, ?)",
+            writes
+        )
+    return new, updated, len(rows) - len(writes)
+
+
+def activity_totals(user_id: str, since_day: int) -> Dict[str, Dict]:
+    """Count, distance (km) and moving time (h) per sport since a day"""
+    rows = get_connection(_SCHEMA).execute(
+        "SELECT sport, COUNT(*), SUM(distance_m), SUM(moving_time_s) FROM activities "
+        "WHERE user_id = ? AND day >= ? GROUP BY sport ORDER BY SUM(moving_time_s) DESC",
+        (user_id, since_day)
+    ).fetchall()
+    return {
+        sport: {"activities": count, "distance_km": round(distance / 1000, 1), "moving_hours": round(seconds / 3600, 1)}
+        for sport, count, distance, seconds in rows
+    }
+
+
+def recent_activities(user_id: str, limit: int = 10) -> List[Dict]:
+    """Latest activities, newest first"""
+    rows = get_connection(_SCHEMA).execute(
+        "SELECT day, sport, name, distance_m, moving_time_s, average_heartrate FROM activities "
+        "WHERE user_id = ? ORDER BY start_epoch DESC LIMIT ?",
+        (user_id, limit)
+    ).fetchall()
+    return [
+        {
+            "date": date.fromordinal(row["day"]).isoformat(),
+            "sport": row["sport"],
+            "name": row["name"],
+            "distance_km": round(row["distance_m"] / 1000, 2),
+            "moving_minutes": round(row["moving_time_s"] / 60),
+            "average_heartrate": row["average_heartrate"]
+        }
+        for row in rows
+    ]
+
+
+def activity_count(user_id: str) -> int:
+    return get_connection(_SCHEMA).execute(
+        "SELECT COUNT(*) FROM activities WHERE user_id = ?", (user_id,)
+    ).fetchone()[0]
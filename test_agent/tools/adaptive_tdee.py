@@ -0,0 +1,205 @@
+"""
+Adaptive TDEE Estimator for FitCoach AI
+Learns real energy expenditure from logged intake and weigh-ins
+
+Each user has one fixed-size state row holding a two-variable Kalman filter
+over (weight trend, expenditure). When enough intake was logged since the
+previous weigh-in, the trend is predicted from the energy balance
+    trend change = (average intake - expenditure) * days / 7700 kcal/kg
+and the scale reading corrects both variables through their covariance.
+Meals only add to a running intake sum, so no history is ever replayed.
+"""
+from datetime import date
+from typing import Dict, Optional
+
+from utils.database import get_connection
+
+
+KCAL_PER_KG = 7700
+
+# Weight trend filter (kg^2): day-to-day drift of true weight vs. scale noise
+_WEIGHT_PROCESS_VAR_PER_DAY = 0.01
+_WEIGHT_MEASUREMENT_VAR = 0.25
+
+# Expenditure filter (kcal^2): prior spread, drift per day, intake logging error
+_TDEE_PRIOR_VAR = 300.0 ** 2
+_TDEE_PROCESS_VAR_PER_DAY = 15.0 ** 2
+_INTAKE_LOGGING_VAR = 150.0 ** 2
+_TDEE_UNSEEDED_VAR = 600.0 ** 2
+
+# Share of days between weigh-ins that must have logged meals to trust the average
+_MIN_LOGGED_DAY_SHARE = 0.6
+
+# Plausible expenditure range - observations outside are clamped
+_TDEE_BOUNDS = (800.0, 6000.0)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS adaptive_tdee_state (
+    user_id TEXT PRIMARY KEY,
+    weight_trend REAL,
+    weight_var REAL,
+    last_weigh_day TEXT,
+    tdee REAL,
+    tdee_var REAL,
+    cross_var REAL NOT NULL DEFAULT 0,
+    tdee_updates INTEGER NOT NULL DEFAULT 0,
+    pending_intake REAL NOT NULL DEFAULT 0,
+    pending_logged_days INTEGER NOT NULL DEFAULT 0,
+    last_intake_day TEXT
+);
+"""
+
+
+def _load_state(conn, user_id: str) -> Dict:
+    """Fetch a user's state row, or a blank state"""
+    row = conn.execute("SELECT * FROM adaptive_tdee_state WHERE user_id = ?", (user_id,)).fetchone()
+    if row:
+        return dict(row)
+    return {
+        "user_id": user_id, "weight_trend": None, "weight_var": None, "last_weigh_day": None,
+        "tdee": None, "tdee_var": None, "cross_var": 0.0, "tdee_updates": 0,
+        "pending_intake": 0.0, "pending_logged_days": 0, "last_intake_day": None
+    }
+
+
+def _save_state(conn, state: Dict) -> None:
+    """Write the full state row back"""
+    columns = list(state)
+    conn.execute(
+        f"INSERT OR REPLACE INTO adaptive_tdee_state ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})",
+        [state[c] for c in columns]
+    )
+
+
+def record_intake(user_id: str, calories: float, day: Optional[str] = None) -> None:
+    """Add one tracked meal to the intake accumulator"""
+    day = day or date.today().isoformat()
+    conn = get_connection(_SCHEMA)
+    with conn:
+        state = _load_state(conn, user_id)
+        state["pending_intake"] += calories
+        if state["last_intake_day"] != day:
+            state["pending_logged_days"] += 1
+            state["last_intake_day"] = day
+        _save_state(conn, state)
+
+
+def seed_prior(user_id: str, formula_tdee: float) -> None:
+    """Use a formula TDEE as the starting estimate if nothing was learned yet"""
+    conn = get_connection(_SCHEMA)
+    with conn:
+        state = _load_state(conn, user_id)
+        if state["tdee"] is None:
+            state["tdee"] = float(formula_tdee)
+            state["tdee_var"] = _TDEE_PRIOR_VAR
+            state["cross_var"] = 0.0
+            _save_state(conn, state)
+
+
+def record_weight(user_id: str, weight: float, day: Optional[str] = None) -> Dict:
+    """
+    Apply one weigh-in to the joint weight-trend / TDEE filter
+
+    Returns:
+        Current estimate (see get_estimate)
+    """
+    day = day or date.today().isoformat()
+    conn = get_connection(_SCHEMA)
+    with conn:
+        state = _load_state(conn, user_id)
+
+        if state["weight_trend"] is None:
+            state["weight_trend"] = float(weight)
+            state["weight_var"] = _WEIGHT_MEASUREMENT_VAR
+            state["last_weigh_day"] = day
+            _reset_interval(state)
+            _save_state(conn, state)
+            return _estimate_from_state(state)
+
+        days = max((date.fromisoformat(day) - date.fromisoformat(state["last_weigh_day"])).days, 0)
+        logged = state["pending_logged_days"]
+        intake_known = days > 0 and logged > 0 and logged >= _MIN_LOGGED_DAY_SHARE * days
+
+        trend, trend_var = state["weight_trend"], state["weight_var"]
+        tdee, tdee_var, cross_var = state["tdee"], state["tdee_var"], state["cross_var"]
+
+        if intake_known:
+            average_intake = state["pending_intake"] / logged
+            if tdee is None:
+                # No formula prior: start from intake with a wide spread
+                tdee, tdee_var, cross_var = average_intake, _TDEE_UNSEEDED_VAR, 0.0
+            # Predict: trend moves by the energy balance, TDEE drifts slowly
+            k = days / KCAL_PER_KG
+            trend += (average_intake - tdee) * k
+            trend_var = (trend_var - 2 * k * cross_var + k * k * tdee_var
+                         + _WEIGHT_PROCESS_VAR_PER_DAY * days + k * k * _INTAKE_LOGGING_VAR)
+            cross_var = cross_var - k * tdee_var
+            tdee_var += _TDEE_PROCESS_VAR_PER_DAY * days
+        else:
+            trend_var += _WEIGHT_PROCESS_VAR_PER_DAY * days
+            if tdee is not None:
+                tdee_var += _TDEE_PROCESS_VAR_PER_DAY * days
+
+        # Correct with the scale reading
+        innovation_var = trend_var + _WEIGHT_MEASUREMENT_VAR
+        innovation = weight - trend
+        trend_gain = trend_var / innovation_var
+        trend += trend_gain * innovation
+        if tdee is not None:
+            tdee_gain = cross_var / innovation_var
+            tdee = min(max(tdee + tdee_gain * innovation, _TDEE_BOUNDS[0]), _TDEE_BOUNDS[1])
+            tdee_var -= tdee_gain * cross_var
+            cross_var -= trend_gain * cross_var
+        trend_var -= trend_gain * trend_var
+
+        state.update(weight_trend=trend, weight_var=trend_var,
+                     tdee=tdee, tdee_var=tdee_var, cross_var=cross_var)
+        if intake_known:
+            state["tdee_updates"] += 1
+
+        if days == 0:
+            # Same-day (or out-of-order) weigh-in: refine the trend, keep the interval open
+            _save_state(conn, state)
+            return _estimate_from_state(state)
+
+        state["last_weigh_day"] = day
+        _reset_interval(state)
+        _save_state(conn, state)
+        return _estimate_from_state(state)
+
+
+def _reset_interval(state: Dict) -> None:
+    """Start a new intake interval after a weigh-in"""
+    state["pending_intake"] = 0.0
+    state["pending_logged_days"] = 0
+    state["last_intake_day"] = None
+
+
+def _estimate_from_state(state: Dict) -> Dict:
+    """Format a state row as an estimate"""
+    tdee_sd = state["tdee_var"] ** 0.5 if state["tdee_var"] is not None else None
+    if tdee_sd is None:
+        confidence = "none"
+    elif state["tdee_updates"] == 0 or tdee_sd >= 250:
+        confidence = "low"
+    elif tdee_sd >= 120:
+        confidence = "medium"
+    else:
+        confidence = "high"
+
+    return {
+        "adaptive_tdee": round(state["tdee"]) if state["tdee"] is not None else None,
+        "tdee_uncertainty": round(tdee_sd) if tdee_sd is not None else None,
+        "confidence": confidence,
+        "data_updates": state["tdee_updates"],
+        "weight_trend_kg": round(state["weight_trend"], 2) if state["weight_trend"] is not None else None,
+        "last_weigh_in": state["last_weigh_day"],
+        "days_logged_since_weigh_in": state["pending_logged_days"]
+    }
+
+
+def get_estimate(user_id: str) -> Dict:
+    """Current adaptive estimate for a user (single-row read)"""
+    conn = get_connection(_SCHEMA)
+    return _estimate_from_state(_load_state(conn, user_id))
@@ -3,23 +3,284 @@ Body Analysis Tools for FitCoach AI
 Handles body composition analysis and measurements
 """
 import os
-import base64
-from typing import Dict, Optional
-from datetime import datetime
+import re
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime
 from openai import OpenAI
-from pathlib import Path
 
+import numpy as np
+from PIL import Image
 
-def estimate_body_fat(image_path: str) -> Dict:
+from tools import body_fat_cache, measurement_store
+from utils import prefetch
+from utils.image_prep import cached_thumbnail, content_digest, transformation_composite
+from utils.uploads import thumb_url
+from utils.validators import as_column_arrays, to_result_frame
+from utils.vision import extract_json, image_content_part
+
+
+# WHO BMI classes: BMI_BINS[i] is the lower bound of BMI_CLASSES[i + 1]
+BMI_BINS = np.array([16.0, 17.0, 18.5, 25.0, 30.0, 35.0, 40.0])
+BMI_CLASSES = np.array([
+    "Severe Thinness", "Moderate Thinness", "Mild Thinness", "Normal weight",
+    "Overweight", "Obese Class I", "Obese Class II", "Obese Class III"
+])
+BMI_HEALTH_RISKS = np.array([
+    "High", "Moderate", "Low", "Minimal", "Moderate", "High", "Very High", "Extremely High"
+])
+
+# Waist-to-hip ratio bands, same cutoffs as track_measurements
+WHR_BINS = np.array([0.85, 0.90])
+WHR_ASSESSMENTS = np.array(["Low health risk", "Moderate health risk", "High health risk"])
+
+# Body fat categories (ACE): BODY_FAT_BINS[sex][i] is the lower bound of BODY_FAT_CATEGORIES[i + 1]
+BODY_FAT_BINS = {
+    "male": np.array([6.0, 14.0, 18.0, 25.0]),
+    "female": np.array([14.0, 21.0, 25.0, 32.0])
+}
+BODY_FAT_CATEGORIES = np.array(["essential", "athlete", "fit", "average", "high"])
+
+# Stored circumferences older than this are not used to fill in an estimate
+STORED_MEASUREMENT_MAX_AGE_DAYS = 60
+
+# Batch body fat estimation: parallel vision calls under a shared request budget
+BODY_FAT_SERIES_MAX_PHOTOS = 60
+BODY_FAT_MAX_CONCURRENCY = 4
+BODY_FAT_REQUESTS_PER_MINUTE = 30
+
+
+class _RateLimiter:
+    """Token bucket shared by all threads: `burst` calls at once, then `per_minute` per minute"""
+    
+    def __init__(self, per_minute: int, burst: int):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Block until a call may start"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_vision_limiter = _RateLimiter(BODY_FAT_REQUESTS_PER_MINUTE, BODY_FAT_MAX_CONCURRENCY)
+
+
+def estimate_body_fat(
+    image_path: Optional[str] = None,
+    waist: Optional[float] = None,
+    neck: Optional[float] = None,
+    hips: Optional[float] = None,
+    height: Optional[float] = None,
+    gender: Optional[str] = None,
+    use_photo: bool = False,
+    user_id: str = "default"
+) -> Dict:
     """
-    Estimate body fat percentage from image using OpenAI Vision API
+    Estimate body fat percentage from tape measurements or a photo
+    
+    With waist, height and gender (plus neck, and hips for women) the US Navy
+    and RFM formulas answer locally with no network call; circumferences not
+    given are taken from the latest track_measurements entries at most
+    STORED_MEASUREMENT_MAX_AGE_DAYS old (their dates are returned). The photo is
+    analyzed with OpenAI Vision only when measurements are missing or
+    use_photo is set; a speculative analysis started at upload time is joined
+    when there is one.
     
     Args:
         image_path: Path to body image
+        waist: Waist circumference in cm (at the navel)
+        neck: Neck circumference in cm
+        hips: Hip circumference in cm (needed for the US Navy formula for women)
+        height: Height in cm
+        gender: 'male' or 'female'
+        use_photo: Analyze the photo even when measurements are given
+        user_id: Owner of stored measurements
     
     Returns:
         Dictionary with body fat estimation
     """
+    used_stored, stale_stored = {}, {}
+    if not use_photo and height is not None and gender and None in (waist, neck, hips):
+        given = {"waist": waist, "neck": neck, "hips": hips}
+        oldest = date.today().toordinal() - STORED_MEASUREMENT_MAX_AGE_DAYS
+        stored = measurement_store.latest_values(user_id, [site for site, value in given.items() if value is None])
+        for site, (value, day) in stored.items():
+            entry = {"value_cm": value, "date": day}
+            if date.fromisoformat(day).toordinal() >= oldest:
+                given[site] = value
+                used_stored[site] = entry
+            else:
+                stale_stored[site] = entry
+        waist, neck, hips = given["waist"], given["neck"], given["hips"]
+    
+    if not use_photo and None not in (waist, height, gender):
+        result = _estimate_body_fat_measurements(waist, neck, hips, height, gender)
+        if used_stored:
+            result["stored_measurements_used"] = used_stored
+        if stale_stored:
+            result["stale_measurements_ignored"] = stale_stored
+        return result
+    
+    if not image_path:
+        result = {
+            "success": False,
+            "error": "Need a photo or measurements (waist, height, gender; neck, and hips for women)",
+            "body_fat_percentage": None,
+            "confidence": "low"
+        }
+        if stale_stored:
+            result["stale_measurements_ignored"] = stale_stored
+            result["error"] += f" - stored values older than {STORED_MEASUREMENT_MAX_AGE_DAYS} days are not used"
+        return result
+    
+    hit, prefetched = prefetch.take(("estimate_body_fat", image_path))
+    if hit:
+        return prefetched
+    return _estimate_body_fat_cached(image_path)
+
+
+def _estimate_body_fat_measurements(waist: float, neck: Optional[float], hips: Optional[float],
+                                    height: float, gender: str) -> Dict:
+    """Offline estimate for one person (one-row estimate_body_fat_batch)"""
+    print(f"\n📏 [BODY_ANALYSIS] Body fat from measurements: waist={waist}, neck={neck}, "
+          f"hips={hips}, height={height}, gender={gender}")
+    
+    row = estimate_body_fat_batch({
+        "gender": [gender], "height": [height], "waist": [waist],
+        "neck": [np.nan if neck is None else neck], "hips": [np.nan if hips is None else hips]
+    })
+    estimate = float(row["body_fat_percentage"][0])
+    if np.isnan(estimate):
+        print("❌ [BODY_ANALYSIS] Measurements out of range for the formulas")
+        return {
+            "success": False,
+            "error": "Measurements out of range (check units are cm and waist > neck)",
+            "body_fat_percentage": None,
+            "confidence": "low"
+        }
+    
+    navy = float(row["navy_body_fat"][0])
+    method = str(row["method"][0])
+    print(f"✅ [BODY_ANALYSIS] {estimate}% ({method})")
+    return {
+        "success": True,
+        "body_fat_percentage": estimate,
+        "method": method,
+        "navy_body_fat": None if np.isnan(navy) else navy,
+        "rfm_body_fat": float(row["rfm_body_fat"][0]),
+        "confidence": "medium" if method == "us_navy" else "low",
+        "category": str(row["category"][0]),
+        "notes": "Tape-measure formula (about ±3-4% vs. DEXA); measure at the same time of day for trends",
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def estimate_body_fat_batch(data):
+    """
+    Vectorized US Navy and RFM body fat for whole cohorts (no network, no logging)
+    
+    US Navy (cm):
+        men    495 / (1.0324 - 0.19077 log10(waist - neck) + 0.15456 log10(height)) - 450
+        women  495 / (1.29579 - 0.35004 log10(waist + hips - neck) + 0.22100 log10(height)) - 450
+    RFM: 64 (men) or 76 (women) - 20 * height / waist
+    
+    Args:
+        data: DataFrame or mapping of arrays with columns gender, height and
+            waist (cm), optionally neck and hips (NaN where unknown)
+    
+    Returns:
+        Columnar result with navy_body_fat, rfm_body_fat, body_fat_percentage
+        (Navy where computable, else RFM), method and category; invalid rows
+        get NaN and "Error"
+    """
+    cols = as_column_arrays(data, ["gender", "height", "waist"], optional=["neck", "hips"])
+    rows = len(cols["waist"])
+    male = np.isin(np.char.lower(cols["gender"].astype(str)), ["male", "m", "man"])
+    height = cols["height"].astype(np.float64)
+    waist = cols["waist"].astype(np.float64)
+    neck = cols["neck"].astype(np.float64) if "neck" in cols else np.full(rows, np.nan)
+    hips = cols["hips"].astype(np.float64) if "hips" in cols else np.full(rows, np.nan)
+    valid = (height > 0) & (waist > 0)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        girth = np.where(male, waist - neck, waist + hips - neck)
+        navy = np.where(
+            male,
+            495 / (1.0324 - 0.19077 * np.log10(girth) + 0.15456 * np.log10(height)) - 450,
+            495 / (1.29579 - 0.35004 * np.log10(girth) + 0.22100 * np.log10(height)) - 450
+        )
+        rfm = np.where(male, 64.0, 76.0) - 20 * height / waist
+    
+    # Navy needs positive girth; both formulas are only meaningful in a plausible band
+    navy = np.where(valid & (girth > 0) & (navy > 2) & (navy < 60), navy, np.nan)
+    rfm = np.where(valid & (rfm > 2) & (rfm < 60), rfm, np.nan)
+    estimate = np.where(np.isnan(navy), rfm, navy)
+    known = ~np.isnan(estimate)
+    
+    fat = np.nan_to_num(estimate)
+    idx = np.where(
+        male,
+        np.searchsorted(BODY_FAT_BINS["male"], fat, side="right"),
+        np.searchsorted(BODY_FAT_BINS["female"], fat, side="right")
+    )
+    
+    result = {
+        "navy_body_fat": np.round(navy, 1),
+        "rfm_body_fat": np.round(rfm, 1),
+        "body_fat_percentage": np.round(estimate, 1),
+        "method": np.where(~np.isnan(navy), "us_navy", np.where(known, "rfm", "Error")),
+        "category": np.where(known, BODY_FAT_CATEGORIES[idx], "Error")
+    }
+    return to_result_frame(result, data)
+
+
+def prefetch_body_fat(image_path: str) -> Tuple:
+    """Start the body fat vision call in the background (no side effects)"""
+    key = ("estimate_body_fat", image_path)
+    prefetch.submit(key, _estimate_body_fat_cached, image_path)
+    return key
+
+
+def _estimate_body_fat_cached(image_path: str) -> Dict:
+    """Estimate from the content-hash cache, else one rate-limited vision call"""
+    if not os.path.exists(image_path):
+        return _estimate_body_fat_image(image_path)
+    
+    digest = content_digest(image_path)
+    cached = body_fat_cache.get_estimate(digest)
+    if cached:
+        print(f"💾 [BODY_ANALYSIS] Cached estimate for {image_path}")
+        return {**cached, "from_cache": True}
+    return _estimate_and_cache(image_path, digest)
+
+
+def _estimate_and_cache(image_path: str, digest: str) -> Dict:
+    """One rate-limited vision call, cached under the image's content hash"""
+    _vision_limiter.acquire()
+    result = _estimate_body_fat_image(image_path)
+    # Unparsed replies are not cached so a later call can do better
+    if result.get("success") and "raw_analysis" not in result:
+        body_fat_cache.save_estimate(digest, result)
+    return result
+
+
+def _estimate_body_fat_image(image_path: str) -> Dict:
+    """Vision call behind estimate_body_fat"""
     print(f"\n🔍 [BODY_ANALYSIS] Analyzing body fat from image: {image_path}")
     
     try:
@@ -46,20 +307,9 @@ def estimate_body_fat(image_path: str) -> Dict:
                 "notes": "Please set OPENAI_API_KEY in .env file"
             }
         
-        # Encode image to base64
-        print("📸 [BODY_ANALYSIS] Encoding image to base64...")
-        with open(image_path, "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode('utf-8')
-        
-        # Determine image format
-        file_extension = Path(image_path).suffix.lower()
-        mime_type = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp'
-        }.get(file_extension, 'image/jpeg')
+        # Send a cached thumbnail at the model's working resolution, not the original
+        print("📸 [BODY_ANALYSIS] Preparing image...")
+        image_part = image_content_part(cached_thumbnail(image_path))
         
         # Initialize OpenAI client
         client = OpenAI(api_key=api_key)
@@ -98,12 +348,7 @@ Format your response as JSON with these exact keys:
 
 REMEMBER: Output must be pure JSON only, no markdown, no code blocks, no formatting."""
                         },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:{mime_type};base64,{image_data}"
-                            }
-                        }
+                        image_part
                     ]
                 }
             ],
@@ -116,19 +361,8 @@ REMEMBER: Output must be pure JSON only, no markdown, no code blocks, no formatt
         print(f"📊 [BODY_ANALYSIS] Analysis result:\n{result_text}")
         
         # Try to parse JSON from response
-        import json
         try:
-            # Extract JSON if it's wrapped in markdown code blocks
-            if "```json" in result_text:
-                json_start = result_text.find("```json") + 7
-                json_end = result_text.find("```", json_start)
-                result_text = result_text[json_start:json_end].strip()
-            elif "```" in result_text:
-                json_start = result_text.find("```") + 3
-                json_end = result_text.find("```", json_start)
-                result_text = result_text[json_start:json_end].strip()
-            
-            analysis = json.loads(result_text)
+            analysis = extract_json(result_text)
             
             return {
                 "success": True,
@@ -163,6 +397,143 @@ REMEMBER: Output must be pure JSON only, no markdown, no code blocks, no formatt
         }
 
 
+def estimate_body_fat_series(image_paths: List[str], dates: Optional[List[str]] = None) -> Dict:
+    """
+    Body fat trend over a timeline of progress photos in one call
+    
+    Photos are analyzed concurrently (at most BODY_FAT_MAX_CONCURRENCY at a
+    time, within BODY_FAT_REQUESTS_PER_MINUTE); photos analyzed before are
+    answered from the content-hash cache without a vision call.
+    
+    Args:
+        image_paths: Progress photo paths
+        dates: Optional ISO dates (YYYY-MM-DD) in the same order; missing dates
+            come from the photo's EXIF capture date, else the file date
+    
+    Returns:
+        Dictionary with the date-ordered series, failed photos and the trend
+    """
+    print(f"\n📈 [BODY_ANALYSIS] Body fat series for {len(image_paths or [])} photo(s)")
+    
+    try:
+        if not image_paths:
+            return {"success": False, "error": "No image paths provided", "series": []}
+        
+        dates = list(dates or [])
+        # Same path twice is the same photo
+        entries = {}
+        for idx, path in enumerate(image_paths):
+            if path not in entries:
+                entries[path] = dates[idx] if idx < len(dates) else None
+        if len(entries) > BODY_FAT_SERIES_MAX_PHOTOS:
+            return {
+                "success": False,
+                "error": f"At most {BODY_FAT_SERIES_MAX_PHOTOS} photos per series ({len(entries)} given)",
+                "series": []
+            }
+        
+        failed = []
+        photos = []
+        for path, day in entries.items():
+            if not os.path.exists(path):
+                failed.append({"image_path": path, "error": "Image file not found"})
+                continue
+            try:
+                day = date.fromisoformat(day).isoformat() if day else _photo_date(path)
+            except ValueError:
+                failed.append({"image_path": path, "error": f"Invalid date: {day}"})
+                continue
+            photos.append((path, day))
+        
+        # One cache query for the whole series; only misses go to the pool
+        started = time.monotonic()
+        digests = [content_digest(path) for path, _ in photos]
+        known = body_fat_cache.get_estimates(sorted(set(digests)))
+        results = [{**known[d], "from_cache": True} if d in known else None for d in digests]
+        misses = [i for i, result in enumerate(results) if result is None]
+        
+        if misses and not os.getenv("OPENAI_API_KEY"):
+            return {"success": False, "error": "OpenAI API key not configured", "series": []}
+        
+        if misses:
+            workers = min(BODY_FAT_MAX_CONCURRENCY, len(misses))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                estimated = pool.map(lambda i: _estimate_and_cache(photos[i][0], digests[i]), misses)
+                for i, result in zip(misses, estimated):
+                    results[i] = result
+        
+        series = []
+        for (path, day), result in zip(photos, results):
+            value = _body_fat_value(result.get("body_fat_percentage")) if result.get("success") else None
+            if value is None:
+                failed.append({"image_path": path, "error": result.get("error") or "No numeric estimate"})
+                continue
+            series.append({
+                "date": day,
+                "image_path": path,
+                "body_fat_percentage": value,
+                "reported": result.get("body_fat_percentage"),
+                "confidence": result.get("confidence"),
+                "category": result.get("category"),
+                "from_cache": bool(result.get("from_cache"))
+            })
+        series.sort(key=lambda point: point["date"])
+        
+        cached = sum(point["from_cache"] for point in series)
+        print(f"✅ [BODY_ANALYSIS] {len(series)} estimate(s) ({cached} cached), "
+              f"{len(failed)} failed in {time.monotonic() - started:.1f}s")
+        
+        return {
+            "success": bool(series),
+            "series": series,
+            "failed": failed,
+            "trend": _body_fat_trend(series),
+            "photos_analyzed": len(series) - cached,
+            "from_cache": cached,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        print(f"❌ [BODY_ANALYSIS] Error during body fat series: {str(e)}")
+        return {"success": False, "error": str(e), "series": []}
+
+
+def _photo_date(image_path: str) -> str:
+    """Capture date from EXIF (DateTimeOriginal, then DateTime), else the file modification date"""
+    try:
+        with Image.open(image_path) as image:
+            exif = image.getexif()
+            stamp = exif.get_ifd(0x8769).get(36867) or exif.get(306)
+        if stamp:
+            return datetime.strptime(str(stamp)[:10], "%Y:%m:%d").date().isoformat()
+    except (OSError, ValueError):
+        pass
+    return date.fromtimestamp(os.path.getmtime(image_path)).isoformat()
+
+
+def _body_fat_value(reported) -> Optional[float]:
+    """Numeric body fat from a vision answer (12, "14%", "12-15" -> midpoint)"""
+    if isinstance(reported, (int, float)):
+        return float(reported)
+    numbers = [float(n) for n in re.findall(r"\d+(?:\.\d+)?", str(reported or ""))[:2]]
+    return round(sum(numbers) / len(numbers), 1) if numbers else None
+
+
+def _body_fat_trend(series: List[Dict]) -> Optional[Dict]:
+    """Least-squares change per 30 days and first-to-last change"""
+    if len(series) < 2:
+        return None
+    days = np.array([date.fromisoformat(p["date"]).toordinal() for p in series], dtype=np.float64)
+    values = np.array([p["body_fat_percentage"] for p in series])
+    slope = np.polyfit(days - days[0], values, 1)[0] if np.ptp(days) > 0 else 0.0
+    return {
+        "change_per_month": round(float(slope) * 30, 2),
+        "total_change": round(float(values[-1] - values[0]), 1),
+        "days_covered": int(np.ptp(days)),
+        "direction": "down" if slope < -0.01 else "up" if slope > 0.01 else "flat"
+    }
+
+
 def calculate_bmi(weight: float, height: float) -> Dict:
     """
     Calculate Body Mass Index
@@ -242,15 +613,52 @@ def calculate_bmi(weight: float, height: float) -> Dict:
         }
 
 
-def track_measurements(measurements: Dict) -> Dict:
+def calculate_bmi_batch(data):
+    """
+    Vectorized calculate_bmi for whole cohorts (no per-row logging)
+    
+    Args:
+        data: DataFrame or mapping of arrays with columns weight (kg) and height (cm)
+    
+    Returns:
+        Columnar result with bmi, classification, health_risk and healthy weight
+        bounds; rows with non-positive inputs get NaN and "Error"
+    """
+    cols = as_column_arrays(data, ["weight", "height"])
+    weight = cols["weight"].astype(np.float64)
+    height_m = cols["height"].astype(np.float64) / 100
+    valid = (weight > 0) & (height_m > 0)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bmi = np.where(valid, weight / height_m ** 2, np.nan)
+    
+    # side="right" puts values equal to a bound into the upper class (18.5 -> Normal)
+    idx = np.searchsorted(BMI_BINS, np.nan_to_num(bmi), side="right")
+    classification = np.where(valid, BMI_CLASSES[idx], "Error")
+    health_risk = np.where(valid, BMI_HEALTH_RISKS[idx], "Error")
+    
+    result = {
+        "bmi": np.round(bmi, 1),
+        "classification": classification,
+        "health_risk": health_risk,
+        "healthy_weight_min_kg": np.round(18.5 * height_m ** 2, 1),
+        "healthy_weight_max_kg": np.round(24.9 * height_m ** 2, 1)
+    }
+    return to_result_frame(result, data)
+
+
+def track_measurements(measurements: Dict, date: Optional[str] = None, user_id: str = "default") -> Dict:
     """
     Track body measurements and store in database
     
     Args:
         measurements: Dictionary with body measurements (chest, waist, arms, hips, thighs, etc.)
+        date: Measurement date (YYYY-MM-DD), today by default
+        user_id: Owner of the measurement history
     
     Returns:
-        Dictionary with tracked measurements and analysis
+        Dictionary with tracked measurements, analysis and trends of the
+        recorded sites against the stored history
     """
     print(f"\n📏 [BODY_ANALYSIS] Tracking body measurements: {list(measurements.keys())}")
     
@@ -305,6 +713,12 @@ def track_measurements(measurements: Dict) -> Dict:
         # Store timestamp
         timestamp = datetime.now().isoformat()
         
+        # Append to the history and trend the sites just measured
+        measurement_store.record_measurements(user_id, valid_measurements, day=date)
+        series = measurement_store.get_series(user_id, sites=_with_symmetry_partners(valid_measurements))
+        trends = {site: measurement_store.site_trend(*series[site])
+                  for site in valid_measurements if site in series and len(series[site][0]) > 1}
+        
         print(f"✅ [BODY_ANALYSIS] Successfully tracked {len(valid_measurements)} measurements")
         
         return {
@@ -312,6 +726,8 @@ def track_measurements(measurements: Dict) -> Dict:
             "measurements": valid_measurements,
             "analysis": analysis,
             "symmetry": symmetry if symmetry else None,
+            "trends": trends or None,
+            "symmetry_trends": measurement_store.symmetry_trend(series) or None,
             "timestamp": timestamp,
             "total_measurements": len(valid_measurements),
             "notes": "Measurements successfully recorded. Track regularly to monitor progress."
@@ -326,6 +742,101 @@ def track_measurements(measurements: Dict) -> Dict:
         }
 
 
+def _with_symmetry_partners(sites) -> List[str]:
+    """Sites plus the other side of any left/right pair among them"""
+    wanted = set(sites)
+    for pair in measurement_store.SYMMETRY_PAIRS.values():
+        if wanted & set(pair):
+            wanted.update(pair)
+    return sorted(wanted)
+
+
+def get_measurement_trends(
+    sites: Optional[List[str]] = None,
+    window_days: int = measurement_store.DEFAULT_WINDOW_DAYS,
+    since: Optional[str] = None,
+    user_id: str = "default"
+) -> Dict:
+    """
+    Progress of stored body measurements
+    
+    Args:
+        sites: Measurement sites to report (all stored sites by default)
+        window_days: Trailing window for rolling averages and recent rate of change
+        since: Only use entries from this date on (YYYY-MM-DD)
+        user_id: Owner of the measurement history
+    
+    Returns:
+        Dictionary with per-site trends and left/right symmetry trends
+    """
+    print(f"\n📈 [BODY_ANALYSIS] Measurement trends: sites={sites or 'all'}, window={window_days}d")
+    
+    try:
+        series = measurement_store.get_series(
+            user_id, sites=_with_symmetry_partners(sites) if sites else None, since=since
+        )
+        if not series:
+            return {
+                "success": False,
+                "error": "No measurements recorded yet. Use track_measurements first.",
+                "trends": {}
+            }
+        
+        trends = {site: measurement_store.site_trend(days, values, window_days)
+                  for site, (days, values) in series.items() if not sites or site in sites}
+        print(f"✅ [BODY_ANALYSIS] Trends for {len(trends)} site(s), "
+              f"{sum(len(d) for d, _ in series.values())} entries")
+        
+        return {
+            "success": True,
+            "trends": trends,
+            "symmetry_trends": measurement_store.symmetry_trend(series, window_days) or None,
+            "window_days": window_days
+        }
+        
+    except Exception as e:
+        print(f"❌ [BODY_ANALYSIS] Error reading measurement trends: {str(e)}")
+        return {"success": False, "error": str(e), "trends": {}}
+
+
+def track_measurements_batch(data):
+    """
+    Vectorized waist-to-hip and symmetry analysis for whole cohorts
+    
+    Args:
+        data: DataFrame or mapping of arrays with columns waist and hips (cm),
+            optionally left_arm/right_arm and left_thigh/right_thigh
+    
+    Returns:
+        Columnar result with waist_hip_ratio, whr_assessment and, when the
+        paired columns are present, arm/thigh symmetry differences in cm
+    """
+    cols = as_column_arrays(
+        data, ["waist", "hips"],
+        optional=["left_arm", "right_arm", "left_thigh", "right_thigh"]
+    )
+    waist = cols["waist"].astype(np.float64)
+    hips = cols["hips"].astype(np.float64)
+    valid = (waist > 0) & (hips > 0)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        whr = np.where(valid, waist / hips, np.nan)
+    
+    idx = np.searchsorted(WHR_BINS, np.nan_to_num(whr), side="right")
+    result = {
+        "waist_hip_ratio": np.round(whr, 2),
+        "whr_assessment": np.where(valid, WHR_ASSESSMENTS[idx], "Error")
+    }
+    
+    for side_pair, name in ((("left_arm", "right_arm"), "arm_symmetry_cm"),
+                            (("left_thigh", "right_thigh"), "thigh_symmetry_cm")):
+        if all(col in cols for col in side_pair):
+            left, right = (cols[col].astype(np.float64) for col in side_pair)
+            result[name] = np.round(np.abs(left - right), 1)
+    
+    return to_result_frame(result, data)
+
+
 def visualize_transformation(before_photo: str, after_photo: str) -> Dict:
     """
     Create transformation visualization and analysis using AI vision
@@ -369,16 +880,12 @@ def visualize_transformation(before_photo: str, after_photo: str) -> Dict:
                 "comparison_created": False
             }
         
-        # Encode both images
-        print("📸 [BODY_ANALYSIS] Encoding images...")
-        with open(before_photo, "rb") as f:
-            before_data = base64.b64encode(f.read()).decode('utf-8')
-        with open(after_photo, "rb") as f:
-            after_data = base64.b64encode(f.read()).decode('utf-8')
-        
-        # Determine mime types
-        before_mime = 'image/jpeg' if before_photo.lower().endswith(('.jpg', '.jpeg')) else 'image/png'
-        after_mime = 'image/jpeg' if after_photo.lower().endswith(('.jpg', '.jpeg')) else 'image/png'
+        # One aligned side-by-side composite instead of two full-resolution photos
+        print("🖼️ [BODY_ANALYSIS] Building before/after composite...")
+        composite = transformation_composite(before_photo, after_photo)
+        print(f"   Composite {composite['width']}x{composite['height']} "
+              f"(~{composite['image_tokens']} image tokens vs ~{composite['original_image_tokens']} for the originals"
+              f"{', cached' if composite['from_cache'] else ''})")
         
         # Initialize OpenAI client
         client = OpenAI(api_key=api_key)
@@ -394,7 +901,7 @@ def visualize_transformation(before_photo: str, after_photo: str) -> Dict:
                     "content": [
                         {
                             "type": "text",
-                            "text": """Compare these two body transformation photos (BEFORE and AFTER) and provide a detailed analysis.
+                            "text": """This image shows a body transformation: the BEFORE photo on the left and the AFTER photo on the right, cropped and scaled to the same body height. Compare them and provide a detailed analysis.
 
 Analyze and provide:
 1. Visible muscle development or fat loss
@@ -420,22 +927,7 @@ Format as JSON:
 
 REMEMBER: Output must be pure JSON only, no markdown, no code blocks, no formatting."""
                         },
-                        {
-                            "type": "text",
-                            "text": "BEFORE photo:"
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": f"data:{before_mime};base64,{before_data}"}
-                        },
-                        {
-                            "type": "text",
-                            "text": "AFTER photo:"
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": f"data:{after_mime};base64,{after_data}"}
-                        }
+                        image_content_part(composite["path"], detail="high")
                     ]
                 }
             ],
@@ -448,22 +940,13 @@ REMEMBER: Output must be pure JSON only, no markdown, no code blocks, no formatt
         print(f"📊 [BODY_ANALYSIS] Analysis:\n{result_text}")
         
         # Try to parse JSON
-        import json
         try:
-            if "```json" in result_text:
-                json_start = result_text.find("```json") + 7
-                json_end = result_text.find("```", json_start)
-                result_text = result_text[json_start:json_end].strip()
-            elif "```" in result_text:
-                json_start = result_text.find("```") + 3
-                json_end = result_text.find("```", json_start)
-                result_text = result_text[json_start:json_end].strip()
-            
-            analysis = json.loads(result_text)
+            analysis = extract_json(result_text)
             
             return {
                 "success": True,
                 "comparison_created": True,
+                "composite_url": thumb_url(composite["path"]),
                 "muscle_gain": analysis.get("muscle_gain", ""),
                 "fat_loss": analysis.get("fat_loss", ""),
                 "postural_changes": analysis.get("postural_changes", ""),
@@ -479,6 +962,7 @@ REMEMBER: Output must be pure JSON only, no markdown, no code blocks, no formatt
             return {
                 "success": True,
                 "comparison_created": True,
+                "composite_url": thumb_url(composite["path"]),
                 "raw_analysis": result_text,
                 "timestamp": datetime.now().isoformat()
             }
@@ -519,16 +1003,48 @@ BODY_ANALYSIS_TOOLS = [
         "type": "function",
         "function": {
             "name": "estimate_body_fat",
-            "description": "Estimate body fat percentage from a body photo using AI vision analysis. Provides detailed body composition assessment including muscle definition and recommendations.",
+            "description": "Estimate body fat percentage. With tape measurements (waist, neck, height, gender; hips for women) it answers instantly using the US Navy / RFM formulas; otherwise it analyzes a body photo with AI vision (muscle definition and recommendations included).",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "image_path": {
                         "type": "string",
-                        "description": "Absolute path to the body image file (jpg, png, etc.)"
+                        "description": "Absolute path to the body image file (jpg, png, etc.); needed only without measurements"
+                    },
+                    "waist": {"type": "number", "description": "Waist circumference at the navel in cm"},
+                    "neck": {"type": "number", "description": "Neck circumference in cm"},
+                    "hips": {"type": "number", "description": "Hip circumference in cm (women)"},
+                    "height": {"type": "number", "description": "Height in cm"},
+                    "gender": {"type": "string", "enum": ["male", "female"]},
+                    "use_photo": {
+                        "type": "boolean",
+                        "description": "Set true only when the user explicitly asks for photo analysis although measurements are known"
+                    }
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "estimate_body_fat_series",
+            "description": "Estimate body fat for a whole timeline of progress photos in one call and return the date-ordered trend. Use instead of repeated estimate_body_fat calls when the user gives several photos over time.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "image_paths": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Paths of the progress photos"
+                    },
+                    "dates": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Optional photo dates (YYYY-MM-DD) in the same order as image_paths; omit to use the photos' capture dates"
                     }
                 },
-                "required": ["image_path"]
+                "required": ["image_paths"]
             }
         }
     },
@@ -536,7 +1052,7 @@ BODY_ANALYSIS_TOOLS = [
         "type": "function",
         "function": {
             "name": "track_measurements",
-            "description": "Track and analyze body measurements (chest, waist, arms, hips, thighs). Calculates waist-to-hip ratio and symmetry analysis.",
+            "description": "Record and analyze body measurements (chest, waist, arms, hips, thighs). Saves them to the user's history and returns waist-to-hip ratio, symmetry and trends against earlier entries.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -554,12 +1070,42 @@ BODY_ANALYSIS_TOOLS = [
                             "neck": {"type": "number"},
                             "shoulders": {"type": "number"}
                         }
+                    },
+                    "date": {
+                        "type": "string",
+                        "description": "Measurement date (YYYY-MM-DD); omit for today"
                     }
                 },
                 "required": ["measurements"]
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_measurement_trends",
+            "description": "Progress of the user's stored body measurements: latest value, rolling average, change per week and since the first entry for each site, plus left/right symmetry trends. Use for any question about measurement progress instead of re-reading earlier messages.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "sites": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Sites to report, e.g. ['waist', 'left_arm']; omit for all"
+                    },
+                    "window_days": {
+                        "type": "integer",
+                        "description": "Window for rolling averages and the recent rate (default 28)"
+                    },
+                    "since": {
+                        "type": "string",
+                        "description": "Only use entries from this date on (YYYY-MM-DD)"
+                    }
+                },
+                "required": []
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
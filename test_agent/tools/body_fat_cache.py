@@ -0,0 +1,51 @@
+"""
+Body Fat Estimate Cache for FitCoach AI
+Vision estimates stored by image content hash
+
+The same progress photo always gets the same answer without another
+gpt-4o call, whichever path or user it was uploaded under.
+"""
+import json
+from typing import Dict, List, Optional
+
+from utils.database import get_connection
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS body_fat_estimates (
+    image_sha256 TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    created_at TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def get_estimate(image_sha256: str) -> Optional[Dict]:
+    """Cached estimate for an image, None on a miss"""
+    row = get_connection(_SCHEMA).execute(
+        "SELECT result FROM body_fat_estimates WHERE image_sha256 = ?", (image_sha256,)
+    ).fetchone()
+    return json.loads(row["result"]) if row else None
+
+
+def get_estimates(image_hashes: List[str]) -> Dict[str, Dict]:
+    """Cached estimates for many images in one query"""
+    if not image_hashes:
+        return {}
+    placeholders = ", ".join("?" for _ in image_hashes)
+    rows = get_connection(_SCHEMA).execute(
+        f"SELECT image_sha256, result FROM body_fat_estimates WHERE image_sha256 IN ({placeholders})",
+        list(image_hashes)
+    ).fetchall()
+    return {row["image_sha256"]: json.loads(row["result"]) for row in rows}
+
+
+def save_estimate(image_sha256: str, result: Dict) -> None:
+    """Store a successful estimate"""
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO body_fat_estimates (image_sha256, result, created_at) "
+            "VALUES (?, ?, datetime('now'))",
+            (image_sha256, json.dumps(result))
+        )
@@ -2,53 +2,139 @@
 Data Integration Tools for FitCoach AI
 Handles integration with external services (Strava, Hevy, Health apps)
 """
+import os
+from datetime import date, datetime, timezone
 from typing import Dict, List, Optional
 
+import requests
 
-def import_strava_data(auth_token: str) -> Dict:
+from tools.activity_log import activity_count, activity_totals, from_strava, recent_activities, save_activities
+from tools.hevy_import import import_hevy_csv
+from tools.import_watermarks import get_watermark, set_watermark
+
+
+STRAVA_ACTIVITIES_URL = "https://www.strava.com/api/v3/athlete/activities"
+STRAVA_SOURCE = "strava"
+STRAVA_PAGE_SIZE = 200
+STRAVA_MAX_PAGES = 50
+# Seconds before the cursor that are fetched again on each sync
+STRAVA_CURSOR_OVERLAP = 7 * 24 * 3600
+
+
+def import_strava_data(auth_token: str, full_sync: bool = False, user_id: str = "default") -> Dict:
     """
     Import workout data from Strava
     
+    Syncs incrementally: only activities started after the stored cursor
+    (minus STRAVA_CURSOR_OVERLAP, to catch late uploads and recent edits)
+    are requested, and the cursor advances only after a complete sync.
+    
     Args:
         auth_token: Strava authentication token
+        full_sync: Ignore the cursor and fetch the whole history
+        user_id: Owner of the activity log
     
     Returns:
-        Dictionary with Strava activities
+        Dictionary with new/updated/unchanged counts, recent activities and
+        28-day totals per sport
     """
-    # TODO: Implement Strava API integration
-    # - Authenticate with Strava API
-    # - Fetch recent activities
-    # - Parse running/cycling data
-    # - Extract performance metrics
+    previous = get_watermark(user_id, STRAVA_SOURCE)
+    after = 0 if full_sync or not previous else max(previous["watermark"] - STRAVA_CURSOR_OVERLAP, 0)
+    print(f"\n🚴 [TOOL] import_strava_data(after={datetime.fromtimestamp(after, timezone.utc).date()}, "
+          f"full_sync={full_sync})")
+    
+    counts = {"new": 0, "updated": 0, "unchanged": 0}
+    newest = after
+    complete = False
+    error = None
+    for page in range(1, STRAVA_MAX_PAGES + 1):
+        try:
+            response = requests.get(
+                STRAVA_ACTIVITIES_URL,
+                headers={"Authorization": f"Bearer {auth_token}"},
+                params={"after": after, "per_page": STRAVA_PAGE_SIZE, "page": page},
+                timeout=15
+            )
+        except requests.RequestException as e:
+            error = f"Strava request failed: {e}"
+            break
+        if response.status_code == 401:
+            return {"success": False, "error": "Strava rejected the token; reconnect Strava to get a new one"}
+        if response.status_code == 429:
+            error = "Strava rate limit reached; the rest will sync next time"
+            break
+        if not response.ok:
+            error = f"Strava returned HTTP {response.status_code}"
+            break
+        
+        batch = [from_strava(activity) for activity in response.json()]
+        new, updated, unchanged = save_activities(user_id, batch)
+        counts["new"] += new
+        counts["updated"] += updated
+        counts["unchanged"] += unchanged
+        newest = max([newest] + [row["start_epoch"] for row in batch])
+        if len(batch) < STRAVA_PAGE_SIZE:
+            complete = True
+            break
+    else:
+        error = f"Stopped after {STRAVA_MAX_PAGES} pages; sync again to fetch the rest"
+    
+    # An interrupted sync keeps the old cursor; the stored digests make the retry cheap
+    if complete:
+        set_watermark(user_id, STRAVA_SOURCE, newest)
+    elif error:
+        print(f"⚠️ [WARNING] {error}")
+    
+    print(f"✅ [RESULT] Strava: {counts['new']} new, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged activities")
     
     return {
-        "activities": [],
-        "total_activities": 0,
-        "status": "not_implemented"
+        "success": complete or counts["new"] + counts["updated"] + counts["unchanged"] > 0,
+        "status": "complete" if complete else "partial",
+        **({"error": error} if error else {}),
+        "new_activities": counts["new"],
+        "updated_activities": counts["updated"],
+        "unchanged_activities": counts["unchanged"],
+        "total_activities": activity_count(user_id),
+        "synced_through": datetime.fromtimestamp(newest, timezone.utc).isoformat(timespec="minutes") if newest else None,
+        "activities": recent_activities(user_id),
+        "last_28_days": activity_totals(user_id, date.today().toordinal() - 27)
     }
 
 
-def import_hevy_workout(csv_file: str) -> Dict:
+def import_hevy_workout(csv_file: str, user_id: str = "default") -> Dict:
     """
     Import workout data from Hevy CSV export
     
     Args:
         csv_file: Path to Hevy CSV file
+        user_id: Owner of the workout history
     
     Returns:
-        Dictionary with parsed workout data
+        Dictionary with import counts, exercises and date range; the sets
+        are stored in the user's workout log
     """
-    # TODO: Implement Hevy CSV parsing
-    # - Read CSV file
-    # - Parse workout sessions
-    # - Extract exercises, sets, reps, weight
-    # - Organize by date
+    print(f"\n📥 [TOOL] import_hevy_workout(csv_file={csv_file})")
+    
+    if not os.path.isfile(csv_file):
+        return {"success": False, "error": f"File not found: {csv_file}"}
+    try:
+        result = import_hevy_csv(csv_file, user_id)
+    except ValueError as e:  # includes pandas parser and decoding errors
+        print(f"❌ [ERROR] Hevy import failed: {e}")
+        return {"success": False, "error": f"Could not import the Hevy export: {e}"}
+    
+    if result["unchanged_file"]:
+        print(f"✅ [RESULT] Same export as the import at {result['last_import']}, nothing to do")
+    else:
+        print(f"✅ [RESULT] {result['sessions_written']} sessions written ({result['sets_imported']} sets), "
+              f"{result['sessions_unchanged']} unchanged, {result['sessions_removed']} removed; "
+              f"{result['file_mb']} MB in {result['elapsed_seconds']} s")
     
     return {
-        "workouts": [],
-        "exercises": [],
-        "date_range": {},
-        "status": "not_implemented"
+        "success": True,
+        **result,
+        "next_steps": "Use analyze_workout_progress, get_personal_records or suggest_progressive_overload on the imported history"
     }
 
 
@@ -81,13 +167,17 @@ DATA_INTEGRATION_TOOLS = [
         "type": "function",
         "function": {
             "name": "import_strava_data",
-            "description": "Import running and cycling activities from Strava",
+            "description": "Sync running, cycling and other activities from Strava into the user's activity log (incremental: only activities since the last sync are fetched)",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "auth_token": {
                         "type": "string",
                         "description": "Strava API authentication token"
+                    },
+                    "full_sync": {
+                        "type": "boolean",
+                        "description": "Re-fetch the whole history instead of syncing from the last cursor"
                     }
                 },
                 "required": ["auth_token"]
@@ -98,7 +188,7 @@ DATA_INTEGRATION_TOOLS = [
         "type": "function",
         "function": {
             "name": "import_hevy_workout",
-            "description": "Import workout history from Hevy app CSV export",
+            "description": "Import workout history from a Hevy app CSV export into the user's stored workout log. Re-importing a newer full export only ingests new or edited sessions.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -0,0 +1,239 @@
+"""
+Exercise Catalog for FitCoach AI
+Local exercise table used by the workout planner, indexed by equipment,
+movement pattern and muscle group
+"""
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+# Equipment a user can have; bodyweight is always available
+EQUIPMENT = ["bodyweight", "barbell", "dumbbells", "kettlebell", "machines", "cables", "bench", "pullup_bar", "bands"]
+EQUIPMENT_BITS = {name: 1 << i for i, name in enumerate(EQUIPMENT)}
+
+# Free-text equipment words -> catalog equipment
+_EQUIPMENT_SYNONYMS = {
+    "barbell": ["barbell"], "barbells": ["barbell"], "rack": ["barbell"], "squat rack": ["barbell"],
+    "dumbbell": ["dumbbells"], "dumbbells": ["dumbbells"], "gantere": ["dumbbells"],
+    "kettlebell": ["kettlebell"], "kettlebells": ["kettlebell"],
+    "machine": ["machines"], "machines": ["machines"], "aparate": ["machines"],
+    "cable": ["cables"], "cables": ["cables"], "cable machine": ["cables"],
+    "bench": ["bench"], "banca": ["bench"],
+    "pull-up bar": ["pullup_bar"], "pullup bar": ["pullup_bar"], "pull up bar": ["pullup_bar"], "bara": ["pullup_bar"],
+    "band": ["bands"], "bands": ["bands"], "resistance bands": ["bands"], "elastic": ["bands"],
+    "bodyweight": ["bodyweight"], "none": ["bodyweight"], "home": ["bodyweight"],
+    "gym": EQUIPMENT, "full gym": EQUIPMENT, "commercial gym": EQUIPMENT, "sala": EQUIPMENT
+}
+
+# Muscle columns of MUSCLE_MATRIX
+MUSCLES = [
+    "chest", "front_delts", "side_delts", "rear_delts", "lats", "upper_back", "biceps", "triceps",
+    "forearms", "quads", "hamstrings", "glutes", "calves", "core", "lower_back"
+]
+MUSCLE_INDEX = {m: i for i, m in enumerate(MUSCLES)}
+
+# Secondary muscles count as half a set toward weekly volume
+SECONDARY_SET_SHARE = 0.5
+
+EXPERIENCE_LEVELS = {"beginner": 0, "intermediate": 1, "advanced": 2}
+
+# name, pattern, mechanic (C=compound, I=isolation), primary muscles, secondary muscles,
+# equipment ("a+b" needs both, "x|y" needs either), minimum experience level
+# Within a pattern, rows are in order of preference for a fully equipped gym
+_EXERCISE_ROWS = [
+    # Squat and lunge
+    ("barbell back squat", "squat", "C", ("quads", "glutes"), ("lower_back", "core"), "barbell", 0),
+    ("front squat", "squat", "C", ("quads",), ("glutes", "core"), "barbell", 1),
+    ("leg press", "squat", "C", ("quads", "glutes"), (), "machines", 0),
+    ("goblet squat", "squat", "C", ("quads", "glutes"), ("core",), "dumbbells|kettlebell", 0),
+    ("hack squat", "squat", "C", ("quads",), ("glutes",), "machines", 1),
+    ("bodyweight squat", "squat", "C", ("quads", "glutes"), (), "bodyweight", 0),
+    ("bulgarian split squat", "lunge", "C", ("quads", "glutes"), (), "dumbbells+bench|bench", 1),
+    ("walking lunge", "lunge", "C", ("quads", "glutes"), (), "dumbbells|bodyweight", 0),
+    ("reverse lunge", "lunge", "C", ("quads", "glutes"), (), "dumbbells|bodyweight", 0),
+    ("step-up", "lunge", "C", ("quads", "glutes"), (), "dumbbells+bench|bench", 0),
+    # Hinge
+    ("romanian deadlift", "hinge", "C", ("hamstrings", "glutes"), ("lower_back",), "barbell|dumbbells", 0),
+    ("conventional deadlift", "hinge", "C", ("hamstrings", "glutes", "lower_back"), ("upper_back", "forearms"), "barbell", 1),
+    ("hip thrust", "hinge", "C", ("glutes",), ("hamstrings",), "barbell+bench", 0),
+    ("kettlebell swing", "hinge", "C", ("glutes", "hamstrings"), ("core",), "kettlebell", 0),
+    ("single-leg romanian deadlift", "hinge", "C", ("hamstrings", "glutes"), ("core",), "dumbbells|bodyweight", 1),
+    ("back extension", "hinge", "I", ("lower_back", "glutes"), ("hamstrings",), "machines", 0),
+    ("glute bridge", "hinge", "C", ("glutes",), ("hamstrings",), "bodyweight", 0),
+    # Horizontal push
+    ("barbell bench press", "horizontal_push", "C", ("chest",), ("triceps", "front_delts"), "barbell+bench", 0),
+    ("incline dumbbell press", "horizontal_push", "C", ("chest", "front_delts"), ("triceps",), "dumbbells+bench", 0),
+    ("dumbbell bench press", "horizontal_push", "C", ("chest",), ("triceps", "front_delts"), "dumbbells+bench", 0),
+    ("incline barbell press", "horizontal_push", "C", ("chest", "front_delts"), ("triceps",), "barbell+bench", 1),
+    ("machine chest press", "horizontal_push", "C", ("chest",), ("triceps",), "machines", 0),
+    ("push-up", "horizontal_push", "C", ("chest",), ("triceps", "front_delts", "core"), "bodyweight", 0),
+    ("band chest press", "horizontal_push", "C", ("chest",), ("triceps",), "bands", 0),
+    # Vertical push
+    ("overhead press", "vertical_push", "C", ("front_delts",), ("triceps", "side_delts"), "barbell", 0),
+    ("seated dumbbell shoulder press", "vertical_push", "C", ("front_delts",), ("triceps", "side_delts"), "dumbbells", 0),
+    ("machine shoulder press", "vertical_push", "C", ("front_delts",), ("triceps",), "machines", 0),
+    ("kettlebell press", "vertical_push", "C", ("front_delts",), ("triceps",), "kettlebell", 0),
+    ("pike push-up", "vertical_push", "C", ("front_delts",), ("triceps",), "bodyweight", 1),
+    ("band overhead press", "vertical_push", "C", ("front_delts",), ("triceps",), "bands", 0),
+    # Horizontal pull
+    ("barbell row", "horizontal_pull", "C", ("upper_back", "lats"), ("biceps", "rear_delts"), "barbell", 1),
+    ("seated cable row", "horizontal_pull", "C", ("upper_back", "lats"), ("biceps",), "cables|machines", 0),
+    ("chest-supported dumbbell row", "horizontal_pull", "C", ("upper_back",), ("rear_delts", "biceps"), "dumbbells+bench", 0),
+    ("one-arm dumbbell row", "horizontal_pull", "C", ("lats", "upper_back"), ("biceps",), "dumbbells", 0),
+    ("inverted row", "horizontal_pull", "C", ("upper_back",), ("biceps",), "pullup_bar|barbell", 0),
+    ("band row", "horizontal_pull", "C", ("upper_back",), ("biceps",), "bands", 0),
+    ("doorway row", "horizontal_pull", "C", ("upper_back",), ("biceps",), "bodyweight", 0),
+    # Vertical pull
+    ("pull-up", "vertical_pull", "C", ("lats",), ("biceps", "upper_back"), "pullup_bar", 1),
+    ("lat pulldown", "vertical_pull", "C", ("lats",), ("biceps",), "cables|machines", 0),
+    ("chin-up", "vertical_pull", "C", ("lats", "biceps"), ("upper_back",), "pullup_bar", 0),
+    ("assisted pull-up", "vertical_pull", "C", ("lats",), ("biceps",), "machines|bands+pullup_bar", 0),
+    ("band pulldown", "vertical_pull", "C", ("lats",), ("biceps",), "bands", 0),
+    # Chest and shoulder isolation
+    ("cable fly", "chest_isolation", "I", ("chest",), (), "cables", 0),
+    ("pec deck", "chest_isolation", "I", ("chest",), (), "machines", 0),
+    ("dumbbell fly", "chest_isolation", "I", ("chest",), (), "dumbbells+bench", 0),
+    ("dumbbell lateral raise", "shoulder_isolation", "I", ("side_delts",), (), "dumbbells", 0),
+    ("cable lateral raise", "shoulder_isolation", "I", ("side_delts",), (), "cables", 0),
+    ("band lateral raise", "shoulder_isolation", "I", ("side_delts",), (), "bands", 0),
+    ("face pull", "rear_delt", "I", ("rear_delts", "upper_back"), (), "cables|bands", 0),
+    ("reverse pec deck", "rear_delt", "I", ("rear_delts",), (), "machines", 0),
+    ("rear delt dumbbell fly", "rear_delt", "I", ("rear_delts",), (), "dumbbells", 0),
+    ("prone y-t-w raise", "rear_delt", "I", ("rear_delts", "upper_back"), (), "bodyweight", 0),
+    # Arms
+    ("barbell curl", "biceps", "I", ("biceps",), ("forearms",), "barbell", 0),
+    ("dumbbell curl", "biceps", "I", ("biceps",), ("forearms",), "dumbbells", 0),
+    ("hammer curl", "biceps", "I", ("biceps", "forearms"), (), "dumbbells", 0),
+    ("cable curl", "biceps", "I", ("biceps",), (), "cables", 0),
+    ("band curl", "biceps", "I", ("biceps",), (), "bands", 0),
+    ("towel curl", "biceps", "I", ("biceps",), (), "bodyweight", 0),
+    ("cable triceps pushdown", "triceps", "I", ("triceps",), (), "cables", 0),
+    ("overhead dumbbell triceps extension", "triceps", "I", ("triceps",), (), "dumbbells", 0),
+    ("skull crusher", "triceps", "I", ("triceps",), (), "barbell+bench|dumbbells+bench", 1),
+    ("bench dip", "triceps", "C", ("triceps",), ("chest",), "bench|bodyweight", 0),
+    ("close-grip push-up", "triceps", "C", ("triceps",), ("chest",), "bodyweight", 0),
+    ("dip", "triceps", "C", ("triceps", "chest"), ("front_delts",), "pullup_bar|machines", 1),
+    # Leg isolation
+    ("leg extension", "quad_isolation", "I", ("quads",), (), "machines", 0),
+    ("lying leg curl", "hamstring_isolation", "I", ("hamstrings",), (), "machines", 0),
+    ("seated leg curl", "hamstring_isolation", "I", ("hamstrings",), (), "machines", 0),
+    ("nordic curl", "hamstring_isolation", "I", ("hamstrings",), (), "bodyweight", 2),
+    ("standing calf raise", "calves", "I", ("calves",), (), "machines|dumbbells|bodyweight", 0),
+    ("seated calf raise", "calves", "I", ("calves",), (), "machines", 0),
+    # Core and carries
+    ("hanging leg raise", "core", "I", ("core",), (), "pullup_bar", 1),
+    ("cable crunch", "core", "I", ("core",), (), "cables", 0),
+    ("pallof press", "core", "I", ("core",), (), "cables|bands", 0),
+    ("plank", "core", "I", ("core",), (), "bodyweight", 0),
+    ("dead bug", "core", "I", ("core",), (), "bodyweight", 0),
+    ("crunch", "core", "I", ("core",), (), "bodyweight", 0),
+    ("farmer's carry", "carry", "C", ("forearms", "core", "upper_back"), (), "dumbbells|kettlebell", 0),
+]
+
+# Equipment alternatives stored per exercise ("x|y" -> 2 masks, padded by repeating the first)
+_MAX_EQUIPMENT_OPTIONS = 3
+
+
+def _equipment_options(spec: str) -> List[int]:
+    """Parse "a+b|c" into one bit mask per alternative"""
+    return [sum(EQUIPMENT_BITS[item] for item in option.split("+")) for option in spec.split("|")]
+
+
+def _build_exercises(rows) -> List[Dict]:
+    """Expand the compact row table into exercise dictionaries"""
+    exercises = []
+    for idx, (name, pattern, mechanic, primary, secondary, equipment, level) in enumerate(rows):
+        exercises.append({
+            "id": idx,
+            "name": name,
+            "pattern": pattern,
+            "compound": mechanic == "C",
+            "primary_muscles": list(primary),
+            "secondary_muscles": list(secondary),
+            "equipment": equipment.replace("_", " ").replace("+", " + ").replace("|", " or "),
+            "equipment_options": _equipment_options(equipment),
+            "min_level": level
+        })
+    return exercises
+
+
+EXERCISES = _build_exercises(_EXERCISE_ROWS)
+
+# Vectorized views over the catalog, row i == EXERCISES[i]
+EQUIPMENT_MASKS = np.array(
+    [(e["equipment_options"] * _MAX_EQUIPMENT_OPTIONS)[:_MAX_EQUIPMENT_OPTIONS] for e in EXERCISES],
+    dtype=np.int64
+)
+MIN_LEVELS = np.array([e["min_level"] for e in EXERCISES], dtype=np.int8)
+IS_COMPOUND = np.array([e["compound"] for e in EXERCISES], dtype=bool)
+BODYWEIGHT_ONLY = (EQUIPMENT_MASKS == EQUIPMENT_BITS["bodyweight"]).all(axis=1)
+
+
+def _muscle_matrix() -> np.ndarray:
+    """(n_exercises, n_muscles) sets credited to each muscle per working set"""
+    matrix = np.zeros((len(EXERCISES), len(MUSCLES)))
+    for e in EXERCISES:
+        matrix[e["id"], [MUSCLE_INDEX[m] for m in e["secondary_muscles"]]] = SECONDARY_SET_SHARE
+        matrix[e["id"], [MUSCLE_INDEX[m] for m in e["primary_muscles"]]] = 1.0
+    return matrix
+
+
+MUSCLE_MATRIX = _muscle_matrix()
+
+
+def _pattern_postings(exercises) -> Dict[str, np.ndarray]:
+    """Movement pattern -> exercise ids in preference order"""
+    postings: Dict[str, List[int]] = {}
+    for e in exercises:
+        postings.setdefault(e["pattern"], []).append(e["id"])
+    return {pattern: np.array(ids) for pattern, ids in postings.items()}
+
+
+# Posting lists: pattern / muscle / equipment -> exercise ids in preference order
+PATTERN_INDEX = _pattern_postings(EXERCISES)
+
+MUSCLE_EXERCISES = {m: np.flatnonzero(MUSCLE_MATRIX[:, i] == 1.0) for m, i in MUSCLE_INDEX.items()}
+EQUIPMENT_EXERCISES = {
+    name: np.flatnonzero(((EQUIPMENT_MASKS & bit) != 0).any(axis=1)) for name, bit in EQUIPMENT_BITS.items()
+}
+
+_NAME_INDEX = {e["name"]: e["id"] for e in EXERCISES}
+
+# Whole synonym phrases (longest first, optional plural s)
+_EQUIPMENT_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(word) for word in sorted(_EQUIPMENT_SYNONYMS, key=len, reverse=True)) + r")s?\b"
+)
+
+
+def equipment_mask(equipment: Optional[List[str]] = None) -> int:
+    """
+    Compile free-text equipment into a bit mask (bodyweight always included)
+
+    No list means a fully equipped gym.
+    """
+    if not equipment:
+        return sum(EQUIPMENT_BITS.values())
+    mask = EQUIPMENT_BITS["bodyweight"]
+    for item in equipment:
+        key = " ".join(re.sub(r"[_\-]", " ", item.lower()).split())
+        phrases = [match.group(1) for match in _EQUIPMENT_PATTERN.finditer(key)]
+        if "home" in phrases:
+            # "home gym" is a home setup, not a commercial gym
+            phrases = [phrase for phrase in phrases if _EQUIPMENT_SYNONYMS[phrase] is not EQUIPMENT]
+        names = {name for phrase in phrases for name in _EQUIPMENT_SYNONYMS[phrase]}
+        mask |= sum(EQUIPMENT_BITS[name] for name in names)
+    return mask
+
+
+def available_mask(available_equipment: int, level: int = 2) -> np.ndarray:
+    """Boolean mask over EXERCISES doable with the equipment at the given level (one vectorized pass)"""
+    fits = ((EQUIPMENT_MASKS & ~available_equipment) == 0).any(axis=1)
+    return fits & (MIN_LEVELS <= level)
+
+
+def lookup_exercise(name: str) -> Optional[Dict]:
+    """Exercise by exact catalog name (case-insensitive)"""
+    idx = _NAME_INDEX.get(" ".join(name.lower().split()))
+    return EXERCISES[idx] if idx is not None else None
@@ -0,0 +1,303 @@
+"""
+Exercise Name Resolution for FitCoach AI
+Maps exercise names from Hevy, free-text logs and the model to integer ids
+
+Names are reduced to a key (lowercase, equipment moved out of Hevy's
+"Name (Equipment)" suffix, abbreviations expanded, plurals dropped) and
+looked up in a precomputed alias table built from the catalog and common
+variants. Keys the table does not hold go through a character-trigram
+index over the same entries, accepting the closest match whose equipment
+agrees with the name. Resolutions are cached, so each distinct name is
+resolved once per process. Names that match nothing are registered with
+an id from CUSTOM_ID_BASE up, so every logged set carries an integer id.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from tools.exercise_catalog import EQUIPMENT_BITS, EXERCISES
+from utils.database import get_connection
+
+
+# Ids of exercises outside the catalog start here (catalog ids are row numbers)
+CUSTOM_ID_BASE = 10_000
+
+# Smallest trigram similarity (Dice coefficient) accepted as a fuzzy match
+MIN_SIMILARITY = 0.6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS custom_exercises (
+    exercise_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+"""
+
+# Name variants -> catalog name (keys are matched after _key, so casing,
+# plurals, hyphens and "(Equipment)" suffixes need no entries of their own)
+_ALIASES = {
+    # Squat and lunge
+    "squat": "barbell back squat", "back squat": "barbell back squat", "barbell squat": "barbell back squat",
+    "high bar squat": "barbell back squat", "low bar squat": "barbell back squat",
+    "barbell front squat": "front squat", "machine hack squat": "hack squat",
+    "dumbbell squat": "goblet squat", "kettlebell squat": "goblet squat", "air squat": "bodyweight squat", "split squat": "bulgarian split squat",
+    "dumbbell bulgarian split squat": "bulgarian split squat", "rear foot elevated split squat": "bulgarian split squat",
+    "lunge": "walking lunge", "dumbbell lunge": "walking lunge", "dumbbell walking lunge": "walking lunge",
+    "dumbbell reverse lunge": "reverse lunge", "dumbbell step up": "step-up", "box step up": "step-up",
+    # Hinge
+    "deadlift": "conventional deadlift", "barbell deadlift": "conventional deadlift",
+    "rdl": "romanian deadlift", "stiff leg deadlift": "romanian deadlift",
+    "single leg rdl": "single-leg romanian deadlift", "dumbbell single leg romanian deadlift": "single-leg romanian deadlift",
+    "barbell hip thrust": "hip thrust", "glute bridge hip thrust": "hip thrust",
+    "russian kettlebell swing": "kettlebell swing", "swing": "kettlebell swing",
+    "hyperextension": "back extension", "back extension hyperextension": "back extension",
+    # Horizontal push
+    "bench": "barbell bench press", "bench press": "barbell bench press", "flat bench": "barbell bench press",
+    "flat bench press": "barbell bench press", "flat barbell bench press": "barbell bench press",
+    "incline bench press": "incline barbell press", "barbell incline bench press": "incline barbell press",
+    "incline bench": "incline barbell press",
+    "dumbbell incline bench press": "incline dumbbell press", "incline dumbbell bench press": "incline dumbbell press",
+    "dumbbell press": "dumbbell bench press", "flat dumbbell press": "dumbbell bench press",
+    "chest press": "machine chest press", "band push up": "band chest press",
+    # Vertical push
+    "barbell overhead press": "overhead press", "military press": "overhead press",
+    "standing press": "overhead press", "shoulder press": "seated dumbbell shoulder press",
+    "dumbbell shoulder press": "seated dumbbell shoulder press",
+    "dumbbell seated shoulder press": "seated dumbbell shoulder press",
+    "dumbbell seated overhead press": "seated dumbbell shoulder press",
+    "kettlebell overhead press": "kettlebell press", "weighted push up": "push-up", "pike pushup": "pike push-up",
+    # Horizontal pull
+    "row": "barbell row", "bent over row": "barbell row", "barbell bent over row": "barbell row",
+    "pendlay row": "barbell row", "cable row": "seated cable row", "cable seated row": "seated cable row",
+    "dumbbell row": "one-arm dumbbell row", "single arm dumbbell row": "one-arm dumbbell row",
+    "one arm row": "one-arm dumbbell row",
+    "dumbbell chest supported row": "chest-supported dumbbell row",
+    "dumbbell chest supported incline row": "chest-supported dumbbell row",
+    "incline dumbbell row": "chest-supported dumbbell row",
+    "bodyweight row": "inverted row", "australian pull up": "inverted row",
+    # Vertical pull
+    "pull up": "pull-up", "chin up": "chin-up", "chin": "chin-up",
+    "weighted pull up": "pull-up", "weighted chin up": "chin-up",
+    "cable lat pulldown": "lat pulldown", "pulldown": "lat pulldown", "pull down": "lat pulldown",
+    "machine assisted pull up": "assisted pull-up", "band assisted pull up": "assisted pull-up",
+    # Chest and shoulder isolation
+    "cable crossover": "cable fly", "cable chest fly": "cable fly", "cable fly crossover": "cable fly",
+    "pec deck butterfly": "pec deck", "butterfly": "pec deck", "machine fly": "pec deck",
+    "dumbbell chest fly": "dumbbell fly", "chest fly": "dumbbell fly",
+    "lateral raise": "dumbbell lateral raise", "side raise": "dumbbell lateral raise",
+    "cable face pull": "face pull", "rope face pull": "face pull",
+    "machine rear delt reverse fly": "reverse pec deck", "rear delt fly": "rear delt dumbbell fly",
+    "dumbbell rear delt reverse fly": "rear delt dumbbell fly", "reverse fly": "rear delt dumbbell fly",
+    # Arms
+    "barbell bicep curl": "barbell curl", "ez bar curl": "barbell curl", "ez bar bicep curl": "barbell curl",
+    "bicep curl": "dumbbell curl", "dumbbell bicep curl": "dumbbell curl", "curl": "dumbbell curl",
+    "dumbbell hammer curl": "hammer curl", "cable bicep curl": "cable curl", "band bicep curl": "band curl",
+    "tricep pushdown": "cable triceps pushdown", "cable tricep pushdown": "cable triceps pushdown",
+    "rope pushdown": "cable triceps pushdown", "tricep rope pushdown": "cable triceps pushdown",
+    "dumbbell tricep extension": "overhead dumbbell triceps extension",
+    "overhead tricep extension": "overhead dumbbell triceps extension",
+    "barbell skull crusher": "skull crusher", "lying tricep extension": "skull crusher",
+    "tricep dip": "dip", "parallel bar dip": "dip", "chest dip": "dip", "weighted dip": "dip",
+    # Legs isolation
+    "machine leg press horizontal": "leg press", "machine leg extension": "leg extension", "leg curl": "lying leg curl", "machine lying leg curl": "lying leg curl",
+    "machine seated leg curl": "seated leg curl", "nordic hamstring curl": "nordic curl",
+    "calf raise": "standing calf raise", "machine standing calf raise": "standing calf raise",
+    "machine seated calf raise": "seated calf raise",
+    # Core and carry
+    "hanging knee raise": "hanging leg raise", "kneeling cable crunch": "cable crunch",
+    "farmer walk": "farmer's carry", "dumbbell farmer walk": "farmer's carry",
+}
+
+# Tokens expanded before lookup
+_ABBREVIATIONS = {
+    "bb": "barbell", "db": "dumbbell", "kb": "kettlebell", "bw": "bodyweight", "ohp": "overhead press",
+    "rdl": "romanian deadlift", "sldl": "stiff leg deadlift", "ez": "ez bar", "ezbar": "ez bar",
+    "pushup": "push up", "pullup": "pull up", "chinup": "chin up", "stepup": "step up",
+    "skullcrusher": "skull crusher", "triceps": "tricep", "biceps": "bicep",
+}
+
+# Equipment words in names -> catalog equipment they require
+_EQUIPMENT_WORDS = {
+    "barbell": "barbell", "dumbbell": "dumbbells", "kettlebell": "kettlebell", "machine": "machines",
+    "cable": "cables", "band": "bands", "smith": "machines",
+}
+
+
+def _key(name: str) -> str:
+    """Lookup key: "Bench Press (Barbell)" -> "barbell bench press", "BB benches" -> "barbell bench" """
+    text = str(name).lower()
+    # Hevy puts equipment or a variant in parentheses after the movement
+    text = re.sub(r"^(.*?)\s*\(([^)]*)\)\s*(.*)$", r"\2 \1 \3", text)
+    text = re.sub(r"[^a-z0-9 ]+", " ", text.replace("'", ""))
+    tokens = []
+    for token in text.split():
+        if token in _ABBREVIATIONS:
+            tokens.extend(_ABBREVIATIONS[token].split())
+            continue
+        if len(token) > 3 and token.endswith(("ches", "shes")):
+            token = token[:-2]
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.extend(_ABBREVIATIONS.get(token, token).split())
+    return " ".join(tokens)
+
+
+def _equipment_required(key: str) -> int:
+    """Bit mask of the equipment a name spells out"""
+    return sum({EQUIPMENT_BITS[_EQUIPMENT_WORDS[w]] for w in key.split() if w in _EQUIPMENT_WORDS})
+
+
+def _fits(exercise_id: int, required: int) -> bool:
+    """Whether one of the exercise's equipment options uses everything the name spells out"""
+    return any(option & required == required for option in EXERCISES[exercise_id]["equipment_options"])
+
+
+def _trigrams(key: str) -> Set[str]:
+    """Character trigrams of the key with its words sorted, so word order does not count"""
+    padded = f"  {' '.join(sorted(key.split()))} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _covers(key: str, entry: str) -> bool:
+    """
+    Whether every word of the name has a counterpart in the entry, and the reverse
+
+    A counterpart is the same word, one containing the other ("dead lift",
+    "pres") or a close spelling with the same first letter ("dumbell"), so
+    a variant word ("sumo", "decline", "arnold") keeps the name off the entry,
+    and a bare "press" stays off "pallof press". Equipment words of the entry
+    need no counterpart; _fits checks the name's equipment.
+    """
+    return _words_matched(key.split(), entry.split()) and _words_matched(
+        [w for w in entry.split() if w not in _EQUIPMENT_WORDS], key.split()
+    )
+
+
+def _words_matched(words: List[str], entry_words: List[str]) -> bool:
+    for word in words:
+        grams = _trigrams(word)
+        if not any(
+            word == other
+            or (min(len(word), len(other)) >= 3 and (word in other or other in word))
+            or (word[0] == other[0] and 2 * len(grams & _trigrams(other)) / (len(grams) + len(_trigrams(other))) >= 0.5)
+            for other in entry_words
+        ):
+            return False
+    return True
+
+
+def _build_alias_index() -> Dict[str, int]:
+    """Key -> catalog id for every catalog name and alias"""
+    by_name = {e["name"]: e["id"] for e in EXERCISES}
+    index = {_key(name): idx for name, idx in by_name.items()}
+    for alias, name in _ALIASES.items():
+        index.setdefault(_key(alias), by_name[name])
+    return index
+
+
+ALIAS_INDEX = _build_alias_index()
+
+# Trigram posting lists over the alias index entries: gram -> entry rows
+_ENTRY_KEYS = list(ALIAS_INDEX)
+_ENTRY_IDS = np.array(list(ALIAS_INDEX.values()), dtype=np.int64)
+_ENTRY_GRAMS = [_trigrams(key) for key in _ENTRY_KEYS]
+_ENTRY_SIZES = np.array([len(grams) for grams in _ENTRY_GRAMS], dtype=np.float64)
+
+
+def _gram_postings() -> Dict[str, np.ndarray]:
+    postings: Dict[str, List[int]] = {}
+    for row, grams in enumerate(_ENTRY_GRAMS):
+        for gram in grams:
+            postings.setdefault(gram, []).append(row)
+    return {gram: np.array(rows, dtype=np.int64) for gram, rows in postings.items()}
+
+
+_GRAM_INDEX = _gram_postings()
+
+
+def _fuzzy_match(key: str) -> Optional[int]:
+    """Catalog id of the most similar alias entry that covers the name's words and equipment"""
+    grams = _trigrams(key)
+    hits = [_GRAM_INDEX[g] for g in grams if g in _GRAM_INDEX]
+    if not hits:
+        return None
+    shared = np.bincount(np.concatenate(hits), minlength=len(_ENTRY_IDS))
+    similarity = 2 * shared / (len(grams) + _ENTRY_SIZES)
+    required = _equipment_required(key)
+    for row in np.argsort(-similarity, kind="stable"):
+        if similarity[row] < MIN_SIMILARITY:
+            return None
+        if _fits(_ENTRY_IDS[row], required) and _covers(key, _ENTRY_KEYS[row]):
+            return int(_ENTRY_IDS[row])
+    return None
+
+
+def match_catalog(name: str) -> Optional[int]:
+    """
+    Catalog id for an exercise name, or None when nothing in the catalog is close
+
+    Tries the alias table, then the key without its equipment words when the
+    catalog exercise can be done with that equipment ("machine leg press"),
+    then the trigram index.
+    """
+    key = _key(name)
+    if not key:
+        return None
+    if key in ALIAS_INDEX:
+        return ALIAS_INDEX[key]
+    required = _equipment_required(key)
+    if required:
+        bare = " ".join(w for w in key.split() if w not in _EQUIPMENT_WORDS)
+        idx = ALIAS_INDEX.get(bare)
+        if idx is not None and _fits(idx, required):
+            return idx
+    return _fuzzy_match(key)
+
+
+@lru_cache(maxsize=8192)
+def resolve_exercise(name: str) -> Tuple[int, str]:
+    """
+    Integer id and canonical name of an exercise (cached per distinct name)
+
+    Names outside the catalog keep their lowercased, single-spaced form and
+    get a stable custom id.
+    """
+    idx = match_catalog(name)
+    if idx is not None:
+        return idx, EXERCISES[idx]["name"]
+    custom = " ".join(str(name).lower().split())
+    return _custom_id(custom), custom
+
+
+def _custom_id(name: str) -> int:
+    """Id of a non-catalog exercise, registering it on first sight"""
+    conn = get_connection(_SCHEMA)
+    row = conn.execute("SELECT exercise_id FROM custom_exercises WHERE name = ?", (name,)).fetchone()
+    if row:
+        return row[0]
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO custom_exercises (exercise_id, name) "
+            "SELECT MAX(COALESCE(MAX(exercise_id), 0) + 1, ?), ? FROM custom_exercises",
+            (CUSTOM_ID_BASE, name)
+        )
+    return conn.execute("SELECT exercise_id FROM custom_exercises WHERE name = ?", (name,)).fetchone()[0]
+
+
+@lru_cache(maxsize=8192)
+def exercise_name(exercise_id: int) -> str:
+    """Canonical name of an exercise id"""
+    if 0 <= exercise_id < len(EXERCISES):
+        return EXERCISES[exercise_id]["name"]
+    row = get_connection(_SCHEMA).execute(
+        "SELECT name FROM custom_exercises WHERE exercise_id = ?", (int(exercise_id),)
+    ).fetchone()
+    return row[0] if row else f"exercise {exercise_id}"
+
+
+def exercise_ids(names: np.ndarray) -> np.ndarray:
+    """Integer id per element of a name column, resolving each distinct name once"""
+    distinct, inverse = np.unique(np.asarray(names).astype(str), return_inverse=True)
+    ids = np.fromiter((resolve_exercise(n)[0] for n in distinct), dtype=np.int64, count=len(distinct))
+    return ids[inverse]
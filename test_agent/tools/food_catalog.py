@@ -0,0 +1,417 @@
+"""
+Food Catalog for FitCoach AI
+Local nutrient table used by the meal planner and local calorie lookups
+"""
+import re
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+# Nutrient columns of NUTRIENT_MATRIX (values per 100g)
+NUTRIENT_COLUMNS = ["calories", "protein", "carbs", "fats"]
+
+# Meal slots a food can appear in: B=breakfast, L=lunch, D=dinner, S=snack
+_SLOT_CODES = {"B": "breakfast", "L": "lunch", "D": "dinner", "S": "snack"}
+
+# name, Romanian name, kcal, protein, carbs, fats (per 100g, as eaten),
+# category, roles, slots, min grams, max grams, allergens, grams per piece
+# Non-starchy vegetables can fill the carb role so low-carb meals stay solvable
+_FOOD_ROWS = [
+    # Poultry, meat, fish
+    ("chicken breast", "Piept de pui", 165, 31.0, 0.0, 3.6, "poultry", ("protein",), "LD", 100, 250, (), 150),
+    ("chicken thigh", "Pulpă de pui", 209, 26.0, 0.0, 10.9, "poultry", ("protein",), "LD", 100, 250, (), 120),
+    ("turkey breast", "Piept de curcan", 135, 30.0, 0.0, 1.0, "poultry", ("protein",), "LD", 100, 250, (), 150),
+    ("beef", "Carne de vită", 217, 26.0, 0.0, 12.0, "meat", ("protein",), "LD", 100, 220, (), None),
+    ("pork tenderloin", "Mușchi de porc", 143, 26.0, 0.0, 3.5, "meat", ("protein",), "LD", 100, 220, ("pork",), None),
+    ("bacon", "Bacon", 541, 37.0, 1.4, 42.0, "meat", ("side",), "B", 15, 50, ("pork",), 10),
+    ("salmon", "Somon", 206, 22.0, 0.0, 12.0, "fish", ("protein",), "LD", 100, 220, ("fish",), 125),
+    ("tuna", "Ton", 116, 26.0, 0.0, 0.8, "fish", ("protein",), "LD", 80, 200, ("fish",), None),
+    ("cod", "Cod", 105, 23.0, 0.0, 0.9, "fish", ("protein",), "LD", 120, 250, ("fish",), None),
+    ("shrimp", "Creveți", 99, 24.0, 0.2, 0.3, "shellfish", ("protein",), "LD", 100, 250, ("shellfish",), None),
+    # Eggs and dairy
+    ("egg", "Ouă", 143, 12.6, 0.7, 9.5, "egg", ("protein",), "BL", 50, 200, ("eggs",), 50),
+    ("egg white", "Albușuri", 52, 11.0, 0.7, 0.2, "egg", ("protein",), "B", 60, 250, ("eggs",), 33),
+    ("greek yogurt", "Iaurt grecesc", 59, 10.0, 3.6, 0.4, "dairy", ("protein", "snack"), "BS", 100, 300, ("dairy",), None),
+    ("cottage cheese", "Brânză de vaci", 98, 11.0, 3.4, 4.3, "dairy", ("protein", "snack"), "BS", 100, 250, ("dairy",), None),
+    ("whey protein", "Proteină whey", 400, 80.0, 8.0, 6.0, "dairy", ("protein", "snack"), "BS", 20, 50, ("dairy",), 30),
+    ("feta cheese", "Telemea", 264, 14.0, 4.1, 21.0, "dairy", ("side",), "BL", 20, 60, ("dairy",), None),
+    ("cheddar cheese", "Cașcaval", 403, 25.0, 1.3, 33.0, "dairy", ("side", "snack"), "BS", 20, 50, ("dairy",), None),
+    ("milk", "Lapte", 61, 3.2, 4.8, 3.3, "dairy", ("side",), "B", 100, 300, ("dairy",), None),
+    ("butter", "Unt", 717, 0.9, 0.1, 81.0, "dairy", ("side",), "B", 5, 20, ("dairy",), None),
+    # Plant proteins and legumes
+    ("tofu", "Tofu", 144, 17.0, 3.0, 9.0, "legume", ("protein",), "BLD", 100, 250, ("soy",), None),
+    ("tempeh", "Tempeh", 192, 20.0, 8.0, 11.0, "legume", ("protein",), "LD", 80, 200, ("soy",), None),
+    ("lentils", "Linte", 116, 9.0, 20.0, 0.4, "legume", ("protein", "carb"), "LD", 100, 300, (), None),
+    ("chickpeas", "Năut", 164, 8.9, 27.0, 2.6, "legume", ("protein", "carb"), "LD", 100, 250, (), None),
+    ("beans", "Fasole", 132, 8.9, 24.0, 0.5, "legume", ("protein", "carb"), "LD", 100, 250, (), None),
+    ("soy milk", "Lapte de soia", 54, 3.3, 6.0, 1.8, "legume", ("side",), "B", 100, 300, ("soy",), None),
+    ("hummus", "Humus", 166, 7.9, 14.0, 9.6, "legume", ("side", "snack"), "LS", 30, 100, ("sesame",), None),
+    # Grains and starches
+    ("oats", "Ovăz", 389, 16.9, 66.0, 6.9, "grain", ("carb",), "B", 30, 100, ("gluten",), None),
+    ("whole wheat bread", "Pâine integrală", 247, 13.0, 41.0, 3.4, "grain", ("carb",), "BL", 30, 120, ("gluten",), 30),
+    ("rice", "Orez", 130, 2.7, 28.0, 0.3, "grain", ("carb",), "LD", 80, 300, (), None),
+    ("brown rice", "Orez brun", 123, 2.7, 26.0, 1.0, "grain", ("carb",), "LD", 80, 300, (), None),
+    ("pasta", "Paste", 158, 5.8, 31.0, 0.9, "grain", ("carb",), "LD", 80, 300, ("gluten",), None),
+    ("quinoa", "Quinoa", 120, 4.4, 21.0, 1.9, "grain", ("carb",), "LD", 80, 300, (), None),
+    ("buckwheat", "Hrișcă", 92, 3.4, 20.0, 0.6, "grain", ("carb",), "LD", 80, 300, (), None),
+    ("polenta", "Mămăligă", 85, 1.9, 18.0, 0.4, "grain", ("carb",), "LD", 100, 350, (), None),
+    ("potato", "Cartofi", 87, 1.9, 20.0, 0.1, "starch", ("carb",), "LD", 100, 400, (), 150),
+    ("sweet potato", "Cartofi dulci", 90, 2.0, 21.0, 0.2, "starch", ("carb",), "LD", 100, 400, (), 150),
+    # Fruit
+    ("banana", "Banană", 89, 1.1, 23.0, 0.3, "fruit", ("carb", "snack"), "BS", 80, 200, (), 120),
+    ("apple", "Măr", 52, 0.3, 14.0, 0.2, "fruit", ("snack",), "S", 100, 250, (), 180),
+    ("orange", "Portocală", 47, 0.9, 12.0, 0.1, "fruit", ("snack",), "S", 100, 250, (), 150),
+    ("blueberries", "Afine", 57, 0.7, 14.0, 0.3, "fruit", ("carb", "snack"), "BS", 50, 200, (), None),
+    ("strawberries", "Căpșuni", 32, 0.7, 7.7, 0.3, "fruit", ("carb", "snack"), "BS", 80, 250, (), 12),
+    # Vegetables
+    ("broccoli", "Broccoli", 35, 2.4, 7.2, 0.4, "vegetable", ("carb", "side"), "LD", 80, 300, (), None),
+    ("spinach", "Spanac", 23, 2.9, 3.6, 0.4, "vegetable", ("carb", "side"), "BLD", 50, 250, (), None),
+    ("lettuce", "Salată verde", 15, 1.4, 2.9, 0.2, "vegetable", ("carb", "side"), "LD", 50, 250, (), None),
+    ("tomato", "Roșii", 18, 0.9, 3.9, 0.2, "vegetable", ("carb", "side"), "BLD", 80, 300, (), 120),
+    ("cucumber", "Castraveți", 15, 0.7, 3.6, 0.1, "vegetable", ("carb", "side"), "BLD", 80, 300, (), 200),
+    ("bell pepper", "Ardei", 31, 1.0, 6.0, 0.3, "vegetable", ("carb", "side"), "BLD", 80, 250, (), 150),
+    ("zucchini", "Dovlecel", 17, 1.2, 3.1, 0.3, "vegetable", ("carb", "side"), "LD", 100, 300, (), 200),
+    ("green beans", "Fasole verde", 31, 1.8, 7.0, 0.2, "vegetable", ("carb", "side"), "LD", 100, 300, (), None),
+    ("mushrooms", "Ciuperci", 22, 3.1, 3.3, 0.3, "vegetable", ("carb", "side"), "BLD", 80, 250, (), None),
+    ("cauliflower", "Conopidă", 25, 1.9, 5.0, 0.3, "vegetable", ("carb", "side"), "LD", 100, 300, (), None),
+    ("carrot", "Morcovi", 41, 0.9, 10.0, 0.2, "vegetable", ("carb", "side", "snack"), "LDS", 80, 200, (), 60),
+    # Fats, nuts, seeds
+    ("avocado", "Avocado", 160, 2.0, 8.5, 14.7, "fat", ("side",), "BLD", 50, 150, (), 150),
+    ("olive oil", "Ulei de măsline", 884, 0.0, 0.0, 100.0, "fat", ("side",), "LD", 5, 20, (), None),
+    ("walnuts", "Nuci", 654, 15.0, 14.0, 65.0, "nut", ("side", "snack"), "BS", 15, 40, ("nuts",), None),
+    ("almonds", "Migdale", 579, 21.0, 22.0, 50.0, "nut", ("side", "snack"), "BS", 15, 40, ("nuts",), None),
+    ("peanut butter", "Unt de arahide", 588, 25.0, 20.0, 50.0, "nut", ("side", "snack"), "BS", 15, 40, ("peanuts",), None),
+    ("chia seeds", "Semințe de chia", 486, 17.0, 42.0, 31.0, "seed", ("side",), "B", 10, 30, (), None),
+    ("pumpkin seeds", "Semințe de dovleac", 559, 30.0, 11.0, 49.0, "seed", ("snack",), "S", 15, 40, (), None),
+    # Plant milks (unsweetened), their own rows so they never resolve to dairy milk
+    ("almond milk", "Lapte de migdale", 15, 0.6, 0.3, 1.2, "nut", ("side",), "B", 100, 300, ("nuts",), None),
+    ("oat milk", "Lapte de ovăz", 46, 1.0, 6.7, 1.5, "grain", ("side",), "B", 100, 300, ("gluten",), None),
+    ("rice milk", "Lapte de orez", 47, 0.3, 9.2, 1.0, "grain", ("side",), "B", 100, 300, (), None),
+]
+
+
+def _build_foods(rows) -> List[Dict]:
+    """Expand the compact row table into food dictionaries"""
+    foods = []
+    for idx, row in enumerate(rows):
+        (name, name_ro, kcal, protein, carbs, fats, category,
+         roles, slots, min_g, max_g, allergens, piece_g) = row
+        foods.append({
+            "id": idx,
+            "name": name,
+            "name_ro": name_ro,
+            "calories": kcal,
+            "protein": protein,
+            "carbs": carbs,
+            "fats": fats,
+            "category": category,
+            "roles": list(roles),
+            "slots": [_SLOT_CODES[code] for code in slots],
+            "portion_range_g": (min_g, max_g),
+            "allergens": list(allergens),
+            "grams_per_piece": piece_g
+        })
+    return foods
+
+
+FOODS = _build_foods(_FOOD_ROWS)
+
+# Vectorized views over the catalog, row i == FOODS[i]
+NUTRIENT_MATRIX = np.array([[f[col] for col in NUTRIENT_COLUMNS] for f in FOODS], dtype=np.float64)
+PORTION_BOUNDS = np.array([f["portion_range_g"] for f in FOODS], dtype=np.float64)
+
+_NAME_INDEX = {f["name"]: f["id"] for f in FOODS}
+
+# Preparation, size, colour and variety words that qualify a food without changing
+# what it is; dropped before a catalog lookup
+QUALIFIER_WORDS = {
+    "cooked", "raw", "grilled", "fried", "baked", "boiled", "smoked", "steamed", "roasted", "fresh", "frozen",
+    "whole", "sliced", "diced", "chopped", "shredded", "organic", "large", "small", "medium", "baby", "cherry",
+    "red", "green", "yellow", "white", "fillet", "fillets", "pack", "leftover", "leftovers", "of", "and", "with",
+}
+
+# "<plant> milk" is never dairy milk; unlisted ones stay unknown instead
+_PLANT_MILK = re.compile(r"\b(almond|oat|rice|soy|soya|coconut|cashew|hazelnut|hemp|pea|macadamia|plant)\s+milk\b")
+
+# Categories each diet preference excludes
+_DIET_EXCLUDED_CATEGORIES = {
+    "vegan": {"poultry", "meat", "fish", "shellfish", "egg", "dairy"},
+    "vegetarian": {"poultry", "meat", "fish", "shellfish"},
+    "pescatarian": {"poultry", "meat"},
+    "paleo": {"grain", "legume", "dairy"},
+}
+
+# Free-text restriction keywords -> allergen tags they exclude
+_RESTRICTION_KEYWORDS = {
+    "dairy": "dairy", "lactose": "dairy", "lactoza": "dairy", "milk": "dairy",
+    "gluten": "gluten", "wheat": "gluten", "celiac": "gluten",
+    "peanut": "peanuts", "arahide": "peanuts",
+    "nut": "nuts", "nuci": "nuts",
+    "egg": "eggs", "oua": "eggs",
+    "fish": "fish", "peste": "fish",
+    "shellfish": "shellfish", "seafood": "shellfish", "crustacean": "shellfish",
+    "soy": "soy", "soia": "soy",
+    "sesame": "sesame", "susan": "sesame",
+    "pork": "pork", "porc": "pork", "halal": "pork",
+}
+
+# Free-text restriction keywords that name a whole diet
+_DIET_KEYWORDS = {
+    "vegan": "vegan", "plant based": "vegan", "plant-based": "vegan",
+    "vegetarian": "vegetarian", "pescatarian": "pescatarian",
+    "keto": "keto", "low carb": "keto", "low-carb": "keto", "paleo": "paleo",
+}
+
+
+def is_keto_compatible(food: Dict) -> bool:
+    """Low-carb foods plus nuts, seeds and pure fats (mostly fiber / fat)"""
+    return food["carbs"] <= 10 or food["category"] in ("nut", "seed", "fat")
+
+
+def parse_restrictions(restrictions: Optional[List[str]]) -> Tuple[Set[str], Set[str]]:
+    """
+    Map free-text restrictions to structured tags
+    Examples:
+        ["no dairy", "gluten-free"] -> (set(), {"dairy", "gluten"})
+        ["vegetarian", "nut allergy"] -> ({"vegetarian"}, {"nuts", "peanuts"})
+        ["tree nut allergy"] -> (set(), {"nuts"})
+
+    Returns:
+        (diets, allergens) tuple of tag sets
+    """
+    diets = set()
+    allergens = set()
+    for restriction in restrictions or []:
+        text = ''.join(c for c in unicodedata.normalize('NFKD', restriction.lower())
+                       if not unicodedata.combining(c))
+        for keyword, diet in _DIET_KEYWORDS.items():
+            if keyword in text:
+                diets.add(diet)
+        for keyword, allergen in _RESTRICTION_KEYWORDS.items():
+            # Word-start match, so "peanut" does not also trigger "nut"
+            if re.search(rf"\b{keyword}", text):
+                allergens.add(allergen)
+        # A plain "no nuts" usually means peanuts too; only "tree nut" keeps them
+        if "nuts" in allergens and "tree" not in text:
+            allergens.add("peanuts")
+    return diets, allergens
+
+
+# Restriction index bit layout: allergen bits mean "contains", diet bits
+# mean "compatible with". Recipes reuse the same layout (OR of allergens,
+# AND of diet compatibility over their ingredients).
+ALLERGEN_TAGS = ["dairy", "gluten", "nuts", "peanuts", "eggs", "fish", "shellfish", "soy", "sesame", "pork"]
+DIET_TAGS = ["vegan", "vegetarian", "pescatarian", "keto", "paleo"]
+TAG_BITS = {tag: 1 << i for i, tag in enumerate(ALLERGEN_TAGS + DIET_TAGS)}
+ALL_DIET_BITS = sum(TAG_BITS[d] for d in DIET_TAGS)
+
+
+def _diet_compatible(food: Dict, diet: str) -> bool:
+    """Check a single food against a whole-diet tag"""
+    if food["category"] in _DIET_EXCLUDED_CATEGORIES.get(diet, set()):
+        return False
+    if diet == "keto" and not is_keto_compatible(food):
+        return False
+    if diet == "paleo" and ("peanuts" in food["allergens"] or "soy" in food["allergens"]):
+        return False
+    return True
+
+
+def food_tag_bits(food: Dict) -> int:
+    """Pack a food's allergens and diet compatibility into one integer"""
+    bits = 0
+    for allergen in food["allergens"]:
+        bits |= TAG_BITS[allergen]
+    for diet in DIET_TAGS:
+        if _diet_compatible(food, diet):
+            bits |= TAG_BITS[diet]
+    return bits
+
+
+def combine_tag_bits(ingredient_bits) -> int:
+    """Tag bits of a dish: any ingredient's allergen, only diets all ingredients fit"""
+    allergens = 0
+    diets = ALL_DIET_BITS
+    for bits in ingredient_bits:
+        allergens |= bits & ~ALL_DIET_BITS
+        diets &= bits
+    return allergens | (diets & ALL_DIET_BITS)
+
+
+# Precomputed restriction index, FOOD_TAG_BITS[i] describes FOODS[i]
+FOOD_TAG_BITS = np.array([food_tag_bits(f) for f in FOODS], dtype=np.uint32)
+
+
+# Common foods outside the catalog, tagged only for restriction checks:
+# name words, category, allergens, keto-compatible
+_UNLISTED_FOOD_ROWS = [
+    (("ham", "prosciutto", "salami", "pepperoni", "chorizo", "sausage", "pork", "pork chop", "lard"),
+     "meat", ("pork",), True),
+    (("steak", "lamb", "veal", "mince", "minced meat", "ground beef", "meat", "meatball", "jerky", "hot dog"),
+     "meat", (), True),
+    (("chicken", "turkey", "duck", "chicken wing", "chicken nugget"), "poultry", (), True),
+    (("fish", "sardine", "mackerel", "trout", "anchovy", "anchovies", "herring", "tilapia", "fish stick"),
+     "fish", ("fish",), True),
+    (("crab", "lobster", "prawn", "mussel", "oyster", "clam", "squid", "scallop"), "shellfish", ("shellfish",), True),
+    (("cheese", "mozzarella", "parmesan", "cream cheese", "cream", "sour cream", "yogurt", "yoghurt", "kefir",
+      "ghee"), "dairy", ("dairy",), True),
+    (("ice cream", "milk chocolate", "pudding"), "dairy", ("dairy",), False),
+    (("mayonnaise", "mayo"), "egg", ("eggs",), True),
+    (("bread", "flour", "noodle", "tortilla", "bagel", "cereal", "cracker", "couscous", "croissant", "pizza",
+      "lasagna", "cake", "cookie", "biscuit", "beer"), "grain", ("gluten",), False),
+    (("peanut", "peanuts"), "nut", ("peanuts",), True),
+    (("nuts", "cashew", "pistachio", "hazelnut", "pecan", "macadamia", "nutella"), "nut", ("nuts",), True),
+    (("soy sauce", "edamame", "soy"), "legume", ("soy",), True),
+    (("tahini", "sesame"), "seed", ("sesame",), True),
+]
+
+
+def _tag_phrase_index() -> Dict[str, int]:
+    """Food phrase (and its plural) -> tag bits, catalog names first"""
+    index = {}
+    for food, bits in zip(FOODS, FOOD_TAG_BITS.tolist()):
+        index[food["name"]] = bits
+    for words, category, allergens, keto in _UNLISTED_FOOD_ROWS:
+        probe = {"category": category, "allergens": list(allergens), "carbs": 0 if keto else 100}
+        for phrase in words:
+            index.setdefault(phrase, food_tag_bits(probe))
+    for phrase in list(index):
+        index.setdefault(phrase + "s", index[phrase])
+        index.setdefault(phrase + "es", index[phrase])
+    return index
+
+
+_TAG_PHRASES = _tag_phrase_index()
+_MAX_TAG_PHRASE_WORDS = max(len(phrase.split()) for phrase in _TAG_PHRASES)
+
+
+def name_tag_bits(names: List[str]) -> np.ndarray:
+    """
+    Tag bits of free-text food names for restriction checks
+
+    Each name is split into the longest known food phrases (catalog names
+    and common unlisted foods such as ham or ice cream), whose bits combine
+    like a dish's ingredients ("butter chicken" -> dairy, not vegetarian).
+    A name with any word that is neither a known food nor a qualifier gets
+    -1 (unverified), so unknown items never pass a restriction filter.
+
+    Returns:
+        int64 array aligned with names
+    """
+    bits = np.full(len(names), -1, dtype=np.int64)
+    for i, name in enumerate(names):
+        tokens = re.findall(r"[a-z]+", name.lower())
+        parts = []
+        j = 0
+        while j < len(tokens):
+            for size in range(min(_MAX_TAG_PHRASE_WORDS, len(tokens) - j), 0, -1):
+                phrase = " ".join(tokens[j:j + size])
+                if phrase in _TAG_PHRASES:
+                    parts.append(_TAG_PHRASES[phrase])
+                    j += size
+                    break
+            else:
+                if tokens[j] not in QUALIFIER_WORDS:
+                    break
+                j += 1
+        else:
+            if parts:
+                bits[i] = combine_tag_bits(parts)
+    return bits
+
+
+def restriction_masks(
+    diet_preference: Optional[str] = None,
+    restrictions: Optional[List[str]] = None
+) -> Tuple[int, int]:
+    """
+    Compile a diet and free-text restrictions into bit masks
+
+    Returns:
+        (required, forbidden) - diet bits an item must have, allergen bits it must not
+    """
+    diets, allergens = parse_restrictions(restrictions)
+    if diet_preference and diet_preference.lower() in TAG_BITS:
+        diets.add(diet_preference.lower())
+    required = sum(TAG_BITS[d] for d in diets if d in TAG_BITS)
+    forbidden = sum(TAG_BITS[a] for a in allergens)
+    return required, forbidden
+
+
+def allowed_by_bits(bits: np.ndarray, required: int, forbidden: int) -> np.ndarray:
+    """Filter any tag-bit array with one vectorized AND per mask"""
+    return ((bits & required) == required) & ((bits & forbidden) == 0)
+
+
+def allowed_food_mask(
+    diet_preference: Optional[str] = None,
+    restrictions: Optional[List[str]] = None
+) -> np.ndarray:
+    """
+    Boolean mask over FOODS of items compatible with a diet and restrictions
+
+    Args:
+        diet_preference: 'balanced', 'keto', 'vegan', 'vegetarian', 'paleo'
+        restrictions: Free-text restrictions (e.g., ['dairy', 'no nuts'])
+
+    Returns:
+        numpy bool array aligned with FOODS / NUTRIENT_MATRIX
+    """
+    return allowed_by_bits(FOOD_TAG_BITS, *restriction_masks(diet_preference, restrictions))
+
+
+def lookup_food(food_name: str, exact: bool = False) -> Optional[Dict]:
+    """
+    Find a catalog food by its canonical English name
+    Tolerates plurals and preparation words ("grilled chicken breast", "eggs").
+    Pass non-English names through nutrition_tools.normalize_food_name first.
+
+    Args:
+        food_name: Canonical English food name
+        exact: Accept only the name itself or its plural, with qualifier
+            words dropped ("salmon fillet", "cherry tomatoes", but not "orange
+            juice" or "apple pie"), for keys that must keep different items apart
+
+    Returns:
+        Food dictionary or None if the food is not in the local catalog
+    """
+    # Notes in parentheses ("chicken breast (raw)") never name the food
+    key = " ".join(re.sub(r"\([^)]*\)", " ", food_name.lower()).split())
+    stripped = " ".join(word for word in key.split() if word not in QUALIFIER_WORDS)
+    if not stripped:
+        return None
+
+    # The full name first, so "whole wheat bread" is not read as "wheat bread"
+    for text in (key, stripped):
+        candidates = [text]
+        if text.endswith("es"):
+            candidates.append(text[:-2])
+        if text.endswith("s"):
+            candidates.append(text[:-1])
+        for candidate in candidates:
+            if candidate in _NAME_INDEX:
+                return FOODS[_NAME_INDEX[candidate]]
+    if exact:
+        return None
+    key = stripped
+
+    # Fall back to the longest catalog name contained in the query
+    best = None
+    padded = f" {key} "
+    plant_milk = _PLANT_MILK.search(key) is not None
+    for name, idx in _NAME_INDEX.items():
+        if plant_milk and name == "milk":
+            continue
+        if f" {name} " in padded or f" {name}s " in padded:
+            if best is None or len(name) > len(FOODS[best]["name"]):
+                best = idx
+    if best is not None:
+        return FOODS[best]
+
+    # Generic query ("chicken", "cheese") - take the first catalog variant
+    for name, idx in _NAME_INDEX.items():
+        if name.startswith(f"{key} ") or name.endswith(f" {key}"):
+            return FOODS[idx]
+    return None
@@ -0,0 +1,208 @@
+"""
+Fridge Inventory Store for FitCoach AI
+Per-user fridge contents persisted across turns, ordered by expiry date
+
+Items come from analyze_fridge photos and from manual edits. The
+(user_id, expiry_date) B-tree index serves "expiring soon" and "expired"
+as range scans - O(log n) to seek plus one step per returned item.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from utils.database import get_connection
+
+
+# Estimated shelf life (days) of a freshly stocked item by analyze_fridge category
+SHELF_LIFE_DAYS = {
+    "protein": 3,
+    "dairy": 7,
+    "vegetables": 5,
+    "fruits": 6,
+    "carbs": 30,
+    "fats": 30,
+    "other": 14
+}
+
+# Food catalog category -> inventory category
+CATALOG_CATEGORIES = {
+    "poultry": "protein", "meat": "protein", "fish": "protein", "shellfish": "protein",
+    "egg": "protein", "legume": "protein", "dairy": "dairy", "grain": "carbs",
+    "starch": "carbs", "fruit": "fruits", "vegetable": "vegetables", "fat": "fats",
+    "nut": "fats", "seed": "fats"
+}
+
+# Vision freshness labels cap the estimate
+FRESHNESS_MAX_DAYS = {
+    "fresh": None,
+    "consume_soon": 2,
+    "check_expiry": 1
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fridge_items (
+    user_id TEXT NOT NULL,
+    item_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    quantity TEXT,
+    category TEXT,
+    calories_per_serving REAL,
+    expiry_date TEXT NOT NULL,
+    expiry_estimated INTEGER NOT NULL DEFAULT 1,
+    source TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, item_key)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_fridge_items_expiry ON fridge_items (user_id, expiry_date);
+"""
+
+
+def _item_key(name: str) -> str:
+    """Lookup key for an item name (callers pass nutrition_tools.canonical_food_key)"""
+    return " ".join(name.lower().split())
+
+
+def estimate_expiry(category: Optional[str], freshness: Optional[str] = None, today: Optional[date] = None) -> str:
+    """
+    Estimated expiry date for an item stocked today
+
+    Returns:
+        ISO date string
+    """
+    today = today or date.today()
+    days = SHELF_LIFE_DAYS.get((category or "other").lower(), SHELF_LIFE_DAYS["other"])
+    cap = FRESHNESS_MAX_DAYS.get((freshness or "fresh").lower())
+    if cap is not None:
+        days = min(days, cap)
+    return (today + timedelta(days=days)).isoformat()
+
+
+def parse_expiry(value) -> Optional[str]:
+    """ISO date string of an expiry date given as YYYY-MM-DD (or a date), None when it is not one"""
+    if isinstance(value, date):
+        return value.isoformat()
+    try:
+        return date.fromisoformat(str(value).strip()).isoformat()
+    except ValueError:
+        return None
+
+
+def record_items(user_id: str, items: List[Dict], source: str = "photo") -> int:
+    """
+    Merge items into the user's inventory
+
+    Args:
+        user_id: Inventory owner
+        items: Dictionaries with name and optional quantity, category,
+            calories_per_serving, freshness and expiry_date (ISO)
+        source: "photo" or "manual"
+
+    Explicit expiry dates always win over estimates; one that is not an ISO
+    date is dropped and the item gets an estimate. Re-photographing an item
+    keeps the earlier estimate, so a carton that sits in the fridge does not
+    get a fresh shelf life every time it is seen.
+
+    Returns:
+        Number of items written
+    """
+    rows = []
+    for item in items:
+        name = (item.get("name") or "").strip()
+        if not name:
+            continue
+        explicit = parse_expiry(item["expiry_date"]) if item.get("expiry_date") else None
+        rows.append((
+            user_id,
+            _item_key(item.get("key") or name),
+            name,
+            item.get("quantity"),
+            item.get("category"),
+            item.get("calories_per_serving"),
+            explicit or estimate_expiry(item.get("category"), item.get("freshness")),
+            0 if explicit else 1,
+            source
+        ))
+
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO fridge_items (user_id, item_key, name, quantity, category,
+                calories_per_serving, expiry_date, expiry_estimated, source, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            ON CONFLICT (user_id, item_key) DO UPDATE SET
+                quantity = COALESCE(excluded.quantity, quantity),
+                category = COALESCE(excluded.category, category),
+                calories_per_serving = COALESCE(excluded.calories_per_serving, calories_per_serving),
+                expiry_date = CASE
+                    WHEN excluded.expiry_estimated = 0 THEN excluded.expiry_date
+                    WHEN expiry_estimated = 0 THEN expiry_date
+                    ELSE MIN(expiry_date, excluded.expiry_date)
+                END,
+                expiry_estimated = MIN(expiry_estimated, excluded.expiry_estimated),
+                source = excluded.source,
+                updated_at = excluded.updated_at
+            """,
+            rows
+        )
+    return len(rows)
+
+
+def remove_items(user_id: str, keys: List[str]) -> int:
+    """Remove used-up items by key; returns how many were found"""
+    conn = get_connection(_SCHEMA)
+    with conn:
+        cursor = conn.executemany(
+            "DELETE FROM fridge_items WHERE user_id = ? AND item_key = ?",
+            [(user_id, _item_key(key)) for key in keys]
+        )
+    return cursor.rowcount
+
+
+def _row_to_item(row, today: date) -> Dict:
+    """Format a stored row for tool output (an unreadable expiry date gets days_left None)"""
+    expiry = parse_expiry(row["expiry_date"])
+    return {
+        "name": row["name"],
+        "quantity": row["quantity"],
+        "category": row["category"],
+        "calories_per_serving": row["calories_per_serving"],
+        "expiry_date": row["expiry_date"],
+        "expiry_estimated": bool(row["expiry_estimated"]),
+        "days_left": (date.fromisoformat(expiry) - today).days if expiry else None,
+        "source": row["source"]
+    }
+
+
+def get_inventory(user_id: str, today: Optional[date] = None) -> List[Dict]:
+    """All items, soonest expiry first (index order, no sort step)"""
+    today = today or date.today()
+    rows = get_connection(_SCHEMA).execute(
+        "SELECT * FROM fridge_items WHERE user_id = ? ORDER BY expiry_date",
+        (user_id,)
+    ).fetchall()
+    return [_row_to_item(r, today) for r in rows]
+
+
+def get_expiring(user_id: str, within_days: int = 3, today: Optional[date] = None) -> List[Dict]:
+    """Items expiring today or within the next `within_days` days"""
+    today = today or date.today()
+    rows = get_connection(_SCHEMA).execute(
+        """
+        SELECT * FROM fridge_items
+        WHERE user_id = ? AND expiry_date BETWEEN ? AND ?
+        ORDER BY expiry_date
+        """,
+        (user_id, today.isoformat(), (today + timedelta(days=within_days)).isoformat())
+    ).fetchall()
+    return [_row_to_item(r, today) for r in rows]
+
+
+def get_expired(user_id: str, today: Optional[date] = None) -> List[Dict]:
+    """Items past their expiry date"""
+    today = today or date.today()
+    rows = get_connection(_SCHEMA).execute(
+        "SELECT * FROM fridge_items WHERE user_id = ? AND expiry_date < ? ORDER BY expiry_date",
+        (user_id, today.isoformat())
+    ).fetchall()
+    return [_row_to_item(r, today) for r in rows]
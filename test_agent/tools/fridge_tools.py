@@ -3,36 +3,115 @@ Fridge Analysis Tools for FitCoach AI
 Analyzes fridge contents from photos and suggests meals
 """
 import os
-import base64
-from typing import Dict, List, Optional
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from openai import OpenAI
-from pathlib import Path
 import json
 
+import numpy as np
 
-def analyze_fridge(image_path: str, remaining_calories: Optional[int] = None) -> Dict:
+from tools import fridge_inventory, nutrition_ledger
+from tools.food_catalog import allowed_by_bits, lookup_food, name_tag_bits, restriction_masks
+from tools.recipe_index import match_recipes
+from tools.nutrition_tools import canonical_food_key, normalize_food_name, parse_amount
+from utils import prefetch
+from utils.vision import extract_json, image_content_part
+
+
+# Photos per vision request; larger uploads are split into parallel requests
+MAX_PHOTOS_PER_REQUEST = 6
+
+# Freshness labels from least to most urgent
+_FRESHNESS_ORDER = {"fresh": 0, "consume_soon": 1, "check_expiry": 2}
+
+# Items this close to expiry are preferred in meal suggestions
+EXPIRING_PRIORITY_DAYS = 2
+
+# Suggestion cache: one pool of candidates per (inventory, calorie bucket,
+# meal type, restrictions) so "another idea" is served without a new call
+SUGGESTION_POOL_SIZE = 4
+SUGGESTION_CALORIE_BUCKET = 100
+SUGGESTION_CACHE_SIZE = 256
+SUGGESTION_CACHE_TTL_SECONDS = 3600
+
+_suggestion_cache: "OrderedDict[str, Dict]" = OrderedDict()
+_suggestion_lock = threading.Lock()
+
+
+def _ledger_remaining_calories(user_id: str) -> Optional[int]:
+    """Today's remaining budget from the nutrition ledger (None if unknown)"""
+    try:
+        remaining = nutrition_ledger.get_remaining_calories(user_id)
+        if remaining is not None:
+            print(f"📒 [LEDGER] {remaining} calories remaining today")
+        return remaining
+    except Exception as e:
+        print(f"⚠️ [LEDGER] Could not read nutrition ledger: {str(e)}")
+        return None
+
+
+def _save_inventory(user_id: str, analysis: Dict) -> Dict:
+    """Merge a successful analysis into the persistent fridge inventory"""
+    try:
+        items = [
+            dict(food, key=canonical_food_key(food.get('name') or ''))
+            for food in analysis.get("foods", [])
+        ]
+        saved = fridge_inventory.record_items(user_id, items, source="photo")
+        analysis["inventory_saved"] = saved
+        print(f"🗄️ [FRIDGE_ANALYSIS] Saved {saved} items to the fridge inventory")
+    except Exception as e:
+        print(f"⚠️ [FRIDGE_ANALYSIS] Could not save fridge inventory: {str(e)}")
+    return analysis
+
+
+def analyze_fridge(
+    image_path: Optional[str] = None,
+    remaining_calories: Optional[int] = None,
+    image_paths: Optional[List[str]] = None,
+    user_id: str = "default"
+) -> Dict:
     """
     Analyze fridge contents from photo using OpenAI Vision API
+    Several photos (shelves, door, freezer) go into a single vision request, or
+    parallel requests above MAX_PHOTOS_PER_REQUEST, and are merged into one
+    deduplicated inventory. Identified items are saved to the user's fridge inventory.
+    A speculative analysis started at upload time is joined instead of re-run.
     
     Args:
         image_path: Path to fridge photo
         remaining_calories: Optional - how many calories user has left for the day
+            (read from the nutrition ledger when omitted)
+        image_paths: Optional - paths of several photos of the same fridge
+        user_id: Ledger and inventory owner (injected by the agent)
     
     Returns:
         Dictionary with identified foods, quantities, and nutritional estimates
     """
-    print(f"\n🔍 [FRIDGE_ANALYSIS] Analyzing fridge contents from: {image_path}")
+    paths = list(image_paths or [])
+    if image_path:
+        paths.insert(0, image_path)
+    paths = list(dict.fromkeys(paths))
+    print(f"\n🔍 [FRIDGE_ANALYSIS] Analyzing fridge contents from: {', '.join(paths)}")
+    
+    if remaining_calories is None:
+        remaining_calories = _ledger_remaining_calories(user_id)
     
     try:
-        # Check if file exists
-        if not os.path.exists(image_path):
-            print(f"❌ [FRIDGE_ANALYSIS] Image file not found: {image_path}")
+        # Check if files exist
+        missing = [path for path in paths if not os.path.exists(path)]
+        if missing or not paths:
+            print(f"❌ [FRIDGE_ANALYSIS] Image file not found: {', '.join(missing)}")
             return {
                 "success": False,
                 "error": "Image file not found",
                 "foods": [],
-                "notes": f"File does not exist: {image_path}"
+                "notes": f"File does not exist: {', '.join(missing)}" if missing else "No image provided"
             }
         
         # Get OpenAI API key
@@ -46,41 +125,85 @@ def analyze_fridge(image_path: str, remaining_calories: Optional[int] = None) ->
                 "notes": "Please set OPENAI_API_KEY in .env file"
             }
         
-        # Encode image to base64
-        print("📸 [FRIDGE_ANALYSIS] Encoding fridge photo...")
-        with open(image_path, "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode('utf-8')
+        # Join the analysis speculatively started at upload time, if any
+        hit, result = prefetch.take(("analyze_fridge", tuple(paths)))
+        if not hit:
+            result = _analyze_fridge_images(api_key, paths, remaining_calories)
         
-        # Determine image format
-        file_extension = Path(image_path).suffix.lower()
-        mime_type = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp'
-        }.get(file_extension, 'image/jpeg')
+        if len(paths) > 1:
+            result["photos_analyzed"] = len(paths)
+        if result.get("success"):
+            result = _save_inventory(user_id, result)
+        return result
         
-        # Initialize OpenAI client
-        client = OpenAI(api_key=api_key)
-        
-        print("🤖 [FRIDGE_ANALYSIS] Calling OpenAI Vision API for food identification...")
-        
-        # Build prompt based on whether calories were provided
-        calorie_context = ""
-        if remaining_calories:
-            calorie_context = f"\n\nIMPORTANT: The user has {remaining_calories} calories remaining for today. Keep this in mind for meal suggestions."
-        
-        # Call OpenAI Vision API
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": f"""Analyze this refrigerator photo and identify all visible food items.
+    except Exception as e:
+        print(f"❌ [FRIDGE_ANALYSIS] Error analyzing fridge: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e),
+            "foods": [],
+            "notes": f"Analysis failed: {str(e)}"
+        }
+
+
+def prefetch_fridge_analysis(image_paths: List[str], user_id: str = "default") -> Optional[Tuple]:
+    """Start the fridge vision stage in the background; saving still happens in analyze_fridge"""
+    paths = list(dict.fromkeys(image_paths))
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key or not paths or not all(os.path.exists(path) for path in paths):
+        return None
+    key = ("analyze_fridge", tuple(paths))
+    prefetch.submit(key, _analyze_fridge_images, api_key, paths, _ledger_remaining_calories(user_id))
+    return key
+
+
+def _analyze_fridge_images(api_key: str, paths: List[str], remaining_calories: Optional[int]) -> Dict:
+    """Vision stage of analyze_fridge: one request per batch of photos, merged"""
+    # Initialize OpenAI client
+    client = OpenAI(api_key=api_key)
+    
+    batches = [paths[i:i + MAX_PHOTOS_PER_REQUEST] for i in range(0, len(paths), MAX_PHOTOS_PER_REQUEST)]
+    if len(batches) == 1:
+        result = _analyze_fridge_batch(client, batches[0], remaining_calories)
+        # The prompt asks for each item once; the merge makes sure of it
+        return _merge_fridge_results([result], remaining_calories) if result.get("success") else result
+    
+    print(f"📸 [FRIDGE_ANALYSIS] {len(paths)} photos -> {len(batches)} parallel requests")
+    with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+        results = list(pool.map(lambda batch: _analyze_fridge_batch_safe(client, batch, remaining_calories), batches))
+    return _merge_fridge_results(results, remaining_calories)
+
+
+def _analyze_fridge_batch(client: OpenAI, image_paths: List[str], remaining_calories: Optional[int]) -> Dict:
+    """
+    One vision request over one or more photos of the same fridge
+    
+    Returns:
+        analyze_fridge result dictionary (not yet saved to the inventory)
+    """
+    photo_context = "this refrigerator photo"
+    dedup_context = ""
+    if len(image_paths) > 1:
+        photo_context = f"these {len(image_paths)} photos of the same refrigerator (shelves, door, freezer)"
+        dedup_context = "\nList every item ONCE even if it is visible in several photos, with the total quantity across photos."
+    
+    print(f"🤖 [FRIDGE_ANALYSIS] Calling OpenAI Vision API for food identification ({len(image_paths)} photo(s))...")
+    
+    # Build prompt based on whether calories were provided
+    calorie_context = ""
+    if remaining_calories:
+        calorie_context = f"\n\nIMPORTANT: The user has {remaining_calories} calories remaining for today. Keep this in mind for meal suggestions."
+    
+    # Call OpenAI Vision API
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": f"""Analyze {photo_context} and identify all visible food items.{dedup_context}
 
 CRITICAL INSTRUCTIONS:
 - Return ONLY raw JSON, no markdown formatting
@@ -124,54 +247,86 @@ Return your response as pure JSON with this EXACT structure:
 }}
 
 REMEMBER: Output must be pure JSON only, no markdown, no code blocks, no formatting."""
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:{mime_type};base64,{image_data}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=2000,  # Increased even more to ensure complete JSON
-            temperature=0.3  # Lower temperature for more consistent output
-        )
+                    },
+                    *[image_content_part(path) for path in image_paths]
+                ]
+            }
+        ],
+        max_tokens=min(2000 + 1000 * (len(image_paths) - 1), 4000),  # Room for complete JSON across photos
+        temperature=0.3  # Lower temperature for more consistent output
+    )
+    
+    # Parse response
+    result_text = response.choices[0].message.content
+    print(f"✅ [FRIDGE_ANALYSIS] Received response from OpenAI Vision API")
+    print(f"📄 [FRIDGE_ANALYSIS] Full response length: {len(result_text)} characters")
+    
+    # Try to parse JSON from response
+    try:
+        # Extract JSON if it's wrapped in markdown code blocks
+        if "```json" in result_text:
+            json_start = result_text.find("```json") + 7
+            json_end = result_text.find("```", json_start)
+            if json_end == -1:  # No closing backticks, try to find end of JSON
+                json_end = len(result_text)
+            result_text = result_text[json_start:json_end].strip()
+        elif "```" in result_text:
+            json_start = result_text.find("```") + 3
+            json_end = result_text.find("```", json_start)
+            if json_end == -1:
+                json_end = len(result_text)
+            result_text = result_text[json_start:json_end].strip()
+        
+        # Remove any trailing incomplete data
+        # Find the last complete closing brace
+        last_brace = result_text.rfind('}')
+        if last_brace != -1:
+            result_text = result_text[:last_brace + 1]
+        
+        print(f"🔍 [FRIDGE_ANALYSIS] Attempting to parse JSON ({len(result_text)} chars)")
+        analysis = json.loads(result_text)
+        
+        # Print summary
+        print(f"📊 [FRIDGE_ANALYSIS] Found {len(analysis.get('foods', []))} food items")
+        for food in analysis.get('foods', [])[:5]:  # Print first 5
+            print(f"  ✓ {food.get('name')}: {food.get('quantity')} ({food.get('category')})")
         
-        # Parse response
-        result_text = response.choices[0].message.content
-        print(f"✅ [FRIDGE_ANALYSIS] Received response from OpenAI Vision API")
-        print(f"📄 [FRIDGE_ANALYSIS] Full response length: {len(result_text)} characters")
+        return {
+            "success": True,
+            "foods": analysis.get("foods", []),
+            "inventory_summary": analysis.get("inventory_summary", {}),
+            "meal_potential": analysis.get("meal_potential", []),
+            "missing_staples": analysis.get("missing_staples", []),
+            "notes": analysis.get("notes", ""),
+            "remaining_calories": remaining_calories,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except json.JSONDecodeError as e:
+        print(f"⚠️ [FRIDGE_ANALYSIS] Could not parse JSON: {e}")
+        print(f"📄 Raw response preview: {result_text[:300]}...")
+        print(f"📄 Last 100 chars: ...{result_text[-100:]}")
         
-        # Try to parse JSON from response
+        # Try to salvage partial data by fixing common issues
         try:
-            # Extract JSON if it's wrapped in markdown code blocks
-            if "```json" in result_text:
-                json_start = result_text.find("```json") + 7
-                json_end = result_text.find("```", json_start)
-                if json_end == -1:  # No closing backticks, try to find end of JSON
-                    json_end = len(result_text)
-                result_text = result_text[json_start:json_end].strip()
-            elif "```" in result_text:
-                json_start = result_text.find("```") + 3
-                json_end = result_text.find("```", json_start)
-                if json_end == -1:
-                    json_end = len(result_text)
-                result_text = result_text[json_start:json_end].strip()
+            # Strategy 1: Try to complete incomplete JSON by adding closing braces
+            # Count opening vs closing braces
+            open_braces = result_text.count('{')
+            close_braces = result_text.count('}')
+            open_brackets = result_text.count('[')
+            close_brackets = result_text.count(']')
             
-            # Remove any trailing incomplete data
-            # Find the last complete closing brace
-            last_brace = result_text.rfind('}')
-            if last_brace != -1:
-                result_text = result_text[:last_brace + 1]
+            fixed_text = result_text
+            # Add missing closing brackets
+            if open_brackets > close_brackets:
+                fixed_text += ']' * (open_brackets - close_brackets)
+            # Add missing closing braces
+            if open_braces > close_braces:
+                fixed_text += '}' * (open_braces - close_braces)
             
-            print(f"🔍 [FRIDGE_ANALYSIS] Attempting to parse JSON ({len(result_text)} chars)")
-            analysis = json.loads(result_text)
-            
-            # Print summary
-            print(f"📊 [FRIDGE_ANALYSIS] Found {len(analysis.get('foods', []))} food items")
-            for food in analysis.get('foods', [])[:5]:  # Print first 5
-                print(f"  ✓ {food.get('name')}: {food.get('quantity')} ({food.get('category')})")
+            print(f"🔧 [FRIDGE_ANALYSIS] Attempting to fix JSON with {open_braces - close_braces} missing braces")
+            analysis = json.loads(fixed_text)
+            print(f"✅ [FRIDGE_ANALYSIS] Successfully parsed fixed JSON with {len(analysis.get('foods', []))} foods")
             
             return {
                 "success": True,
@@ -183,125 +338,208 @@ REMEMBER: Output must be pure JSON only, no markdown, no code blocks, no formatt
                 "remaining_calories": remaining_calories,
                 "timestamp": datetime.now().isoformat()
             }
-            
-        except json.JSONDecodeError as e:
-            print(f"⚠️ [FRIDGE_ANALYSIS] Could not parse JSON: {e}")
-            print(f"📄 Raw response preview: {result_text[:300]}...")
-            print(f"📄 Last 100 chars: ...{result_text[-100:]}")
-            
-            # Try to salvage partial data by fixing common issues
+        except:
+            # Strategy 2: Extract just the foods array if main JSON fails
             try:
-                # Strategy 1: Try to complete incomplete JSON by adding closing braces
-                # Count opening vs closing braces
-                open_braces = result_text.count('{')
-                close_braces = result_text.count('}')
-                open_brackets = result_text.count('[')
-                close_brackets = result_text.count(']')
-                
-                fixed_text = result_text
-                # Add missing closing brackets
-                if open_brackets > close_brackets:
-                    fixed_text += ']' * (open_brackets - close_brackets)
-                # Add missing closing braces
-                if open_braces > close_braces:
-                    fixed_text += '}' * (open_braces - close_braces)
-                
-                print(f"🔧 [FRIDGE_ANALYSIS] Attempting to fix JSON with {open_braces - close_braces} missing braces")
-                analysis = json.loads(fixed_text)
-                print(f"✅ [FRIDGE_ANALYSIS] Successfully parsed fixed JSON with {len(analysis.get('foods', []))} foods")
-                
-                return {
-                    "success": True,
-                    "foods": analysis.get("foods", []),
-                    "inventory_summary": analysis.get("inventory_summary", {}),
-                    "meal_potential": analysis.get("meal_potential", []),
-                    "missing_staples": analysis.get("missing_staples", []),
-                    "notes": analysis.get("notes", ""),
-                    "remaining_calories": remaining_calories,
-                    "timestamp": datetime.now().isoformat()
-                }
-            except:
-                # Strategy 2: Extract just the foods array if main JSON fails
-                try:
-                    if '"foods"' in result_text:
-                        foods_start = result_text.find('"foods"')
-                        # Find the opening bracket
-                        bracket_start = result_text.find('[', foods_start)
-                        if bracket_start != -1:
-                            # Find matching closing bracket
-                            bracket_count = 0
-                            for i in range(bracket_start, len(result_text)):
-                                if result_text[i] == '[':
-                                    bracket_count += 1
-                                elif result_text[i] == ']':
-                                    bracket_count -= 1
-                                    if bracket_count == 0:
-                                        foods_json = result_text[bracket_start:i+1]
-                                        foods = json.loads(foods_json)
-                                        print(f"✅ [FRIDGE_ANALYSIS] Recovered {len(foods)} foods from partial JSON")
-                                        return {
-                                            "success": True,
-                                            "foods": foods,
-                                            "inventory_summary": {},
-                                            "meal_potential": [],
-                                            "missing_staples": [],
-                                            "notes": "Partial data recovered from incomplete response",
-                                            "remaining_calories": remaining_calories,
-                                            "timestamp": datetime.now().isoformat()
-                                        }
-                except Exception as inner_e:
-                    print(f"⚠️ [FRIDGE_ANALYSIS] Recovery also failed: {inner_e}")
-            
-            return {
-                "success": False,
-                "raw_analysis": result_text,
-                "foods": [],
-                "notes": f"JSON parsing failed: {str(e)}. Please try again or use a clearer photo.",
-                "remaining_calories": remaining_calories,
-                "timestamp": datetime.now().isoformat()
-            }
+                if '"foods"' in result_text:
+                    foods_start = result_text.find('"foods"')
+                    # Find the opening bracket
+                    bracket_start = result_text.find('[', foods_start)
+                    if bracket_start != -1:
+                        # Find matching closing bracket
+                        bracket_count = 0
+                        for i in range(bracket_start, len(result_text)):
+                            if result_text[i] == '[':
+                                bracket_count += 1
+                            elif result_text[i] == ']':
+                                bracket_count -= 1
+                                if bracket_count == 0:
+                                    foods_json = result_text[bracket_start:i+1]
+                                    foods = json.loads(foods_json)
+                                    print(f"✅ [FRIDGE_ANALYSIS] Recovered {len(foods)} foods from partial JSON")
+                                    return {
+                                        "success": True,
+                                        "foods": foods,
+                                        "inventory_summary": {},
+                                        "meal_potential": [],
+                                        "missing_staples": [],
+                                        "notes": "Partial data recovered from incomplete response",
+                                        "remaining_calories": remaining_calories,
+                                        "timestamp": datetime.now().isoformat()
+                                    }
+            except Exception as inner_e:
+                print(f"⚠️ [FRIDGE_ANALYSIS] Recovery also failed: {inner_e}")
         
-    except Exception as e:
-        print(f"❌ [FRIDGE_ANALYSIS] Error analyzing fridge: {str(e)}")
         return {
             "success": False,
-            "error": str(e),
+            "raw_analysis": result_text,
             "foods": [],
-            "notes": f"Analysis failed: {str(e)}"
+            "notes": f"JSON parsing failed: {str(e)}. Please try again or use a clearer photo.",
+            "remaining_calories": remaining_calories,
+            "timestamp": datetime.now().isoformat()
         }
 
 
+def _analyze_fridge_batch_safe(client: OpenAI, image_paths: List[str], remaining_calories: Optional[int]) -> Dict:
+    """Parallel variant - a failed batch becomes an error result instead of failing the merge"""
+    try:
+        return _analyze_fridge_batch(client, image_paths, remaining_calories)
+    except Exception as e:
+        print(f"❌ [FRIDGE_ANALYSIS] Batch {', '.join(image_paths)} failed: {str(e)}")
+        return {"success": False, "error": str(e), "foods": [], "notes": ""}
+
+
+def _merge_fridge_results(results: List[Dict], remaining_calories: Optional[int]) -> Dict:
+    """
+    Merge per-request analyses into one inventory
+    Items are deduplicated by canonical food key; quantities seen in different
+    photos are joined and the least fresh label wins.
+    """
+    merged: "OrderedDict[str, Dict]" = OrderedDict()
+    for result in results:
+        for food in result.get("foods", []):
+            key = canonical_food_key(food.get('name') or '')
+            if key not in merged:
+                merged[key] = dict(food)
+                continue
+            item = merged[key]
+            quantities = (item.get('quantity') or "").split(" + ")
+            if food.get('quantity') and food['quantity'] not in quantities:
+                item['quantity'] = " + ".join(q for q in quantities + [food['quantity']] if q)
+            if _FRESHNESS_ORDER.get(food.get('freshness'), 0) > _FRESHNESS_ORDER.get(item.get('freshness'), 0):
+                item['freshness'] = food['freshness']
+    
+    foods = list(merged.values())
+    categories = [(food.get('category') or 'other').lower() for food in foods]
+    found = set(merged)
+    missing_staples = []
+    for result in results:
+        for staple in result.get("missing_staples", []):
+            if canonical_food_key(staple) not in found and staple not in missing_staples:
+                missing_staples.append(staple)
+    meal_potential = []
+    for result in results:
+        meal_potential.extend(m for m in result.get("meal_potential", []) if m not in meal_potential)
+    failed = [r for r in results if not r.get("success")]
+    
+    return {
+        "success": len(failed) < len(results),
+        "foods": foods,
+        "inventory_summary": {
+            "total_items": len(foods),
+            "proteins": categories.count("protein"),
+            "carbs": categories.count("carbs"),
+            "vegetables": categories.count("vegetables"),
+            "dairy": categories.count("dairy")
+        },
+        "meal_potential": meal_potential,
+        "missing_staples": missing_staples,
+        "notes": " ".join(dict.fromkeys(r.get("notes") for r in results if r.get("notes")))
+        + (f" {len(failed)} of {len(results)} photo batches could not be analyzed." if failed else ""),
+        "remaining_calories": remaining_calories,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def _stored_inventory(user_id: str) -> List[Dict]:
+    """Saved fridge inventory in analyze_fridge food format (expired items left out)"""
+    try:
+        return [item for item in fridge_inventory.get_inventory(user_id) if (item["days_left"] or 0) >= 0]
+    except Exception as e:
+        print(f"⚠️ [MEAL_SUGGESTION] Could not read fridge inventory: {str(e)}")
+        return []
+
+
+def _catalog_ids(foods: List[Dict]) -> np.ndarray:
+    """
+    Catalog id of each fridge item (-1 when the food is not in the local catalog)
+
+    Only exact catalog keys count, so an item cannot stand in for a
+    different recipe ingredient ("orange juice" is not an orange).
+    """
+    return np.array([
+        (lookup_food(canonical_food_key(food.get('name') or ''), exact=True) or {"id": -1})["id"]
+        for food in foods
+    ], dtype=np.int64)
+
+
+def _is_expiring(food: Dict) -> bool:
+    """Item from the inventory store or a photo that should be used first"""
+    days_left = food.get('days_left')
+    if days_left is not None:
+        return days_left <= EXPIRING_PRIORITY_DAYS
+    return food.get('freshness') in ("consume_soon", "check_expiry")
+
+
+def _filter_restricted_foods(
+    foods: List[Dict],
+    dietary_restrictions: Optional[List[str]]
+) -> Tuple[List[Dict], List[str], List[str]]:
+    """
+    Drop fridge items that violate the restrictions using the food tag bitset index
+    Items the index cannot classify are held back as unverified rather than
+    allowed, so an unknown allergen never reaches a suggestion.
+    
+    Returns:
+        (allowed foods, names of excluded foods, names of unverified foods)
+    """
+    required, forbidden = restriction_masks(None, dietary_restrictions)
+    if not required and not forbidden:
+        return foods, [], []
+    
+    bits = name_tag_bits([normalize_food_name(food.get('name') or '') for food in foods])
+    known = bits >= 0
+    keep = np.zeros(len(foods), dtype=bool)
+    keep[known] = allowed_by_bits(bits[known], required, forbidden)
+    
+    allowed = [food for food, ok in zip(foods, keep) if ok]
+    excluded = [food.get('name') for food, ok, k in zip(foods, keep, known) if k and not ok]
+    unverified = [food.get('name') for food, k in zip(foods, known) if not k]
+    return allowed, excluded, unverified
+
+
 def suggest_meal_from_fridge(
-    fridge_contents: Dict,
-    remaining_calories: int,
+    fridge_contents: Optional[Dict] = None,
+    remaining_calories: Optional[int] = None,
     dietary_restrictions: Optional[List[str]] = None,
-    meal_type: Optional[str] = None
+    meal_type: Optional[str] = None,
+    creative: bool = False,
+    user_id: str = "default"
 ) -> Dict:
     """
     Suggest meal based on fridge contents and calorie budget
+    Matches the local recipe index first (computed macros, no API call);
+    the LLM is only used for creative requests or when no recipe fits.
     
     Args:
         fridge_contents: Dictionary from analyze_fridge() with food inventory
-        remaining_calories: How many calories user has left
+            (the saved fridge inventory is used when omitted)
+        remaining_calories: How many calories user has left (read from the
+            nutrition ledger when omitted)
         dietary_restrictions: Optional list (e.g., ["no dairy", "vegetarian"])
         meal_type: Optional - "breakfast", "lunch", "dinner", or "snack"
+        creative: Ask the LLM for an original recipe instead of the recipe index
+        user_id: Ledger and inventory owner (injected by the agent)
     
     Returns:
         Dictionary with meal suggestion, recipe, and macros
     """
-    print(f"\n🍳 [MEAL_SUGGESTION] Generating meal for {remaining_calories} calories")
-    
-    try:
-        # Get OpenAI API key
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+    if remaining_calories is None:
+        remaining_calories = _ledger_remaining_calories(user_id)
+        if remaining_calories is None:
             return {
                 "success": False,
-                "error": "OpenAI API key not configured"
+                "error": "Unknown calorie budget",
+                "suggestion": "Ask the user for their remaining calories or save a daily target with set_calorie_target"
             }
-        
+    
+    print(f"\n🍳 [MEAL_SUGGESTION] Generating meal for {remaining_calories} calories")
+    
+    try:
         # Extract food list from fridge contents
-        foods = fridge_contents.get("foods", [])
+        foods = (fridge_contents or {}).get("foods", [])
+        if not foods:
+            foods = _stored_inventory(user_id)
         if not foods:
             print("⚠️ [MEAL_SUGGESTION] No foods found in fridge contents")
             return {
@@ -310,46 +548,202 @@ def suggest_meal_from_fridge(
                 "suggestion": "Please analyze your fridge first or go shopping!"
             }
         
-        # Build food inventory string
-        food_list = "\n".join([
-            f"- {food.get('name')}: {food.get('quantity')} ({food.get('category')})"
-            for food in foods
-        ])
-        
-        # Build constraints
-        constraints = []
-        if remaining_calories:
-            constraints.append(f"Maximum {remaining_calories} calories")
-        if dietary_restrictions:
-            constraints.append(f"Dietary restrictions: {', '.join(dietary_restrictions)}")
-        if meal_type:
-            constraints.append(f"Meal type: {meal_type}")
+        # Apply restrictions locally so excluded items never reach the prompt
+        foods, excluded_foods, unverified_foods = _filter_restricted_foods(foods, dietary_restrictions)
+        if excluded_foods:
+            print(f"🚫 [MEAL_SUGGESTION] Excluded for restrictions: {', '.join(excluded_foods)}")
+        if unverified_foods:
+            print(f"❔ [MEAL_SUGGESTION] Not verified against restrictions: {', '.join(unverified_foods)}")
+        if not foods:
+            return {
+                "success": False,
+                "error": "No fridge items fit the dietary restrictions",
+                "excluded_for_restrictions": excluded_foods,
+                "unverified_for_restrictions": unverified_foods
+            }
         
-        constraints_text = "\n".join(constraints) if constraints else "No specific constraints"
+        cache_key = _suggestion_cache_key(foods, remaining_calories, meal_type, dietary_restrictions, creative)
+        candidate = _next_cached_candidate(cache_key)
+        if candidate is None:
+            pool = None if creative else _recipe_candidates(foods, remaining_calories, meal_type, dietary_restrictions)
+            if not pool:
+                if not creative:
+                    print("📚 [MEAL_SUGGESTION] No indexed recipe fits, asking the LLM")
+                api_key = os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    return {
+                        "success": False,
+                        "error": "No matching recipe and OpenAI API key not configured"
+                    }
+                pool = _llm_candidates(api_key, foods, remaining_calories, dietary_restrictions, meal_type)
+                if isinstance(pool, str):
+                    return {
+                        "success": True,
+                        "raw_suggestion": pool,
+                        "notes": "Meal suggestion provided (JSON parsing failed)"
+                    }
+            candidate = _store_candidates(cache_key, pool)
+        else:
+            print(f"⚡ [MEAL_SUGGESTION] Served from cache: {candidate['meal'].get('meal_name')}")
         
-        print(f"🤖 [MEAL_SUGGESTION] Calling OpenAI for meal suggestion...")
+        meal = candidate["meal"]
+        total_calories = meal.get('total_calories', 0)
+        print(f"🍽️ [MEAL_SUGGESTION] Suggested: {meal.get('meal_name')}")
+        print(f"   Calories: {total_calories} / {remaining_calories}")
         
-        # Initialize OpenAI client
-        client = OpenAI(api_key=api_key)
+        return {
+            "success": True,
+            "meal": meal,
+            "calories_remaining_after": remaining_calories - total_calories,
+            "fits_budget": total_calories <= remaining_calories,
+            "uses_expiring": candidate.get("uses_expiring", []),
+            "other_ideas_ready": candidate["pool_remaining"],
+            "excluded_for_restrictions": excluded_foods,
+            "unverified_for_restrictions": unverified_foods,
+            "source": candidate["source"],
+            "from_cache": candidate["from_cache"],
+            "timestamp": datetime.now().isoformat()
+        }
         
-        # Call OpenAI for meal suggestion
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Cheaper model for text generation
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a creative nutrition chef who creates delicious, healthy meals from available ingredients while respecting calorie budgets and dietary restrictions."
-                },
-                {
-                    "role": "user",
-                    "content": f"""Create a meal suggestion using ONLY these available ingredients:
+    except Exception as e:
+        print(f"❌ [MEAL_SUGGESTION] Error: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+def _suggestion_cache_key(
+    foods: List[Dict],
+    remaining_calories: int,
+    meal_type: Optional[str],
+    dietary_restrictions: Optional[List[str]],
+    creative: bool
+) -> str:
+    """Canonical hash of everything a suggestion depends on"""
+    inventory = sorted(
+        (canonical_food_key(food.get('name') or ''), bool(_is_expiring(food)))
+        for food in foods
+    )
+    payload = json.dumps({
+        "inventory": inventory,
+        "calorie_bucket": int(remaining_calories) // SUGGESTION_CALORIE_BUCKET,
+        "meal_type": meal_type,
+        "restrictions": sorted(r.strip().lower() for r in dietary_restrictions or []),
+        "creative": creative
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _next_cached_candidate(cache_key: str) -> Optional[Dict]:
+    """
+    Next unserved candidate of a cached pool
+    Recipe pools wrap around; an exhausted LLM pool is dropped so a fresh batch is generated.
+    """
+    with _suggestion_lock:
+        entry = _suggestion_cache.get(cache_key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["created"] > SUGGESTION_CACHE_TTL_SECONDS:
+            del _suggestion_cache[cache_key]
+            return None
+        if entry["served"] >= len(entry["pool"]):
+            if entry["source"] == "llm":
+                del _suggestion_cache[cache_key]
+                return None
+            entry["served"] = 0
+        _suggestion_cache.move_to_end(cache_key)
+        candidate = entry["pool"][entry["served"]]
+        entry["served"] += 1
+        return dict(candidate, source=entry["source"], from_cache=True,
+                    pool_remaining=len(entry["pool"]) - entry["served"])
+
+
+def _store_candidates(cache_key: str, pool: List[Dict]) -> Dict:
+    """Cache a fresh pool and return its first candidate"""
+    source = pool[0]["source"]
+    with _suggestion_lock:
+        _suggestion_cache[cache_key] = {
+            "pool": pool, "served": 1, "source": source, "created": time.monotonic()
+        }
+        _suggestion_cache.move_to_end(cache_key)
+        while len(_suggestion_cache) > SUGGESTION_CACHE_SIZE:
+            _suggestion_cache.popitem(last=False)
+    return dict(pool[0], from_cache=False, pool_remaining=len(pool) - 1)
+
+
+def _recipe_candidates(
+    foods: List[Dict],
+    remaining_calories: int,
+    meal_type: Optional[str],
+    dietary_restrictions: Optional[List[str]]
+) -> List[Dict]:
+    """Ranked matches from the local recipe index"""
+    ids = _catalog_ids(foods)
+    expiring = np.array([_is_expiring(food) for food in foods], dtype=bool)
+    required, forbidden = restriction_masks(None, dietary_restrictions)
+    matches = match_recipes(
+        ids[ids >= 0], remaining_calories, meal_type, required, forbidden,
+        priority_ids=ids[(ids >= 0) & expiring], limit=SUGGESTION_POOL_SIZE
+    )
+    if matches:
+        print(f"📚 [MEAL_SUGGESTION] Recipe index: {len(matches)} matches, best {matches[0]['meal']['meal_name']}")
+    return [dict(match, source="recipe_index") for match in matches]
+
+
+def _llm_candidates(
+    api_key: str,
+    foods: List[Dict],
+    remaining_calories: int,
+    dietary_restrictions: Optional[List[str]],
+    meal_type: Optional[str]
+):
+    """
+    Several distinct meal ideas from one LLM call
+
+    Returns:
+        List of candidates, or the raw reply text when it is not valid JSON
+    """
+    # Build food inventory string
+    food_list = "\n".join([
+        f"- {food.get('name')}: {food.get('quantity')} ({food.get('category')})"
+        for food in foods
+    ])
+    
+    # Build constraints
+    constraints = []
+    if remaining_calories:
+        constraints.append(f"Maximum {remaining_calories} calories")
+    if dietary_restrictions:
+        constraints.append(f"Dietary restrictions: {', '.join(dietary_restrictions)}")
+    if meal_type:
+        constraints.append(f"Meal type: {meal_type}")
+    
+    constraints_text = "\n".join(constraints) if constraints else "No specific constraints"
+    
+    print(f"🤖 [MEAL_SUGGESTION] Calling OpenAI for {SUGGESTION_POOL_SIZE} meal suggestions...")
+    
+    # Initialize OpenAI client
+    client = OpenAI(api_key=api_key)
+    
+    # One call fills the whole pool for follow-up "another idea" requests
+    response = client.chat.completions.create(
+        model="gpt-4o-mini",  # Cheaper model for text generation
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a creative nutrition chef who creates delicious, healthy meals from available ingredients while respecting calorie budgets and dietary restrictions."
+            },
+            {
+                "role": "user",
+                "content": f"""Create {SUGGESTION_POOL_SIZE} clearly different meal suggestions using ONLY these available ingredients:
 
 {food_list}
 
 Constraints:
 {constraints_text}
 
-Provide:
+For each meal provide:
 1. Meal name
 2. Ingredients with exact quantities to use
 3. Step-by-step cooking instructions
@@ -359,69 +753,49 @@ Provide:
 
 Format as JSON:
 {{
-    "meal_name": "<creative name>",
-    "ingredients": [
-        {{"item": "<name>", "amount": "<quantity>", "calories": <number>}}
-    ],
-    "instructions": ["<step 1>", "<step 2>", ...],
-    "total_calories": <number>,
-    "macros": {{
-        "protein_g": <number>,
-        "carbs_g": <number>,
-        "fats_g": <number>
-    }},
-    "prep_time_minutes": <number>,
-    "tips": "<cooking tips>"
+    "meals": [
+        {{
+            "meal_name": "<creative name>",
+            "ingredients": [
+                {{"item": "<name>", "amount": "<quantity>", "calories": <number>}}
+            ],
+            "instructions": ["<step 1>", "<step 2>", ...],
+            "total_calories": <number>,
+            "macros": {{
+                "protein_g": <number>,
+                "carbs_g": <number>,
+                "fats_g": <number>
+            }},
+            "prep_time_minutes": <number>,
+            "tips": "<cooking tips>"
+        }}
+    ]
 }}
 
 REMEMBER: Output must be pure JSON only, no markdown, no code blocks, no formatting."""
-                }
-            ],
-            temperature=0.8,  # More creative
-            max_tokens=800
-        )
-        
-        result_text = response.choices[0].message.content
-        print("✅ [MEAL_SUGGESTION] Received meal suggestion")
-        
-        # Parse JSON
-        try:
-            if "```json" in result_text:
-                json_start = result_text.find("```json") + 7
-                json_end = result_text.find("```", json_start)
-                result_text = result_text[json_start:json_end].strip()
-            elif "```" in result_text:
-                json_start = result_text.find("```") + 3
-                json_end = result_text.find("```", json_start)
-                result_text = result_text[json_start:json_end].strip()
-            
-            meal = json.loads(result_text)
-            
-            print(f"🍽️ [MEAL_SUGGESTION] Suggested: {meal.get('meal_name')}")
-            print(f"   Calories: {meal.get('total_calories')} / {remaining_calories}")
-            print(f"   Macros: P:{meal.get('macros', {}).get('protein_g')}g C:{meal.get('macros', {}).get('carbs_g')}g F:{meal.get('macros', {}).get('fats_g')}g")
-            
-            return {
-                "success": True,
-                "meal": meal,
-                "calories_remaining_after": remaining_calories - meal.get('total_calories', 0),
-                "fits_budget": meal.get('total_calories', 0) <= remaining_calories,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-        except json.JSONDecodeError:
-            return {
-                "success": True,
-                "raw_suggestion": result_text,
-                "notes": "Meal suggestion provided (JSON parsing failed)"
             }
-        
-    except Exception as e:
-        print(f"❌ [MEAL_SUGGESTION] Error: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+        ],
+        temperature=0.8,  # More creative
+        max_tokens=800 * SUGGESTION_POOL_SIZE
+    )
+    
+    result_text = response.choices[0].message.content
+    print("✅ [MEAL_SUGGESTION] Received meal suggestions")
+    
+    try:
+        parsed = extract_json(result_text)
+    except json.JSONDecodeError:
+        return result_text
+    
+    meals = parsed.get("meals") or ([parsed] if parsed.get("meal_name") else [])
+    # Totals as numbers ("520 kcal" -> 520); ideas without a readable total are dropped
+    totals = [parse_amount(meal.get('total_calories')) for meal in meals]
+    meals = [dict(meal, total_calories=round(total)) for meal, total in zip(meals, totals) if total]
+    if not meals:
+        return result_text
+    # Ideas that fit the budget are served first
+    meals.sort(key=lambda m: m['total_calories'] > remaining_calories)
+    return [{"meal": meal, "source": "llm"} for meal in meals]
 
 
 # Tool definitions for OpenAI function calling
@@ -430,7 +804,7 @@ FRIDGE_TOOLS = [
         "type": "function",
         "function": {
             "name": "analyze_fridge",
-            "description": "Analyze refrigerator contents from a photo. Identifies all visible food items, estimates quantities, calories, and freshness. Perfect for meal planning based on available ingredients.",
+            "description": "Analyze refrigerator contents from one or more photos. Identifies all visible food items, estimates quantities, calories, and freshness. Perfect for meal planning based on available ingredients.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -438,12 +812,17 @@ FRIDGE_TOOLS = [
                         "type": "string",
                         "description": "Absolute path to the refrigerator photo"
                     },
+                    "image_paths": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Absolute paths of several photos of the same fridge (shelves, door, freezer). Pass all of them in ONE call - they are analyzed together and merged into one inventory."
+                    },
                     "remaining_calories": {
                         "type": "integer",
-                        "description": "Optional - how many calories the user has left for the day. Helps with meal suggestions."
+                        "description": "Optional - how many calories the user has left for the day. Omit to use the tracked daily ledger."
                     }
                 },
-                "required": ["image_path"]
+                "required": []
             }
         }
     },
@@ -451,17 +830,17 @@ FRIDGE_TOOLS = [
         "type": "function",
         "function": {
             "name": "suggest_meal_from_fridge",
-            "description": "Suggest a meal recipe based on available fridge contents and remaining calorie budget. Creates practical recipes using only available ingredients.",
+            "description": "Suggest a meal recipe based on available fridge contents and remaining calorie budget. Matches a local recipe collection with exact macros and prefers items that expire soon; only invents a recipe when nothing fits or creative is true.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "fridge_contents": {
                         "type": "object",
-                        "description": "The result from analyze_fridge() containing food inventory"
+                        "description": "The result from analyze_fridge() containing food inventory. Omit to use the user's saved fridge inventory."
                     },
                     "remaining_calories": {
                         "type": "integer",
-                        "description": "How many calories the user has left for this meal/day"
+                        "description": "How many calories the user has left for this meal/day. Omit to use the tracked daily ledger."
                     },
                     "dietary_restrictions": {
                         "type": "array",
@@ -472,9 +851,13 @@ FRIDGE_TOOLS = [
                         "type": "string",
                         "enum": ["breakfast", "lunch", "dinner", "snack"],
                         "description": "Optional - type of meal to suggest"
+                    },
+                    "creative": {
+                        "type": "boolean",
+                        "description": "Set true only when the user explicitly wants an original/creative recipe instead of a standard one"
                     }
                 },
-                "required": ["fridge_contents", "remaining_calories"]
+                "required": []
             }
         }
     }
@@ -0,0 +1,271 @@
+"""
+Hevy CSV Import for FitCoach AI
+Streams a Hevy workout export into the workout log in fixed-size chunks
+
+The export is read with pandas in chunks of CHUNK_ROWS rows, restricted to
+the columns the log needs and parsed straight to typed columns, so memory
+stays flat whatever the file size. Each chunk lands in the workout_sets
+table, which is the columnar cache later analyses read from; the CSV is
+never parsed again. Rows of the last day in a chunk wait for the next one,
+because record_sets replaces whole (day, exercise) sessions. Re-imports of
+a newer export only write sessions that are new or changed (see
+tools/import_watermarks.py).
+"""
+import hashlib
+import os
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tools.import_watermarks import (
+    forget_sessions, get_watermark, save_digests, session_digests, sessions_missing_from, set_watermark
+)
+from tools.workout_analytics import segment_starts
+from tools.workout_log import LB_TO_KG, delete_sessions, normalize_exercise, rebuild_indexes, record_sets
+
+
+CHUNK_ROWS = 20_000
+SOURCE = "hevy"
+
+# Hevy export columns used, with their parse types
+HEVY_COLUMNS = {
+    "start_time": str,
+    "exercise_title": str,
+    "set_type": str,
+    "weight_kg": np.float64,
+    "weight_lbs": np.float64,
+    "reps": np.float64,
+    "rpe": np.float64
+}
+REQUIRED_COLUMNS = {"start_time", "exercise_title", "reps"}
+
+# Warm-up sets are not working sets: they count toward neither volume nor records
+SKIPPED_SET_TYPES = {"warmup"}
+
+# start_time formats seen in Hevy exports ("12 Jan 2024, 18:05" in current versions)
+_TIME_FORMATS = ("%d %b %Y, %H:%M", "%d %b %Y %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+
+
+@lru_cache(maxsize=4096)
+def _start_day(start_time: str) -> int:
+    """Date ordinal of a Hevy start_time"""
+    for fmt in _TIME_FORMATS:
+        try:
+            return datetime.strptime(start_time.strip(), fmt).toordinal()
+        except ValueError:
+            continue
+    return datetime.fromisoformat(start_time.strip()).toordinal()
+
+
+def read_hevy_chunks(csv_path: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[Dict]:
+    """
+    Typed working sets from a Hevy export, one chunk at a time
+
+    Yields:
+        Dictionary with the chunk's columns (day, exercise, weight_kg, reps,
+        rpe as arrays) and counts of rows read and skipped
+
+    Raises:
+        ValueError: If the file lacks the Hevy columns
+    """
+    header = pd.read_csv(csv_path, nrows=0).columns
+    missing = REQUIRED_COLUMNS - set(header)
+    if missing:
+        raise ValueError(f"Not a Hevy export, missing columns: {', '.join(sorted(missing))}")
+    usecols = [c for c in HEVY_COLUMNS if c in header]
+
+    for chunk in pd.read_csv(csv_path, usecols=usecols, dtype={c: HEVY_COLUMNS[c] for c in usecols},
+                             chunksize=chunk_rows):
+        warmup = chunk["set_type"].isin(SKIPPED_SET_TYPES).to_numpy() if "set_type" in chunk else False
+        # Rows without reps are cardio or timed sets (distance/duration), not lifting sets
+        keep = ~warmup & (chunk["reps"].fillna(0).to_numpy() > 0)
+        sets = chunk[keep]
+
+        if "weight_kg" in sets:
+            weight = sets["weight_kg"].to_numpy()
+        elif "weight_lbs" in sets:
+            weight = sets["weight_lbs"].to_numpy() * LB_TO_KG
+        else:
+            weight = np.zeros(len(sets))
+
+        yield {
+            "day": sets["start_time"].map(_start_day).to_numpy(dtype=np.int64),
+            "exercise": sets["exercise_title"].map(normalize_exercise).to_numpy(dtype=object),
+            "weight_kg": np.round(np.nan_to_num(weight), 2),
+            "reps": sets["reps"].to_numpy().astype(np.int64),
+            "rpe": sets["rpe"].to_numpy() if "rpe" in sets else np.full(len(sets), np.nan),
+            "rows": len(chunk),
+            "warmups": int(np.sum(warmup)),
+            "skipped": int(len(chunk) - keep.sum() - np.sum(warmup))
+        }
+
+
+def _set_rows(frame: pd.DataFrame) -> List[tuple]:
+    """Set rows for record_sets, numbered per (day, exercise) in file order"""
+    numbers = frame.groupby(["day", "exercise"], sort=False).cumcount().to_numpy() + 1
+    rpe = [None if np.isnan(v) else v for v in frame["rpe"].tolist()]
+    return list(zip(frame["day"].tolist(), frame["exercise"].tolist(), numbers.tolist(),
+                    frame["weight_kg"].tolist(), frame["reps"].tolist(), rpe))
+
+
+def _file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _session_digests(frame: pd.DataFrame) -> Tuple[np.ndarray, List[Tuple[int, str]], List[str]]:
+    """
+    Content digest of each (day, exercise) session in a frame
+
+    Returns:
+        Per-row session number, session keys and digests (indexed by session number)
+    """
+    codes = frame.groupby(["day", "exercise"], sort=False).ngroup().to_numpy()
+    _, first = np.unique(codes, return_index=True)
+    keys = list(zip(frame["day"].to_numpy()[first].tolist(), frame["exercise"].to_numpy()[first].tolist()))
+
+    # Row hashes in file order within each session, folded into one digest per session
+    row_hash = pd.util.hash_pandas_object(frame[["weight_kg", "reps", "rpe"]], index=False).to_numpy()
+    order = np.argsort(codes, kind="stable")
+    ordered = row_hash[order]
+    bounds = np.append(segment_starts(codes[order]), len(order)).tolist()
+    digests = [hashlib.blake2b(ordered[a:b].tobytes(), digest_size=12).hexdigest()
+               for a, b in zip(bounds[:-1], bounds[1:])]
+    return codes, keys, digests
+
+
+def import_hevy_csv(csv_path: str, user_id: str, chunk_rows: int = CHUNK_ROWS) -> Dict:
+    """
+    Import a Hevy export into the user's workout log, incrementally
+
+    A file identical to the last import is skipped outright. Otherwise each
+    (day, exercise) session is compared with the digest stored when it was
+    last ingested (only for days up to the previous watermark; later days
+    are new by definition): unchanged sessions are skipped, new or edited
+    ones replace the logged session, and imported sessions whose day has
+    disappeared from the export's date range are deleted. Records and
+    progression state are rebuilt once at the end for the exercises that
+    changed, one exercise at a time.
+
+    Returns:
+        Dictionary with counts (rows, sets written, sessions unchanged,
+        written and removed, warm-ups and non-lifting rows skipped, workout
+        days, exercises), date range and timing
+    """
+    started = time.perf_counter()
+    file_sha = _file_sha256(csv_path)
+    previous = get_watermark(user_id, SOURCE)
+    if previous and previous["file_sha256"] == file_sha:
+        return {"unchanged_file": True, "rows_read": 0, "sets_imported": 0, "workout_days": 0, "exercises": [],
+                "last_import": previous["imported_at"], "file_mb": round(os.path.getsize(csv_path) / 1e6, 2),
+                "elapsed_seconds": round(time.perf_counter() - started, 2)}
+    watermark = previous["watermark"] if previous else 0
+
+    pending = None
+    flushed_days: Set[int] = set()
+    # Sessions whose stored rows already match this run's rows (written or unchanged)
+    run_sessions: Set[Tuple[int, str]] = set()
+    exercises: Set[str] = set()
+    changed_exercises: Set[str] = set()
+    stats = {"rows_read": 0, "sets_imported": 0, "sessions_unchanged": 0, "sessions_written": 0,
+             "sessions_removed": 0, "new_workout_days": 0, "warmups_skipped": 0, "non_lifting_rows_skipped": 0}
+
+    def flush(frame: pd.DataFrame) -> None:
+        if frame.empty:
+            return
+        # A day already written (unsorted file, or a day larger than a chunk) is appended to, not replaced;
+        # its digests are dropped so the next import rewrites those sessions whole. A session first seen
+        # in this part replaces what an earlier import stored for it instead of adding to it
+        again = frame["day"].isin(flushed_days).to_numpy()
+        if again.any():
+            part = frame[again]
+            part_keys = list(zip(part["day"].tolist(), part["exercise"].tolist()))
+            extend = np.array([key in run_sessions for key in part_keys])
+            if (~extend).any():
+                stats["sets_imported"] += record_sets(user_id, _set_rows(part[~extend]), maintain_indexes=False)
+            if extend.any():
+                stats["sets_imported"] += record_sets(user_id, _set_rows(part[extend]), append=True,
+                                                      maintain_indexes=False)
+            run_sessions.update(part_keys)
+            forget_sessions(user_id, SOURCE, set(part_keys))
+            changed_exercises.update(part["exercise"].unique().tolist())
+
+        fresh = frame[~again]
+        if not fresh.empty:
+            codes, keys, digests = _session_digests(fresh)
+            days = fresh["day"].unique().tolist()
+            known = session_digests(user_id, SOURCE, days) if min(days) <= watermark else {}
+            changed = np.array([known.get(key) != digest for key, digest in zip(keys, digests)])
+
+            # Sessions imported earlier on these days that the export no longer has
+            current = set(keys)
+            removed = [key for key in known if key not in current]
+            if removed:
+                delete_sessions(user_id, removed)
+                forget_sessions(user_id, SOURCE, removed)
+                changed_exercises.update(exercise for _, exercise in removed)
+                stats["sessions_removed"] += len(removed)
+
+            stats["sessions_unchanged"] += int((~changed).sum())
+            stats["new_workout_days"] += sum(1 for day in days if day > watermark)
+            if changed.any():
+                part = fresh[changed[codes]]
+                stats["sets_imported"] += record_sets(user_id, _set_rows(part), maintain_indexes=False)
+                save_digests(user_id, SOURCE, {keys[i]: digests[i] for i in np.flatnonzero(changed)})
+                stats["sessions_written"] += int(changed.sum())
+                changed_exercises.update(part["exercise"].unique().tolist())
+            run_sessions.update(keys)
+
+        flushed_days.update(frame["day"].unique().tolist())
+        exercises.update(frame["exercise"].unique().tolist())
+
+    for chunk in read_hevy_chunks(csv_path, chunk_rows):
+        stats["rows_read"] += chunk.pop("rows")
+        stats["warmups_skipped"] += chunk.pop("warmups")
+        stats["non_lifting_rows_skipped"] += chunk.pop("skipped")
+        frame = pd.DataFrame(chunk)
+        if pending is not None:
+            frame = pd.concat([pending, frame], ignore_index=True)
+        if frame.empty:
+            continue
+        # Hold back the chunk's last day: its sessions may continue in the next chunk
+        tail = (frame["day"] == frame["day"].iloc[-1]).to_numpy(copy=True)
+        if tail.all() and len(frame) >= chunk_rows:
+            tail[:] = False
+        pending = frame[tail]
+        flush(frame[~tail])
+    if pending is not None:
+        flush(pending)
+
+    days = sorted(flushed_days)
+    if days:
+        # Whole workouts deleted in Hevy: imported days inside the export's range that it no longer lists
+        removed = sessions_missing_from(user_id, SOURCE, days[0], days[-1], flushed_days)
+        if removed:
+            delete_sessions(user_id, removed)
+            forget_sessions(user_id, SOURCE, removed)
+            changed_exercises.update(exercise for _, exercise in removed)
+            stats["sessions_removed"] += len(removed)
+        set_watermark(user_id, SOURCE, days[-1], file_sha)
+
+    rebuild_indexes(user_id, sorted(changed_exercises))
+
+    return {
+        "unchanged_file": False,
+        **stats,
+        "workout_days": len(days),
+        "exercises": sorted(exercises),
+        "date_range": {
+            "start": datetime.fromordinal(days[0]).date().isoformat(),
+            "end": datetime.fromordinal(days[-1]).date().isoformat()
+        } if days else {},
+        "file_mb": round(os.path.getsize(csv_path) / 1e6, 2),
+        "elapsed_seconds": round(time.perf_counter() - started, 2)
+    }
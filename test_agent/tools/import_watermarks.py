@@ -0,0 +1,108 @@
+"""
+Import Watermarks for FitCoach AI
+Per-user, per-source sync state for incremental re-imports
+
+A watermark row holds how far a source has been ingested (last workout
+day for Hevy, newest activity start for Strava, used as the API cursor)
+and the digest of the last imported file. Hevy sessions additionally keep
+a content digest per (day, exercise), so a re-uploaded export only writes
+sessions that are new or were edited since the previous import.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.database import get_connection
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_watermarks (
+    user_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    watermark INTEGER NOT NULL,
+    file_sha256 TEXT,
+    imported_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, source)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS imported_sessions (
+    user_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    exercise TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (user_id, source, day, exercise)
+) WITHOUT ROWID;
+"""
+
+SessionKey = Tuple[int, str]
+
+
+def get_watermark(user_id: str, source: str) -> Optional[Dict]:
+    """Sync state of a source, None before the first import"""
+    row = get_connection(_SCHEMA).execute(
+        "SELECT watermark, file_sha256, imported_at FROM import_watermarks WHERE user_id = ? AND source = ?",
+        (user_id, source)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def set_watermark(user_id: str, source: str, watermark: int, file_sha256: Optional[str] = None) -> None:
+    """Record a completed import (the watermark never moves backwards)"""
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO import_watermarks (user_id, source, watermark, file_sha256, imported_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, source) DO UPDATE SET
+                watermark = MAX(watermark, excluded.watermark),
+                file_sha256 = excluded.file_sha256,
+                imported_at = excluded.imported_at
+            """,
+            (user_id, source, int(watermark), file_sha256, datetime.now(timezone.utc).isoformat(timespec="seconds"))
+        )
+
+
+def session_digests(user_id: str, source: str, days: Iterable[int]) -> Dict[SessionKey, str]:
+    """Stored digests of the sessions on some days"""
+    days = sorted(set(days))
+    if not days:
+        return {}
+    rows = get_connection(_SCHEMA).execute(
+        "SELECT day, exercise, digest FROM imported_sessions "
+        "WHERE user_id = ? AND source = ? AND day BETWEEN ? AND ?",
+        (user_id, source, days[0], days[-1])
+    ).fetchall()
+    wanted = set(days)
+    return {(row[0], row[1]): row[2] for row in rows if row[0] in wanted}
+
+
+def save_digests(user_id: str, source: str, digests: Dict[SessionKey, str]) -> None:
+    """Remember the content of ingested sessions"""
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO imported_sessions (user_id, source, day, exercise, digest) VALUES (?, ?, ?, ?, ?)",
+            [(user_id, source, day, exercise, digest) for (day, exercise), digest in digests.items()]
+        )
+
+
+def forget_sessions(user_id: str, source: str, keys: Iterable[SessionKey]) -> None:
+    """Drop session digests (deleted upstream, or ingested in parts and to be rewritten next time)"""
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.executemany(
+            "DELETE FROM imported_sessions WHERE user_id = ? AND source = ? AND day = ? AND exercise = ?",
+            [(user_id, source, day, exercise) for day, exercise in keys]
+        )
+
+
+def sessions_missing_from(user_id: str, source: str, first_day: int, last_day: int,
+                          present_days: Iterable[int]) -> List[SessionKey]:
+    """Imported sessions in a day range whose day no longer appears in the source"""
+    present = set(present_days)
+    rows = get_connection(_SCHEMA).execute(
+        "SELECT day, exercise FROM imported_sessions WHERE user_id = ? AND source = ? AND day BETWEEN ? AND ?",
+        (user_id, source, first_day, last_day)
+    ).fetchall()
+    return [(row[0], row[1]) for row in rows if row[0] not in present]
@@ -0,0 +1,193 @@
+"""
+Meal Planner for FitCoach AI
+Vectorized portion optimizer over the local food catalog
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from tools.food_catalog import FOODS, NUTRIENT_MATRIX, PORTION_BOUNDS
+
+
+# Share of daily calories per meal (same split as the template meals)
+MEAL_SPLIT = {"breakfast": 0.25, "lunch": 0.35, "dinner": 0.30, "snack": 0.10}
+
+# Food roles combined into one meal for each slot
+SLOT_ROLES = {
+    "breakfast": ("protein", "carb", "side"),
+    "lunch": ("protein", "carb", "side"),
+    "dinner": ("protein", "carb", "side"),
+    "snack": ("snack", "snack"),
+}
+
+MEAL_LABELS = {"breakfast": "Breakfast", "lunch": "Lunch", "dinner": "Dinner", "snack": "Snacks"}
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Error weights for [kcal, protein, carbs, fats] so every row is measured in kcal
+_ROW_WEIGHTS = np.array([1.0, 4.0, 4.0, 9.0])
+
+# Small ridge term keeps near-collinear food pairs solvable
+_RIDGE = 1e-3
+
+# Portions are rounded to this many grams
+_PORTION_STEP = 5.0
+
+# Added to a combination's relative error per earlier use of one of its foods
+_WEEK_REPEAT_PENALTY = 0.04
+_DAY_REPEAT_PENALTY = 0.15
+
+
+def _slot_combinations(slot: str, allowed: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Build every candidate food combination for a meal slot
+
+    Returns:
+        (n_combos, n_roles) array of food ids, or None if a role has no candidates
+    """
+    candidates = []
+    for role in SLOT_ROLES[slot]:
+        ids = [f["id"] for f in FOODS if allowed[f["id"]] and role in f["roles"] and slot in f["slots"]]
+        if not ids:
+            return None
+        candidates.append(np.array(ids))
+
+    grids = np.meshgrid(*candidates, indexing="ij")
+    combos = np.stack([g.ravel() for g in grids], axis=1)
+
+    # The same food cannot fill two roles; identical-role pairs are unordered
+    keep = np.ones(len(combos), dtype=bool)
+    roles = SLOT_ROLES[slot]
+    for i in range(len(roles)):
+        for j in range(i + 1, len(roles)):
+            if roles[i] == roles[j]:
+                keep &= combos[:, i] < combos[:, j]
+            else:
+                keep &= combos[:, i] != combos[:, j]
+    combos = combos[keep]
+    return combos if len(combos) else None
+
+
+def _solve_portions(combos: np.ndarray, target: np.ndarray):
+    """
+    Solve gram portions for all combinations at once
+
+    Weighted least squares on [kcal, protein, carbs, fats] via batched normal
+    equations, then clipped to each food's portion range, rescaled to the
+    calorie target and rounded.
+
+    Returns:
+        (grams, achieved, relative_error) arrays
+    """
+    # (n, 4 nutrients, k foods), per gram
+    per_gram = np.transpose(NUTRIENT_MATRIX[combos] / 100.0, (0, 2, 1))
+    weighted = per_gram * _ROW_WEIGHTS[None, :, None]
+    weighted_target = target * _ROW_WEIGHTS
+
+    k = combos.shape[1]
+    normal = np.einsum("nmi,nmj->nij", weighted, weighted) + _RIDGE * np.eye(k)
+    rhs = np.einsum("nmi,m->ni", weighted, weighted_target)
+    grams = np.linalg.solve(normal, rhs[..., None])[..., 0]
+
+    low = PORTION_BOUNDS[combos][..., 0]
+    high = PORTION_BOUNDS[combos][..., 1]
+    grams = np.clip(grams, low, high)
+
+    # Clipping drifts the calories - scale back toward the target and re-clip
+    kcal = np.einsum("nk,nk->n", per_gram[:, 0, :], grams)
+    grams = np.clip(grams * (target[0] / np.maximum(kcal, 1e-9))[:, None], low, high)
+    grams = np.clip(np.round(grams / _PORTION_STEP) * _PORTION_STEP, low, high)
+
+    achieved = np.einsum("nmk,nk->nm", per_gram, grams)
+    error = np.sqrt((((achieved - target) * _ROW_WEIGHTS) ** 2).sum(axis=1)) / max(target[0], 1.0)
+    return grams, achieved, error
+
+
+def _format_meal(slot: str, food_ids: np.ndarray, grams: np.ndarray, achieved: np.ndarray) -> Dict:
+    """Turn one solved combination into the meal dictionary returned to the model"""
+    foods = []
+    for food_id, g in zip(food_ids, grams):
+        food = FOODS[int(food_id)]
+        factor = g / 100.0
+        foods.append({
+            "food": food["name"],
+            "name_ro": food["name_ro"],
+            "grams": int(g),
+            "calories": round(food["calories"] * factor),
+            "protein": round(food["protein"] * factor, 1),
+            "carbs": round(food["carbs"] * factor, 1),
+            "fats": round(food["fats"] * factor, 1)
+        })
+
+    return {
+        "meal": MEAL_LABELS[slot],
+        "calories": int(round(achieved[0])),
+        "description": " + ".join(f"{f['name_ro']} {f['grams']}g" for f in foods),
+        "protein_grams": round(float(achieved[1]), 1),
+        "carbs_grams": round(float(achieved[2]), 1),
+        "fats_grams": round(float(achieved[3]), 1),
+        "foods": foods
+    }
+
+
+def plan_week(
+    calories: int,
+    ratios: Dict[str, float],
+    allowed: np.ndarray,
+    days: int = 7
+) -> Optional[List[Dict]]:
+    """
+    Optimize a multi-day meal plan against calorie and macro targets
+
+    Every candidate combination for a slot is solved once; each day then picks
+    the best combination after variety penalties for foods already used.
+
+    Args:
+        calories: Target daily calories
+        ratios: Macro calorie shares, e.g. {'protein': 0.3, 'carbs': 0.4, 'fats': 0.3}
+        allowed: Boolean mask over FOODS (see food_catalog.allowed_food_mask)
+        days: Number of days to plan
+
+    Returns:
+        List of day dictionaries, or None if restrictions leave a slot without foods
+    """
+    solved = {}
+    for slot, share in MEAL_SPLIT.items():
+        combos = _slot_combinations(slot, allowed)
+        if combos is None:
+            return None
+        slot_kcal = calories * share
+        target = np.array([
+            slot_kcal,
+            slot_kcal * ratios["protein"] / 4,
+            slot_kcal * ratios["carbs"] / 4,
+            slot_kcal * ratios["fats"] / 9
+        ])
+        solved[slot] = (combos,) + _solve_portions(combos, target)
+
+    week_usage = np.zeros(len(FOODS))
+    plan = []
+    for day in range(days):
+        day_usage = np.zeros(len(FOODS))
+        meals = []
+        for slot, (combos, grams, achieved, error) in solved.items():
+            score = (error
+                     + _WEEK_REPEAT_PENALTY * week_usage[combos].sum(axis=1)
+                     + _DAY_REPEAT_PENALTY * day_usage[combos].sum(axis=1))
+            best = int(np.argmin(score))
+            week_usage[combos[best]] += 1
+            day_usage[combos[best]] += 1
+            meals.append(_format_meal(slot, combos[best], grams[best], achieved[best]))
+
+        plan.append({
+            "day": DAY_NAMES[day % len(DAY_NAMES)],
+            "meals": meals,
+            "totals": {
+                "calories": sum(m["calories"] for m in meals),
+                "protein_grams": round(sum(m["protein_grams"] for m in meals), 1),
+                "carbs_grams": round(sum(m["carbs_grams"] for m in meals), 1),
+                "fats_grams": round(sum(m["fats_grams"] for m in meals), 1)
+            }
+        })
+
+    return plan
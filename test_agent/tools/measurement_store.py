@@ -0,0 +1,164 @@
+"""
+Body Measurement Store for FitCoach AI
+Per-user measurement history with vectorized trend queries
+
+One row per (user, site, day), clustered on that key (WITHOUT ROWID), so
+each site's history is a contiguous, date-ordered run read with one range
+scan straight into numpy arrays. Entries are appended; a second entry for
+the same site and day replaces the first (a correction, not a new point).
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.database import get_connection
+
+
+# Sites measured on both sides, compared for symmetry trends
+SYMMETRY_PAIRS = {
+    "arms": ("left_arm", "right_arm"),
+    "thighs": ("left_thigh", "right_thigh"),
+    "calves": ("left_calf", "right_calf"),
+    "forearms": ("left_forearm", "right_forearm")
+}
+
+DEFAULT_WINDOW_DAYS = 28
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS body_measurements (
+    user_id TEXT NOT NULL,
+    site TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    value_cm REAL NOT NULL,
+    PRIMARY KEY (user_id, site, day)
+) WITHOUT ROWID;
+"""
+
+
+def record_measurements(user_id: str, measurements: Dict[str, float], day: Optional[str] = None) -> int:
+    """
+    Append one day's measurements (cm) for a user
+
+    Returns:
+        Number of sites written
+    """
+    ordinal = date.fromisoformat(day).toordinal() if day else date.today().toordinal()
+    rows = [(user_id, site, ordinal, float(value)) for site, value in measurements.items()]
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO body_measurements (user_id, site, day, value_cm) VALUES (?, ?, ?, ?)",
+            rows
+        )
+    return len(rows)
+
+
+def get_series(user_id: str, sites: Optional[Iterable[str]] = None,
+               since: Optional[str] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Measurement history as arrays
+
+    Returns:
+        site -> (day ordinals, values in cm), both sorted by day
+    """
+    query = "SELECT site, day, value_cm FROM body_measurements WHERE user_id = ?"
+    params: List = [user_id]
+    if sites:
+        sites = list(sites)
+        query += f" AND site IN ({', '.join('?' for _ in sites)})"
+        params += sites
+    if since:
+        query += " AND day >= ?"
+        params.append(date.fromisoformat(since).toordinal())
+    query += " ORDER BY site, day"
+
+    rows = get_connection(_SCHEMA).execute(query, params).fetchall()
+    if not rows:
+        return {}
+    site_col = np.array([r[0] for r in rows])
+    days = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+    values = np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+
+    # Rows arrive grouped by site: split at the boundaries
+    bounds = np.flatnonzero(site_col[1:] != site_col[:-1]) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(rows)]))
+    return {str(site_col[s]): (days[s:e], values[s:e]) for s, e in zip(starts, ends)}
+
+
+def latest_values(user_id: str, sites: Iterable[str]) -> Dict[str, Tuple[float, str]]:
+    """
+    Most recent value per site (one indexed seek per site)
+
+    Returns:
+        site -> (value in cm, ISO date it was measured)
+    """
+    conn = get_connection(_SCHEMA)
+    latest = {}
+    for site in sites:
+        row = conn.execute(
+            "SELECT value_cm, day FROM body_measurements WHERE user_id = ? AND site = ? ORDER BY day DESC LIMIT 1",
+            (user_id, site)
+        ).fetchone()
+        if row:
+            latest[site] = (row[0], date.fromordinal(row[1]).isoformat())
+    return latest
+
+
+def rolling_mean(days: np.ndarray, values: np.ndarray, window_days: int) -> np.ndarray:
+    """Mean over the trailing window_days calendar days at each point (prefix sums, no loop)"""
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    starts = np.searchsorted(days, days - window_days + 1, side="left")
+    ends = np.arange(1, len(days) + 1)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+
+def weekly_rate(days: np.ndarray, values: np.ndarray) -> Optional[float]:
+    """Least-squares slope in cm per week, None with fewer than two distinct days"""
+    if len(days) < 2 or days[-1] == days[0]:
+        return None
+    x = (days - days.mean()).astype(np.float64)
+    slope = float((x * (values - values.mean())).sum() / (x * x).sum())
+    return slope * 7
+
+
+def site_trend(days: np.ndarray, values: np.ndarray, window_days: int = DEFAULT_WINDOW_DAYS) -> Dict:
+    """Latest value, rolling average and rate of change of one site's history"""
+    recent = days >= days[-1] - window_days + 1
+    rate = weekly_rate(days[recent], values[recent])
+    overall = weekly_rate(days, values)
+    return {
+        "latest": round(float(values[-1]), 1),
+        "latest_date": date.fromordinal(int(days[-1])).isoformat(),
+        "rolling_average": round(float(rolling_mean(days, values, window_days)[-1]), 1),
+        "change_per_week": round(rate, 2) if rate is not None else None,
+        "change_per_week_all_time": round(overall, 2) if overall is not None else None,
+        "change_since_first": round(float(values[-1] - values[0]), 1),
+        "first_date": date.fromordinal(int(days[0])).isoformat(),
+        "entries": int(len(days))
+    }
+
+
+def symmetry_trend(series: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                   window_days: int = DEFAULT_WINDOW_DAYS) -> Dict[str, Dict]:
+    """Left-right difference over the days both sides were measured"""
+    result = {}
+    for name, (left_site, right_site) in SYMMETRY_PAIRS.items():
+        if left_site not in series or right_site not in series:
+            continue
+        (left_days, left_values), (right_days, right_values) = series[left_site], series[right_site]
+        common, li, ri = np.intersect1d(left_days, right_days, assume_unique=True, return_indices=True)
+        if not len(common):
+            continue
+        gap = np.abs(left_values[li] - right_values[ri])
+        recent = common >= common[-1] - window_days + 1
+        rate = weekly_rate(common[recent], gap[recent])
+        result[name] = {
+            "difference_cm": round(float(gap[-1]), 1),
+            "larger_side": "left" if left_values[li][-1] > right_values[ri][-1] else
+                           "right" if right_values[ri][-1] > left_values[li][-1] else "equal",
+            "rolling_average_cm": round(float(rolling_mean(common, gap, window_days)[-1]), 2),
+            "difference_change_per_week": round(rate, 3) if rate is not None else None
+        }
+    return result
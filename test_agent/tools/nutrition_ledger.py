@@ -0,0 +1,180 @@
+"""
+Daily Nutrition Ledger for FitCoach AI
+Running per-user, per-day totals of tracked meals
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from utils.database import get_connection
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_nutrition (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    calories REAL NOT NULL DEFAULT 0,
+    protein REAL NOT NULL DEFAULT 0,
+    carbs REAL NOT NULL DEFAULT 0,
+    fats REAL NOT NULL DEFAULT 0,
+    meals INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS nutrition_targets (
+    user_id TEXT PRIMARY KEY,
+    target_calories INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+def _day_key(day: Optional[str] = None) -> str:
+    """ISO date string, today by default"""
+    return day or date.today().isoformat()
+
+
+def record_meal(
+    user_id: str,
+    calories: float,
+    protein: float = 0,
+    carbs: float = 0,
+    fats: float = 0,
+    day: Optional[str] = None
+) -> Dict:
+    """
+    Add one tracked meal to the user's daily totals (single-row upsert)
+
+    Returns:
+        Updated day summary (see get_day)
+    """
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO daily_nutrition (user_id, day, calories, protein, carbs, fats, meals)
+            VALUES (?, ?, ?, ?, ?, ?, 1)
+            ON CONFLICT (user_id, day) DO UPDATE SET
+                calories = calories + excluded.calories,
+                protein = protein + excluded.protein,
+                carbs = carbs + excluded.carbs,
+                fats = fats + excluded.fats,
+                meals = meals + 1
+            """,
+            (user_id, _day_key(day), calories, protein, carbs, fats)
+        )
+    return get_day(user_id, day)
+
+
+def set_daily_target(user_id: str, target_calories: int) -> None:
+    """Store the user's daily calorie target"""
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO nutrition_targets (user_id, target_calories, updated_at)
+            VALUES (?, ?, datetime('now'))
+            ON CONFLICT (user_id) DO UPDATE SET
+                target_calories = excluded.target_calories,
+                updated_at = excluded.updated_at
+            """,
+            (user_id, int(target_calories))
+        )
+
+
+def get_daily_target(user_id: str) -> Optional[int]:
+    """Stored daily calorie target, or None if the user never set one"""
+    row = get_connection(_SCHEMA).execute(
+        "SELECT target_calories FROM nutrition_targets WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    return row["target_calories"] if row else None
+
+
+def get_day(user_id: str, day: Optional[str] = None) -> Dict:
+    """
+    Totals for one day plus the remaining budget
+
+    Returns:
+        Dictionary with consumed calories/macros, meal count, target and remaining
+    """
+    day = _day_key(day)
+    row = get_connection(_SCHEMA).execute(
+        "SELECT calories, protein, carbs, fats, meals FROM daily_nutrition WHERE user_id = ? AND day = ?",
+        (user_id, day)
+    ).fetchone()
+    target = get_daily_target(user_id)
+    consumed = row["calories"] if row else 0
+
+    return {
+        "date": day,
+        "calories_consumed": round(consumed),
+        "protein_grams": round(row["protein"], 1) if row else 0,
+        "carbs_grams": round(row["carbs"], 1) if row else 0,
+        "fats_grams": round(row["fats"], 1) if row else 0,
+        "meals_logged": row["meals"] if row else 0,
+        "target_calories": target,
+        "remaining_calories": round(target - consumed) if target is not None else None
+    }
+
+
+def get_remaining_calories(user_id: str, day: Optional[str] = None) -> Optional[int]:
+    """Calories left for the day, or None when no target is stored"""
+    return get_day(user_id, day)["remaining_calories"]
+
+
+def get_range(user_id: str, start: str, end: str) -> List[Dict]:
+    """
+    Daily rows between two ISO dates (inclusive), served by the primary-key index
+
+    Returns:
+        List of day dictionaries in date order (days without meals are omitted)
+    """
+    rows = get_connection(_SCHEMA).execute(
+        """
+        SELECT day, calories, protein, carbs, fats, meals FROM daily_nutrition
+        WHERE user_id = ? AND day BETWEEN ? AND ?
+        ORDER BY day
+        """,
+        (user_id, start, end)
+    ).fetchall()
+    return [
+        {
+            "date": r["day"],
+            "calories": round(r["calories"]),
+            "protein_grams": round(r["protein"], 1),
+            "carbs_grams": round(r["carbs"], 1),
+            "fats_grams": round(r["fats"], 1),
+            "meals_logged": r["meals"]
+        }
+        for r in rows
+    ]
+
+
+def get_rollup(user_id: str, days: int = 7, end: Optional[str] = None) -> Dict:
+    """
+    Totals and averages over the last `days` days ending at `end` (today by default)
+
+    Returns:
+        Dictionary with per-day rows, totals, averages over logged days and target adherence
+    """
+    end_day = date.fromisoformat(_day_key(end))
+    start_day = end_day - timedelta(days=days - 1)
+    rows = get_range(user_id, start_day.isoformat(), end_day.isoformat())
+    target = get_daily_target(user_id)
+
+    logged = len(rows)
+    totals = {
+        key: round(sum(r[key] for r in rows), 1)
+        for key in ("calories", "protein_grams", "carbs_grams", "fats_grams")
+    }
+    averages = {key: round(value / logged, 1) if logged else 0 for key, value in totals.items()}
+
+    return {
+        "start_date": start_day.isoformat(),
+        "end_date": end_day.isoformat(),
+        "days_logged": logged,
+        "daily": rows,
+        "totals": totals,
+        "averages": averages,
+        "target_calories": target,
+        "days_over_target": sum(1 for r in rows if target is not None and r["calories"] > target)
+    }
@@ -4,16 +4,41 @@ Handles meal planning, calorie tracking, and nutrition calculations
 """
 import os
 import re
+import unicodedata
+import time
 import requests
 from typing import Dict, List, Optional, Tuple
+from openai import OpenAI
+
+import numpy as np
+
+from tools.food_catalog import NUTRIENT_MATRIX, allowed_food_mask, lookup_food
+from tools.meal_planner import plan_week
+from tools import adaptive_tdee, fridge_inventory, nutrition_ledger
+from utils import prefetch
+from utils.validators import as_column_arrays, to_result_frame
+from utils.vision import extract_json, image_content_part
+
+
+# Activity level multipliers
+ACTIVITY_MULTIPLIERS = {
+    'sedentary': 1.2,      # Little/no exercise
+    'light': 1.375,        # Light exercise 1-3 days/week
+    'moderate': 1.55,      # Moderate exercise 3-5 days/week
+    'active': 1.725,       # Hard exercise 6-7 days/week
+    'very_active': 1.9     # Physical job + exercise
+}
+DEFAULT_ACTIVITY_MULTIPLIER = 1.55
 
 
 def calculate_tdee(
-    weight: float,
-    height: float,
-    age: int,
-    gender: str,
-    activity_level: str
+    weight: Optional[float] = None,
+    height: Optional[float] = None,
+    age: Optional[int] = None,
+    gender: Optional[str] = None,
+    activity_level: Optional[str] = None,
+    mode: str = "formula",
+    user_id: str = "default"
 ) -> Dict:
     """
     Calculate Total Daily Energy Expenditure (TDEE)
@@ -24,27 +49,33 @@ def calculate_tdee(
         age: Age in years
         gender: 'male' or 'female'
         activity_level: 'sedentary', 'light', 'moderate', 'active', 'very_active'
+        mode: 'formula' (Mifflin-St Jeor) or 'adaptive' (learned from logged
+            meals and weigh-ins; physical inputs optional)
+        user_id: Owner of the adaptive estimate (injected by the agent)
     
     Returns:
         Dictionary with BMR, TDEE, and calorie recommendations
     """
+    if mode == "adaptive":
+        return _adaptive_tdee_result(user_id, weight, height, age, gender, activity_level)
+    
     print(f"\n🔧 [TOOL] calculate_tdee(weight={weight}kg, height={height}cm, age={age}, gender={gender}, activity={activity_level})")
     
+    missing = [name for name, value in (("weight", weight), ("height", height), ("age", age),
+                                        ("gender", gender), ("activity_level", activity_level)) if value is None]
+    if missing:
+        print(f"⚠️ [WARNING] Missing inputs: {missing}\n")
+        return {
+            "status": "need_clarification",
+            "message": f"Formula TDEE needs: {', '.join(missing)}"
+        }
+    
     # Mifflin-St Jeor equation for BMR
     # BMR = 10*weight + 6.25*height - 5*age + s (s=5 for male, -161 for female)
     gender_offset = 5 if gender.lower() in ['male', 'm'] else -161
     bmr = 10 * weight + 6.25 * height - 5 * age + gender_offset
     
-    # Activity level multipliers
-    activity_multipliers = {
-        'sedentary': 1.2,      # Little/no exercise
-        'light': 1.375,        # Light exercise 1-3 days/week
-        'moderate': 1.55,      # Moderate exercise 3-5 days/week
-        'active': 1.725,       # Hard exercise 6-7 days/week
-        'very_active': 1.9     # Physical job + exercise
-    }
-    
-    multiplier = activity_multipliers.get(activity_level.lower(), 1.55)
+    multiplier = ACTIVITY_MULTIPLIERS.get(activity_level.lower(), DEFAULT_ACTIVITY_MULTIPLIER)
     tdee = bmr * multiplier
     
     # Calculate calorie targets
@@ -61,11 +92,126 @@ def calculate_tdee(
         "activity_multiplier": multiplier
     }
     
+    # The formula value becomes the starting point of the adaptive estimate
+    try:
+        adaptive_tdee.seed_prior(user_id, tdee)
+    except Exception as e:
+        print(f"   ⚠️ Could not seed adaptive TDEE: {str(e)}")
+    
     print(f"✅ [RESULT] BMR: {result['bmr']} cal, TDEE: {result['tdee']} cal\n")
     
     return result
 
 
+def _adaptive_tdee_result(
+    user_id: str,
+    weight: Optional[float],
+    height: Optional[float],
+    age: Optional[int],
+    gender: Optional[str],
+    activity_level: Optional[str]
+) -> Dict:
+    """Adaptive mode of calculate_tdee - reads the per-user estimator state"""
+    print(f"\n🔧 [TOOL] calculate_tdee(mode=adaptive)")
+    
+    estimate = adaptive_tdee.get_estimate(user_id)
+    
+    if estimate["adaptive_tdee"] is None:
+        if None not in (weight, height, age, gender, activity_level):
+            # Nothing learned yet - answer with the formula (which also seeds the estimator)
+            result = calculate_tdee(weight, height, age, gender, activity_level, user_id=user_id)
+            result["mode"] = "formula"
+            result["notes"] = "No adaptive data yet. Log meals and weigh-ins (log_weight) to refine this."
+            return result
+        print(f"⚠️ [WARNING] No adaptive TDEE data yet\n")
+        return {
+            "status": "insufficient_data",
+            "mode": "adaptive",
+            "message": "No adaptive estimate yet. Log weigh-ins with log_weight and track meals for 1-2 weeks, or provide weight, height, age, gender and activity level for the formula.",
+            **estimate
+        }
+    
+    tdee = estimate["adaptive_tdee"]
+    result = {
+        "mode": "adaptive",
+        "tdee": tdee,
+        "maintenance_calories": tdee,
+        "weight_loss_calories": tdee - 500,
+        "weight_gain_calories": tdee + 300,
+        **estimate
+    }
+    
+    print(f"✅ [RESULT] Adaptive TDEE: {tdee} cal (±{estimate['tdee_uncertainty']}, {estimate['confidence']} confidence)\n")
+    
+    return result
+
+
+def log_weight(weight: float, date: Optional[str] = None, user_id: str = "default") -> Dict:
+    """
+    Record a weigh-in for the weight trend and adaptive TDEE
+    
+    Args:
+        weight: Body weight in kg
+        date: Optional ISO date (YYYY-MM-DD), today by default
+        user_id: Owner of the estimate (injected by the agent)
+    
+    Returns:
+        Dictionary with the smoothed weight trend and current adaptive TDEE
+    """
+    print(f"\n🔧 [TOOL] log_weight(weight={weight}kg, date={date})")
+    
+    if weight <= 0:
+        return {"status": "error", "message": "weight must be positive"}
+    
+    estimate = adaptive_tdee.record_weight(user_id, weight, date)
+    
+    print(f"✅ [RESULT] Trend: {estimate['weight_trend_kg']}kg, adaptive TDEE: {estimate['adaptive_tdee']}\n")
+    
+    return {"status": "success", "weight_kg": weight, **estimate}
+
+
+def calculate_tdee_batch(profiles):
+    """
+    Vectorized calculate_tdee for whole cohorts (no per-row logging)
+    
+    Args:
+        profiles: DataFrame or mapping of arrays with columns weight (kg),
+            height (cm), age (years), gender ('male'/'female'), activity_level
+    
+    Returns:
+        Columnar result with bmr, tdee, maintenance_calories, weight_loss_calories,
+        weight_gain_calories and activity_multiplier - a DataFrame (same index)
+        when a DataFrame was passed, otherwise a dictionary of numpy arrays
+    """
+    cols = as_column_arrays(profiles, ["weight", "height", "age", "gender", "activity_level"])
+    weight = cols["weight"].astype(np.float64)
+    height = cols["height"].astype(np.float64)
+    age = cols["age"].astype(np.float64)
+    
+    # Mifflin-St Jeor, same offsets as calculate_tdee
+    gender = np.char.lower(cols["gender"].astype(str))
+    gender_offset = np.where(np.isin(gender, ['male', 'm']), 5.0, -161.0)
+    bmr = 10 * weight + 6.25 * height - 5 * age + gender_offset
+    
+    # Activity lookup via binary search over the sorted level names
+    levels = np.array(sorted(ACTIVITY_MULTIPLIERS))
+    level_multipliers = np.array([ACTIVITY_MULTIPLIERS[level] for level in levels])
+    activity = np.char.lower(cols["activity_level"].astype(str))
+    idx = np.clip(np.searchsorted(levels, activity), 0, len(levels) - 1)
+    multiplier = np.where(levels[idx] == activity, level_multipliers[idx], DEFAULT_ACTIVITY_MULTIPLIER)
+    
+    tdee = bmr * multiplier
+    result = {
+        "bmr": np.round(bmr).astype(np.int64),
+        "tdee": np.round(tdee).astype(np.int64),
+        "maintenance_calories": np.round(tdee).astype(np.int64),
+        "weight_loss_calories": np.round(tdee - 500).astype(np.int64),
+        "weight_gain_calories": np.round(tdee + 300).astype(np.int64),
+        "activity_multiplier": multiplier
+    }
+    return to_result_frame(result, profiles)
+
+
 def generate_meal_plan(
     calories: int,
     diet_preference: str = "balanced",
@@ -80,7 +226,10 @@ def generate_meal_plan(
         restrictions: List of food restrictions (e.g., ['dairy', 'nuts'])
     
     Returns:
-        Dictionary with meal plan for the week
+        Dictionary with meal plan for the week (7 days with gram portions
+        optimized against the macro targets; falls back to template meals
+        that avoid the restricted foods, with a notice, when restrictions
+        leave a meal without any local foods)
     """
     print(f"\n🔧 [TOOL] generate_meal_plan(calories={calories}, diet={diet_preference}, restrictions={restrictions})")
     
@@ -103,8 +252,23 @@ def generate_meal_plan(
     carbs_grams = round((calories * ratios['carbs']) / 4)
     fats_grams = round((calories * ratios['fats']) / 9)
     
-    # Generate sample meals (template-based for now)
-    meals = _generate_sample_meals(calories, diet_preference, restrictions)
+    # Optimize a full week over the local food catalog
+    start = time.perf_counter()
+    allowed = allowed_food_mask(diet_preference, restrictions)
+    weekly_plan = plan_week(calories, ratios, allowed)
+    solve_ms = (time.perf_counter() - start) * 1000
+    
+    if weekly_plan:
+        meals = weekly_plan[0]["meals"]
+        plan_source = "optimizer"
+    else:
+        print(f"⚠️ [WARNING] Restrictions leave no local foods for some meals, using templates")
+        weekly_plan = []
+        meals, dropped = _generate_sample_meals(calories, diet_preference.lower(), allowed)
+        plan_source = "template"
+        notice = "No optimized plan satisfies these restrictions with the local food catalog; showing template meals"
+        if dropped:
+            notice += f" (left out {', '.join(dropped)}: the templates use restricted foods - plan those meals with the user)"
     
     result = {
         "target_calories": calories,
@@ -118,61 +282,90 @@ def generate_meal_plan(
             "fats_percentage": int(ratios['fats'] * 100)
         },
         "restrictions": restrictions,
-        "meals": meals
+        "meals": meals,
+        "weekly_plan": weekly_plan,
+        "plan_source": plan_source
     }
+    if plan_source == "template":
+        result["notice"] = notice
     
-    print(f"✅ [RESULT] Generated {diet_preference} meal plan: P:{protein_grams}g C:{carbs_grams}g F:{fats_grams}g\n")
+    print(f"✅ [RESULT] Generated {diet_preference} meal plan: P:{protein_grams}g C:{carbs_grams}g F:{fats_grams}g ({plan_source}, {solve_ms:.1f}ms)\n")
     
     return result
 
 
-def _generate_sample_meals(calories: int, diet: str, restrictions: List[str]) -> List[Dict]:
-    """Generate sample meals based on diet preference"""
-    # Split calories across meals
-    breakfast_cal = round(calories * 0.25)
-    lunch_cal = round(calories * 0.35)
-    dinner_cal = round(calories * 0.30)
-    snacks_cal = round(calories * 0.10)
-    
-    # Template meals based on diet type
-    if diet == 'keto':
-        meals = [
-            {"meal": "Breakfast", "calories": breakfast_cal, "description": "Ouă scrambled cu bacon și avocado"},
-            {"meal": "Lunch", "calories": lunch_cal, "description": "Salată Caesar cu pui și parmezan"},
-            {"meal": "Dinner", "calories": dinner_cal, "description": "Somon la grătar cu broccoli și unt"},
-            {"meal": "Snacks", "calories": snacks_cal, "description": "Nuci și brânză"}
-        ]
-    elif diet == 'vegan':
-        meals = [
-            {"meal": "Breakfast", "calories": breakfast_cal, "description": "Ovăz cu banană și unt de arahide"},
-            {"meal": "Lunch", "calories": lunch_cal, "description": "Bowl cu quinoa, năut și legume"},
-            {"meal": "Dinner", "calories": dinner_cal, "description": "Tofu stir-fry cu orez brun"},
-            {"meal": "Snacks", "calories": snacks_cal, "description": "Fructe și semințe"}
-        ]
-    else:  # balanced
-        meals = [
-            {"meal": "Breakfast", "calories": breakfast_cal, "description": "Ouă + ovăz cu fructe"},
-            {"meal": "Lunch", "calories": lunch_cal, "description": "Piept de pui + orez + legume"},
-            {"meal": "Dinner", "calories": dinner_cal, "description": "Pește + cartofi dulci + salată"},
-            {"meal": "Snacks", "calories": snacks_cal, "description": "Iaurt grecesc cu fructe"}
-        ]
-    
-    return meals
-
-
-def track_calories(meal_description: str) -> Dict:
+# Template meals per diet: (meal, share of calories, description, catalog ingredients)
+_TEMPLATE_MEALS = {
+    'keto': [
+        ("Breakfast", 0.25, "Ouă scrambled cu bacon și avocado", ["egg", "bacon", "avocado"]),
+        ("Lunch", 0.35, "Salată Caesar cu pui și cheddar", ["lettuce", "chicken breast", "cheddar cheese"]),
+        ("Dinner", 0.30, "Somon la grătar cu broccoli și unt", ["salmon", "broccoli", "butter"]),
+        ("Snacks", 0.10, "Nuci și brânză", ["walnuts", "cheddar cheese"])
+    ],
+    'vegan': [
+        ("Breakfast", 0.25, "Ovăz cu banană și unt de arahide", ["oats", "banana", "peanut butter"]),
+        ("Lunch", 0.35, "Bowl cu quinoa, năut și ardei", ["quinoa", "chickpeas", "bell pepper"]),
+        ("Dinner", 0.30, "Tofu stir-fry cu orez brun", ["tofu", "brown rice", "broccoli"]),
+        ("Snacks", 0.10, "Fructe", ["apple", "strawberries"])
+    ],
+    'balanced': [
+        ("Breakfast", 0.25, "Ouă + ovăz cu fructe", ["egg", "oats", "banana"]),
+        ("Lunch", 0.35, "Piept de pui + orez + legume", ["chicken breast", "rice", "broccoli"]),
+        ("Dinner", 0.30, "Pește + cartofi dulci + salată", ["cod", "sweet potato", "lettuce"]),
+        ("Snacks", 0.10, "Iaurt grecesc cu fructe", ["greek yogurt", "strawberries"])
+    ]
+}
+
+
+def _generate_sample_meals(calories: int, diet: str, allowed: np.ndarray) -> Tuple[List[Dict], List[str]]:
+    """
+    Template meals for a diet, keeping only those whose ingredients the restrictions allow
+
+    Returns:
+        (meals, names of the template meals dropped for a restricted ingredient)
+    """
+    meals, dropped = [], []
+    for meal, share, description, ingredients in _TEMPLATE_MEALS.get(diet, _TEMPLATE_MEALS['balanced']):
+        if all(allowed[lookup_food(name)["id"]] for name in ingredients):
+            meals.append({"meal": meal, "calories": round(calories * share), "description": description})
+        else:
+            dropped.append(meal)
+    return meals, dropped
+
+
+def track_calories(
+    meal_description: Optional[str] = None,
+    log_meal: bool = True,
+    image_path: Optional[str] = None,
+    user_id: str = "default"
+) -> Dict:
     """
     Track calories from a meal description using USDA FoodData Central API (FREE)
     Parses multiple ingredients and searches each separately for accuracy
     
     Args:
-        meal_description: Description of the meal (e.g., "100g oats, 300ml milk, 5 eggs")
+        meal_description: Description of the meal (e.g., "100g oats, 300ml milk, 5 eggs");
+            with image_path, an optional hint for the photo analysis
+        log_meal: Add the result to today's nutrition ledger (False for "how many calories in...")
+        image_path: Optional meal photo - foods and portions are read in one vision call
+            and resolved through the local food catalog
+        user_id: Ledger owner (injected by the agent)
     
     Returns:
         Dictionary with estimated calories and macros, or request for more details
     """
+    if image_path:
+        return _track_calories_from_photo(image_path, meal_description, log_meal, user_id)
+    
     print(f"\n🔧 [TOOL] track_calories(meal='{meal_description}')")
     
+    if not meal_description:
+        return {
+            "status": "need_clarification",
+            "message": "Describe the meal or send a photo of it.",
+            "example": "Try: '100g oats, 300ml milk, 5 eggs'"
+        }
+    
     # Get USDA API key from environment
     api_key = os.getenv("USDA_API_KEY")
     
@@ -192,6 +385,14 @@ def track_calories(meal_description: str) -> Dict:
     # Parse ingredients from description
     ingredients = _parse_ingredients(meal_description)
     
+    # Translate non-English food names locally so USDA search hits on the first pass
+    for ingredient in ingredients:
+        canonical = normalize_food_name(ingredient['food'])
+        if canonical != ingredient['food']:
+            print(f"   🌐 Normalized '{ingredient['food']}' -> '{canonical}'")
+            ingredient['original_name'] = ingredient['food']
+            ingredient['food'] = canonical
+    
     if not ingredients:
         result = {
             "meal": meal_description,
@@ -277,11 +478,244 @@ def track_calories(meal_description: str) -> Dict:
         "source": "USDA FoodData Central"
     }
     
+    if log_meal and total_calories > 0:
+        result["daily_totals"] = _log_to_ledger(user_id, total_calories, total_protein, total_carbs, total_fats)
+    
     print(f"✅ [RESULT] Total: {result['total_calories']} cal (P:{result['total_protein_grams']}g C:{result['total_carbs_grams']}g F:{result['total_fats_grams']}g)\n")
     
     return result
 
 
+def _track_calories_from_photo(
+    image_path: str,
+    hint: Optional[str],
+    log_meal: bool,
+    user_id: str
+) -> Dict:
+    """
+    Photo mode of track_calories
+    One structured vision call returns food names and gram portions (or the
+    speculative call started at upload time is joined); macros come from the
+    local food catalog, with USDA only for foods the catalog lacks.
+    """
+    print(f"\n🔧 [TOOL] track_calories(image='{image_path}')")
+    
+    if not os.path.exists(image_path):
+        return {"status": "error", "error": "Image file not found", "image_path": image_path}
+    
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return {"status": "error", "error": "OpenAI API key not configured"}
+    
+    try:
+        # Join the detection speculatively started at upload time, if any
+        hit, detected = prefetch.take(("track_calories", image_path, hint or None))
+        if not hit:
+            detected = _detect_meal_foods(api_key, image_path, hint)
+    except Exception as e:
+        print(f"❌ [ERROR] Photo analysis failed: {str(e)}\n")
+        return {"status": "error", "error": f"Photo analysis failed: {str(e)}", "image_path": image_path}
+    
+    # Portions as numbers; items whose amount cannot be read are skipped
+    detected = [{**f, "grams": parse_amount(f.get("grams"))} for f in detected if f.get("name")]
+    detected = [f for f in detected if f["grams"]]
+    if not detected:
+        return {
+            "status": "need_clarification",
+            "message": "I couldn't recognize any food in the photo. Please describe the meal instead.",
+            "image_path": image_path
+        }
+    
+    # Resolve all catalog foods at once: (n foods) x (4 nutrients per 100g). Only exact names
+    # match, so a dish ("apple pie", "butter chicken") goes to USDA instead of one ingredient
+    catalog_foods = [lookup_food(normalize_food_name(f["name"]), exact=True) for f in detected]
+    grams = np.array([f["grams"] for f in detected])
+    known = np.array([food is not None for food in catalog_foods])
+    nutrients = np.zeros((len(detected), 4))
+    if known.any():
+        ids = [food["id"] for food in catalog_foods if food is not None]
+        nutrients[known] = NUTRIENT_MATRIX[ids] * (grams[known, None] / 100)
+    
+    usda_key = os.getenv("USDA_API_KEY")
+    foods_breakdown = []
+    for i, item in enumerate(detected):
+        entry = {"food": item["name"], "quantity": f"{round(grams[i])}g"}
+        if known[i]:
+            entry["matched"] = catalog_foods[i]["name"]
+            entry["source"] = "local catalog"
+        else:
+            nutrition = _search_usda_food(usda_key, normalize_food_name(item["name"])) if usda_key else None
+            if not nutrition:
+                entry["error"] = "Not found in food database"
+                foods_breakdown.append(entry)
+                continue
+            multiplier = _calculate_multiplier(grams[i], "g", nutrition.get('serving_size', 100))
+            nutrients[i] = [nutrition[k] * multiplier for k in ("calories", "protein", "carbs", "fats")]
+            entry["matched"] = nutrition["name"]
+            entry["source"] = "USDA"
+        entry.update({
+            "calories": round(nutrients[i, 0]),
+            "protein": round(nutrients[i, 1], 1),
+            "carbs": round(nutrients[i, 2], 1),
+            "fats": round(nutrients[i, 3], 1)
+        })
+        foods_breakdown.append(entry)
+    
+    total_calories, total_protein, total_carbs, total_fats = nutrients.sum(axis=0)
+    result = {
+        "meal": hint or "Meal photo",
+        "image_path": image_path,
+        "total_calories": round(total_calories),
+        "total_protein_grams": round(total_protein, 1),
+        "total_carbs_grams": round(total_carbs, 1),
+        "total_fats_grams": round(total_fats, 1),
+        "foods_breakdown": foods_breakdown,
+        "status": "success" if total_calories > 0 else "partial",
+        "source": "Photo portion estimate + local food catalog",
+        "notes": "Portions are estimated from the photo; ask the user to correct any amount that looks off"
+    }
+    
+    if log_meal and total_calories > 0:
+        result["daily_totals"] = _log_to_ledger(user_id, total_calories, total_protein, total_carbs, total_fats)
+    
+    print(f"✅ [RESULT] Photo total: {result['total_calories']} cal (P:{result['total_protein_grams']}g C:{result['total_carbs_grams']}g F:{result['total_fats_grams']}g)\n")
+    
+    return result
+
+
+def parse_amount(value) -> Optional[float]:
+    """
+    Positive number from a model reply amount (150, "150g", "0.2 kg" -> 200 grams, "520 kcal")
+    None when unreadable or not positive
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        grams = float(value)
+    else:
+        match = re.search(r"(\d+(?:[.,]\d+)?)\s*(kg|g|grams?)?\b", str(value or "").lower())
+        if not match:
+            return None
+        grams = float(match.group(1).replace(",", ".")) * (1000 if match.group(2) == "kg" else 1)
+    return grams if grams > 0 else None
+
+
+def prefetch_meal_photo(image_path: str, hint: Optional[str] = None) -> Optional[Tuple]:
+    """
+    Start the meal photo detection in the background; logging still happens in track_calories
+    The hint is part of the key, so track_calories only joins a detection made with its own hint.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key or not os.path.exists(image_path):
+        return None
+    key = ("track_calories", image_path, hint or None)
+    prefetch.submit(key, _detect_meal_foods, api_key, image_path, hint)
+    return key
+
+
+def _detect_meal_foods(api_key: str, image_path: str, hint: Optional[str]) -> List[Dict]:
+    """
+    One structured vision call for the foods on a plate
+    
+    Returns:
+        List of {"name", "grams", "preparation"} dictionaries as detected
+    """
+    hint_text = f"\nThe user says about this meal: {hint}" if hint else ""
+    
+    client = OpenAI(api_key=api_key)
+    print("🤖 [TOOL] Calling OpenAI Vision API for foods and portions...")
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": f"""Identify every food on this plate and estimate its portion as eaten.{hint_text}
+
+Use short generic English food names (e.g. "chicken breast", "rice", "broccoli", "olive oil").
+Estimate portions in grams of the food as served (cooked weight for cooked foods).
+Include visible cooking fats and sauces as separate items.
+
+Return JSON with this exact structure:
+{{
+    "meal_name": "<short name>",
+    "foods": [
+        {{"name": "<food>", "grams": <number>, "preparation": "<cooked/raw/fried/...>"}}
+    ]
+}}"""
+                    },
+                    image_content_part(image_path)
+                ]
+            }
+        ],
+        response_format={"type": "json_object"},
+        max_tokens=600,
+        temperature=0.2
+    )
+    return extract_json(response.choices[0].message.content).get("foods", [])
+
+
+def _log_to_ledger(user_id: str, calories: float, protein: float, carbs: float, fats: float) -> Optional[Dict]:
+    """Add a tracked meal to the daily ledger; ledger failures never fail the tracking"""
+    try:
+        day = nutrition_ledger.record_meal(user_id, calories, protein, carbs, fats)
+        adaptive_tdee.record_intake(user_id, calories, day["date"])
+        print(f"   📒 Ledger: {day['calories_consumed']} cal today, remaining: {day['remaining_calories']}")
+        return day
+    except Exception as e:
+        print(f"   ⚠️ Could not update nutrition ledger: {str(e)}")
+        return None
+
+
+def set_calorie_target(target_calories: int, user_id: str = "default") -> Dict:
+    """
+    Store the user's daily calorie target used for remaining-budget calculations
+    
+    Args:
+        target_calories: Daily calorie target (e.g., from calculate_tdee)
+        user_id: Ledger owner (injected by the agent)
+    
+    Returns:
+        Dictionary with today's totals against the new target
+    """
+    print(f"\n🔧 [TOOL] set_calorie_target(target_calories={target_calories})")
+    
+    if target_calories <= 0:
+        return {"status": "error", "message": "target_calories must be positive"}
+    
+    nutrition_ledger.set_daily_target(user_id, target_calories)
+    today = nutrition_ledger.get_day(user_id)
+    
+    print(f"✅ [RESULT] Target {target_calories} cal, remaining today: {today['remaining_calories']}\n")
+    
+    return {"status": "success", "today": today}
+
+
+def get_nutrition_summary(days: int = 1, user_id: str = "default") -> Dict:
+    """
+    Read today's remaining budget and a rollup of recent days from the ledger
+    
+    Args:
+        days: Number of days to roll up, ending today (7 for a weekly summary)
+        user_id: Ledger owner (injected by the agent)
+    
+    Returns:
+        Dictionary with today's totals/remaining calories and the multi-day rollup
+    """
+    print(f"\n🔧 [TOOL] get_nutrition_summary(days={days})")
+    
+    days = max(1, min(int(days), 366))
+    result = {
+        "status": "success",
+        "today": nutrition_ledger.get_day(user_id),
+        "rollup": nutrition_ledger.get_rollup(user_id, days) if days > 1 else None
+    }
+    
+    print(f"✅ [RESULT] Today: {result['today']['calories_consumed']} cal, remaining: {result['today']['remaining_calories']}\n")
+    
+    return result
+
+
 def _parse_ingredients(description: str) -> List[Dict]:
     """
     Parse meal description into individual ingredients with quantities
@@ -289,8 +723,8 @@ def _parse_ingredients(description: str) -> List[Dict]:
         "100g oats, 300ml milk, 5 eggs" -> [{"food": "oats", "quantity": 100, "unit": "g"}, ...]
         "2 chicken breast, rice" -> [{"food": "chicken breast", "quantity": 2, "unit": "piece"}, ...]
     """
-    # Split by common separators
-    parts = re.split(r',|\band\b|\+', description.lower())
+    # Split by common separators (Romanian "și" / "si" included)
+    parts = re.split(r',|\band\b|\bși\b|\bşi\b|\bsi\b|\+', description.lower())
     
     ingredients = []
     for part in parts:
@@ -300,7 +734,7 @@ def _parse_ingredients(description: str) -> List[Dict]:
         
         # Try to extract quantity and unit
         # Patterns: "100g oats", "300ml milk", "5 eggs", "2 chicken breast"
-        match = re.match(r'(\d+\.?\d*)\s*(g|kg|ml|l|oz|cup|piece|pieces|tbsp|tsp)?\s*(.+)', part)
+        match = re.match(r'(\d+\.?\d*)\s*(g|kg|ml|l|oz|cup|piece|pieces|buc|tbsp|tsp)?\s*(.+)', part)
         
         if match:
             quantity = float(match.group(1))
@@ -314,9 +748,9 @@ def _parse_ingredients(description: str) -> List[Dict]:
             elif unit in ['l']:
                 quantity *= 1000
                 unit = 'ml'
-            elif unit in ['piece', 'pieces']:
+            elif unit in ['piece', 'pieces', 'buc']:
                 # Keep as count
-                pass
+                unit = 'piece' if unit == 'buc' else unit
             
             ingredients.append({
                 "food": food_name,
@@ -483,30 +917,262 @@ def _calculate_multiplier(quantity: float, unit: str, base_serving: float = 100)
         return quantity / base_serving
 
 
+# Multilingual food vocabulary -> canonical English USDA query
+# Keys are lowercase and diacritic-folded (see _fold_diacritics), so "Ouă",
+# "oua" and "OUA" all hit the same entry. Mostly Romanian, plus common
+# staples in a few other languages users log in. Words that are also English
+# ("paste", "pan", "pain", "ton", "mar") are left out so English input is never
+# rewritten; multi-word phrases containing them ("ton la conserva") stay.
+_FOOD_SYNONYMS = {
+    # Romanian - proteins
+    "ou": "egg", "oua": "egg", "ouale": "egg", "oul": "egg",
+    "albus": "egg white", "albusuri": "egg white",
+    "galbenus": "egg yolk", "galbenusuri": "egg yolk",
+    "pui": "chicken", "carne de pui": "chicken",
+    "piept de pui": "chicken breast", "piept pui": "chicken breast",
+    "pulpa de pui": "chicken thigh", "pulpe de pui": "chicken thigh",
+    "aripioare de pui": "chicken wing",
+    "curcan": "turkey", "piept de curcan": "turkey breast",
+    "vita": "beef", "carne de vita": "beef", "carne tocata": "ground beef",
+    "carne tocata de vita": "ground beef", "carne tocata de porc": "ground pork",
+    "carne tocata de pui": "ground chicken", "carne tocata de curcan": "ground turkey",
+    "tocatura": "ground beef", "porc": "pork", "carne de porc": "pork",
+    "muschi de porc": "pork tenderloin", "ceafa de porc": "pork shoulder",
+    "miel": "lamb", "sunca": "ham", "bacon": "bacon", "costita": "bacon",
+    "carnati": "sausage", "carnat": "sausage", "salam": "salami",
+    "peste": "fish", "somon": "salmon", "ton la conserva": "tuna canned",
+    "macrou": "mackerel", "cod": "cod", "pastrav": "trout", "sardine": "sardines",
+    "creveti": "shrimp", "tofu": "tofu",
+    # Romanian - dairy
+    "lapte": "milk", "lapte degresat": "milk nonfat", "lapte integral": "milk whole",
+    "lapte de migdale": "almond milk", "lapte de ovaz": "oat milk", "lapte de orez": "rice milk",
+    "lapte de soia": "soy milk", "lapte de cocos": "coconut milk",
+    "iaurt": "yogurt", "iaurt grecesc": "greek yogurt", "branza": "cheese",
+    "branza de vaci": "cottage cheese", "telemea": "feta cheese", "cascaval": "cheddar cheese",
+    "mozzarella": "mozzarella cheese", "parmezan": "parmesan cheese",
+    "smantana": "sour cream", "unt": "butter", "frisca": "whipped cream", "chefir": "kefir",
+    # Romanian - grains and starches
+    "orez": "rice", "orez brun": "brown rice", "ovaz": "oats", "fulgi de ovaz": "oats",
+    "spaghete": "spaghetti", "taitei": "noodles",
+    "paine": "bread", "paine integrala": "whole wheat bread", "lipie": "tortilla",
+    "cartof": "potato", "cartofi": "potato", "cartofi dulci": "sweet potato",
+    "cartof dulce": "sweet potato", "malai": "cornmeal", "mamaliga": "polenta",
+    "quinoa": "quinoa", "hrisca": "buckwheat", "cuscus": "couscous", "faina": "flour",
+    # Romanian - legumes, nuts, seeds
+    "naut": "chickpeas", "linte": "lentils", "fasole": "beans", "fasole rosie": "kidney beans",
+    "mazare": "peas", "soia": "soybeans", "nuci": "walnuts", "nuca": "walnuts",
+    "migdale": "almonds", "alune": "hazelnuts", "arahide": "peanuts",
+    "unt de arahide": "peanut butter", "caju": "cashews", "seminte": "seeds",
+    "seminte de chia": "chia seeds", "seminte de in": "flaxseed",
+    "seminte de floarea soarelui": "sunflower seeds", "seminte de dovleac": "pumpkin seeds",
+    # Romanian - vegetables
+    "legume": "vegetables", "salata": "lettuce", "salata verde": "lettuce",
+    "rosie": "tomato", "rosii": "tomato", "castravete": "cucumber", "castraveti": "cucumber",
+    "ardei": "bell pepper", "ceapa": "onion", "usturoi": "garlic", "morcov": "carrot",
+    "morcovi": "carrot", "broccoli": "broccoli", "conopida": "cauliflower", "varza": "cabbage",
+    "spanac": "spinach", "dovlecel": "zucchini", "dovlecei": "zucchini", "vinete": "eggplant",
+    "vanata": "eggplant", "ciuperci": "mushrooms", "porumb": "corn", "fasole verde": "green beans",
+    "avocado": "avocado", "sfecla": "beets", "telina": "celery",
+    # Romanian - fruits
+    "fructe": "fruit", "mere": "apple", "banana": "banana", "banane": "banana",
+    "portocala": "orange", "portocale": "orange", "capsuni": "strawberries", "afine": "blueberries",
+    "zmeura": "raspberries", "struguri": "grapes", "para": "pear", "pere": "pear",
+    "piersica": "peach", "piersici": "peach", "lamaie": "lemon", "kiwi": "kiwi",
+    "pepene": "watermelon", "ananas": "pineapple", "curmale": "dates", "stafide": "raisins",
+    # Romanian - dishes ("<dish> de <ingredient>" reads the other way round in English)
+    "salata de fructe": "fruit salad", "salata de vinete": "eggplant dip",
+    "salata de ton": "tuna salad", "salata de pui": "chicken salad",
+    "supa de pui": "chicken soup", "ciorba de legume": "vegetable soup",
+    "ciorba de perisoare": "meatball soup", "tocana de legume": "vegetable stew",
+    "clatite": "pancakes", "sarmale": "cabbage rolls",
+    # Romanian - misc
+    "ulei": "oil", "ulei de masline": "olive oil", "miere": "honey", "zahar": "sugar",
+    "ciocolata": "chocolate", "ciocolata neagra": "dark chocolate", "suc": "juice",
+    "proteina": "whey protein", "proteina whey": "whey protein",
+    # Spanish / Italian / French / German staples
+    "huevo": "egg", "huevos": "egg", "pollo": "chicken", "pechuga de pollo": "chicken breast",
+    "arroz": "rice", "leche": "milk", "queso": "cheese", "avena": "oats",
+    "uovo": "egg", "uova": "egg", "riso": "rice", "formaggio": "cheese",
+    "oeuf": "egg", "oeufs": "egg", "poulet": "chicken", "riz": "rice", "lait": "milk",
+    "fromage": "cheese", "eier": "egg", "huhn": "chicken",
+    "hahnchen": "chicken", "reis": "rice", "milch": "milk", "kase": "cheese", "brot": "bread",
+}
+
+# Preparation words, translated in place so _check_missing_details and the
+# USDA query still see "cooked" / "raw" / "grilled"
+_PREPARATION_SYNONYMS = {
+    "fiert": "cooked", "fiarta": "cooked", "fierti": "cooked", "fierte": "cooked",
+    "gatit": "cooked", "gatita": "cooked", "gatiti": "cooked", "gatite": "cooked",
+    "crud": "raw", "cruda": "raw", "cruzi": "raw", "crude": "raw",
+    "la gratar": "grilled", "gratar": "grilled",
+    "prajit": "fried", "prajita": "fried", "prajiti": "fried", "prajite": "fried",
+    "copt": "baked", "coapta": "baked", "copti": "baked", "coapte": "baked",
+    "la cuptor": "baked", "afumat": "smoked", "afumata": "smoked",
+    "cocido": "cooked", "crudo": "raw", "cotto": "cooked", "cuit": "cooked",
+    "gekocht": "cooked", "roh": "raw",
+}
+
+# Connector words dropped once a phrase has been translated ("piept de pui")
+_FOOD_STOPWORDS = {"de", "cu", "si", "din", "la", "fara", "del", "con", "di", "avec", "mit"}
+
+# Romanian inflection suffixes tried (longest first) when a token misses
+_LEMMA_SUFFIXES = ("urile", "ului", "elor", "ilor", "uri", "ule", "ul", "le", "lor", "a", "i", "e")
+
+_MAX_PHRASE_WORDS = max(len(k.split()) for k in list(_FOOD_SYNONYMS) + list(_PREPARATION_SYNONYMS))
+_VOCABULARY_WORDS = {w for k in list(_FOOD_SYNONYMS) + list(_PREPARATION_SYNONYMS) for w in k.split()}
+
+
+def _fold_diacritics(text: str) -> str:
+    """Lowercase and strip diacritics ("Ouă" -> "oua", "brânză" -> "branza")"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _lemmatize_token(token: str) -> str:
+    """Map an inflected word ("cartofii", "rosiile") to a known vocabulary word"""
+    if token in _VOCABULARY_WORDS:
+        return token
+    for suffix in _LEMMA_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            stem = token[:-len(suffix)]
+            if stem in _VOCABULARY_WORDS:
+                return stem
+    return token
+
+
+def normalize_food_name(food_name: str) -> str:
+    """
+    Translate a (possibly non-English) food term into a canonical English query
+    Uses greedy longest-phrase matching over the local synonym tables, so no
+    LLM or API call is needed. English input passes through unchanged (a
+    preparation word alone, like "crude" in "crude oil", does not count as
+    a translation), and a translation repeating words already produced is
+    dropped ("carne tocata" + "vita" is not "ground beef beef").
+    Examples:
+        "Piept de pui la grătar" -> "chicken breast grilled"
+        "orez fiert" -> "rice cooked"
+        "Ouă" -> "egg"
+    """
+    tokens = [_lemmatize_token(t) for t in re.findall(r"[a-z0-9]+", _fold_diacritics(food_name))]
+    # Translated phrases and untranslated words, in the input's order
+    words = []
+    translated = False
+
+    i = 0
+    while i < len(tokens):
+        matched = False
+        for size in range(min(_MAX_PHRASE_WORDS, len(tokens) - i), 0, -1):
+            phrase = " ".join(tokens[i:i + size])
+            if phrase in _FOOD_SYNONYMS:
+                translation = _FOOD_SYNONYMS[phrase]
+                translated = True
+            elif phrase in _PREPARATION_SYNONYMS:
+                translation = _PREPARATION_SYNONYMS[phrase]
+            else:
+                continue
+            if not set(translation.split()) <= set(" ".join(words).split()):
+                words.append(translation)
+            matched = True
+            i += size
+            break
+
+        if not matched:
+            # Untranslated words (often already English, e.g. "greek") stay, connectors go
+            if tokens[i] not in _FOOD_STOPWORDS:
+                words.append(tokens[i])
+            i += 1
+
+    if not translated:
+        return food_name.strip().lower()
+    return " ".join(words)
+
+
 def check_fridge_inventory(
-    products_list: List[Dict],
-    expiry_dates: Optional[Dict] = None
+    products_list: Optional[List] = None,
+    expiry_dates: Optional[Dict] = None,
+    used_up: Optional[List[str]] = None,
+    within_days: int = 3,
+    user_id: str = "default"
 ) -> Dict:
     """
     Check fridge inventory and manage expiration dates
+    Reads the persistent inventory (filled by analyze_fridge and manual edits),
+    so no photo is needed to answer "what's expiring".
     
     Args:
-        products_list: List of products with quantities
-        expiry_dates: Optional dictionary of product: expiry_date pairs
+        products_list: Optional products to add/update - names or dictionaries
+            with name, quantity and category
+        expiry_dates: Optional dictionary of product: expiry_date (YYYY-MM-DD) pairs
+        used_up: Optional product names to remove from the inventory
+        within_days: Window for "expiring soon" (default 3 days)
+        user_id: Inventory owner (injected by the agent)
     
     Returns:
         Dictionary with inventory status and expiring items
     """
-    # TODO: Implement fridge inventory management
-    # - Track products and quantities
-    # - Identify expiring items
-    # - Suggest meals to use expiring ingredients
+    print(f"\n🔧 [TOOL] check_fridge_inventory(add={len(products_list or [])}, remove={len(used_up or [])})")
     
-    return {
-        "inventory": products_list,
-        "expiring_soon": [],
-        "expired": []
+    expiry_by_key, invalid_dates = {}, {}
+    for name, day in (expiry_dates or {}).items():
+        parsed = fridge_inventory.parse_expiry(day)
+        if parsed:
+            expiry_by_key[canonical_food_key(name)] = (name, parsed)
+        else:
+            invalid_dates[name] = day
+    items = []
+    for product in products_list or []:
+        item = {"name": product} if isinstance(product, str) else dict(product)
+        if not item.get("name"):
+            continue
+        item["key"] = canonical_food_key(item["name"])
+        if item["key"] in expiry_by_key:
+            item["expiry_date"] = expiry_by_key.pop(item["key"])[1]
+        if not item.get("category"):
+            food = lookup_food(item["key"])
+            item["category"] = fridge_inventory.CATALOG_CATEGORIES.get(food["category"]) if food else None
+        items.append(item)
+    # Expiry dates given for items already in the fridge
+    items.extend(
+        {"name": name, "key": key, "expiry_date": day}
+        for key, (name, day) in expiry_by_key.items()
+    )
+    
+    try:
+        if items:
+            fridge_inventory.record_items(user_id, items, source="manual")
+        removed = fridge_inventory.remove_items(user_id, [canonical_food_key(n) for n in used_up]) if used_up else 0
+        inventory = fridge_inventory.get_inventory(user_id)
+        expiring = fridge_inventory.get_expiring(user_id, within_days)
+        expired = fridge_inventory.get_expired(user_id)
+    except Exception as e:
+        print(f"❌ [ERROR] Fridge inventory unavailable: {str(e)}\n")
+        return {"status": "error", "error": f"Fridge inventory unavailable: {str(e)}"}
+    
+    print(f"✅ [RESULT] {len(inventory)} items, {len(expiring)} expiring soon, {len(expired)} expired\n")
+    
+    result = {
+        "inventory": inventory,
+        "expiring_soon": expiring,
+        "expired": expired,
+        "items_updated": len(items),
+        "items_removed": removed,
+        "notes": "Expiry dates marked expiry_estimated are guesses from the item category - ask the user for real dates when it matters"
     }
+    if invalid_dates:
+        result["invalid_expiry_dates"] = invalid_dates
+        result["notes"] += ". Some expiry dates were not YYYY-MM-DD and were ignored (see invalid_expiry_dates)"
+    return result
+
+
+def canonical_food_key(food_name: str) -> str:
+    """
+    Stable key for a food name in any supported language
+    Catalog foods map to their catalog name, so "Eggs", "egg" and "ouă" share one key.
+    Only exact or plural catalog matches map, so "orange juice" stays apart from "oranges".
+    """
+    canonical = " ".join(normalize_food_name(food_name).lower().split())
+    food = lookup_food(canonical, exact=True)
+    return food["name"] if food else canonical
 
 
 def suggest_meals_from_fridge(fridge_contents: List[str]) -> List[Dict]:
@@ -533,10 +1199,15 @@ NUTRITION_TOOLS = [
         "type": "function",
         "function": {
             "name": "calculate_tdee",
-            "description": "Calculate Total Daily Energy Expenditure based on user's physical characteristics and activity level",
+            "description": "Calculate Total Daily Energy Expenditure. mode 'formula' uses physical characteristics and activity level; mode 'adaptive' returns the expenditure learned from the user's logged meals and weigh-ins (no other inputs needed).",
             "parameters": {
                 "type": "object",
                 "properties": {
+                    "mode": {
+                        "type": "string",
+                        "enum": ["formula", "adaptive"],
+                        "description": "formula (default) or adaptive"
+                    },
                     "weight": {"type": "number", "description": "Weight in kilograms"},
                     "height": {"type": "number", "description": "Height in centimeters"},
                     "age": {"type": "integer", "description": "Age in years"},
@@ -547,7 +1218,22 @@ NUTRITION_TOOLS = [
                         "description": "Activity level: sedentary (little/no exercise), light (1-3 days/week), moderate (3-5 days/week), active (6-7 days/week), very_active (physical job + exercise)"
                     }
                 },
-                "required": ["weight", "height", "age", "gender", "activity_level"]
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "log_weight",
+            "description": "Record a body weight weigh-in. Updates the smoothed weight trend and the adaptive TDEE estimate.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "weight": {"type": "number", "description": "Body weight in kilograms"},
+                    "date": {"type": "string", "description": "Optional date of the weigh-in (YYYY-MM-DD), defaults to today"}
+                },
+                "required": ["weight"]
             }
         }
     },
@@ -555,7 +1241,7 @@ NUTRITION_TOOLS = [
         "type": "function",
         "function": {
             "name": "generate_meal_plan",
-            "description": "Generate a personalized meal plan based on calorie target and dietary preferences",
+            "description": "Generate a personalized 7-day meal plan with gram portions that hit the calorie and macro targets, respecting dietary preferences and restrictions. Computed locally - summarize the result, do not invent extra meals.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -579,16 +1265,97 @@ NUTRITION_TOOLS = [
         "type": "function",
         "function": {
             "name": "track_calories",
-            "description": "Track calories and macros from a meal description",
+            "description": "Track calories and macros from a meal description or a meal photo",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "meal_description": {
                         "type": "string",
-                        "description": "Description of the meal or food items"
+                        "description": "Description of the meal or food items, in the user's own words. Romanian and other non-English food names are translated locally, pass them as-is. With image_path, optional extra details (e.g. 'the rice was 200g')."
+                    },
+                    "image_path": {
+                        "type": "string",
+                        "description": "Absolute path to a photo of the meal. Foods and portions are estimated from the photo in this single call - do not call analyze tools first."
+                    },
+                    "log_meal": {
+                        "type": "boolean",
+                        "description": "Whether the user actually ate this meal and it should count toward today's totals (default true). Use false for hypothetical 'how many calories in...' questions."
+                    }
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "set_calorie_target",
+            "description": "Save the user's daily calorie target so remaining calories are tracked automatically for the rest of the day",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "target_calories": {"type": "integer", "description": "Daily calorie target"}
+                },
+                "required": ["target_calories"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_nutrition_summary",
+            "description": "Get calories and macros eaten today, the remaining calorie budget, and optionally a multi-day rollup. Use this instead of adding up previous meals from the conversation.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "days": {
+                        "type": "integer",
+                        "description": "Number of days to summarize ending today (1 = today only, 7 = last week)"
+                    }
+                }
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "check_fridge_inventory",
+            "description": "Read the user's saved fridge inventory with items expiring soon and expired items, and optionally add, update or remove products. Items from analyze_fridge photos are saved automatically, so no new photo is needed.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "products_list": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string"},
+                                "quantity": {"type": "string"},
+                                "category": {
+                                    "type": "string",
+                                    "enum": ["protein", "carbs", "fats", "vegetables", "dairy", "fruits", "other"]
+                                }
+                            },
+                            "required": ["name"]
+                        },
+                        "description": "Optional products the user bought or wants to add/update"
+                    },
+                    "expiry_dates": {
+                        "type": "object",
+                        "additionalProperties": {"type": "string"},
+                        "description": "Optional product name -> expiry date (YYYY-MM-DD) pairs stated by the user"
+                    },
+                    "used_up": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Optional product names that were finished or thrown away"
+                    },
+                    "within_days": {
+                        "type": "integer",
+                        "description": "How many days ahead counts as expiring soon (default 3)"
                     }
                 },
-                "required": ["meal_description"]
+                "required": []
             }
         }
     }
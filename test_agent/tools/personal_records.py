@@ -0,0 +1,188 @@
+"""
+Personal Record Index for FitCoach AI
+Per-user, per-exercise bests maintained as sets are logged
+
+Every logged batch is folded into one row per exercise (heaviest set, best
+estimated 1RM, best session volume, most bodyweight reps) and one row per
+(exercise, weight) for rep records. Each row is an upsert that only
+overwrites a field when the new value beats it, so a lookup is a single
+primary-key read instead of a scan of the whole history.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from tools.workout_analytics import estimated_1rm
+from utils.database import get_connection
+
+
+# Rep records shown per exercise (heaviest weights first)
+MAX_REP_RECORDS = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS personal_records (
+    user_id TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    best_weight_kg REAL NOT NULL,
+    best_weight_reps INTEGER NOT NULL,
+    best_weight_day INTEGER NOT NULL,
+    best_e1rm_kg REAL NOT NULL,
+    best_e1rm_weight_kg REAL NOT NULL,
+    best_e1rm_reps INTEGER NOT NULL,
+    best_e1rm_day INTEGER NOT NULL,
+    best_session_volume_kg REAL NOT NULL,
+    best_session_day INTEGER NOT NULL,
+    best_bodyweight_reps INTEGER NOT NULL,
+    best_bodyweight_reps_day INTEGER NOT NULL,
+    PRIMARY KEY (user_id, exercise)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rep_records (
+    user_id TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    weight_kg REAL NOT NULL,
+    reps INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    PRIMARY KEY (user_id, exercise, weight_kg)
+) WITHOUT ROWID;
+"""
+
+# Record groups: leading column, columns that move with it, and when the new row wins
+_RECORD_GROUPS = [
+    ("best_weight_kg", ["best_weight_reps", "best_weight_day"],
+     "excluded.best_weight_kg > best_weight_kg OR (excluded.best_weight_kg = best_weight_kg "
+     "AND excluded.best_weight_reps > best_weight_reps)"),
+    ("best_e1rm_kg", ["best_e1rm_weight_kg", "best_e1rm_reps", "best_e1rm_day"],
+     "excluded.best_e1rm_kg > best_e1rm_kg"),
+    ("best_session_volume_kg", ["best_session_day"],
+     "excluded.best_session_volume_kg > best_session_volume_kg"),
+    ("best_bodyweight_reps", ["best_bodyweight_reps_day"],
+     "excluded.best_bodyweight_reps > best_bodyweight_reps"),
+]
+_RECORD_COLUMNS = [col for lead, rest, _ in _RECORD_GROUPS for col in [lead] + rest]
+
+# In an upsert every SET expression sees the old row, so each group compares against the stored best
+_UPSERT_RECORDS = (
+    f"INSERT INTO personal_records (user_id, exercise, {', '.join(_RECORD_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in range(len(_RECORD_COLUMNS) + 2))}) "
+    "ON CONFLICT (user_id, exercise) DO UPDATE SET " + ", ".join(
+        f"{col} = CASE WHEN {condition} THEN excluded.{col} ELSE {col} END"
+        for lead, rest, condition in _RECORD_GROUPS for col in [lead] + rest
+    )
+)
+
+_UPSERT_REP_RECORD = """
+INSERT INTO rep_records (user_id, exercise, weight_kg, reps, day) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (user_id, exercise, weight_kg) DO UPDATE SET
+    reps = excluded.reps,
+    day = excluded.day
+WHERE excluded.reps > reps
+"""
+
+
+def _fold(rows: List[Tuple]) -> Tuple[Dict[str, List], Dict[Tuple[str, float], Tuple[int, int]]]:
+    """
+    Reduce a batch of set rows to its bests, one pass with O(1) work per set
+
+    Ties keep the earlier day, so the first time a record was reached stands.
+    """
+    e1rms = estimated_1rm([r[3] for r in rows], [r[4] for r in rows], [np.nan if r[5] is None else r[5] for r in rows])
+    sessions: Dict[Tuple[str, int], float] = {}
+    best: Dict[str, List] = {}
+    reps_at: Dict[Tuple[str, float], Tuple[int, int]] = {}
+
+    for (day, exercise, _, weight, reps, _), e1rm in zip(rows, e1rms.tolist()):
+        sessions[exercise, day] = sessions.get((exercise, day), 0.0) + weight * reps
+        rec = best.get(exercise)
+        if rec is None:
+            rec = best[exercise] = [0.0, 0, day, 0.0, 0.0, 0, day, 0.0, day, 0, day]
+        if (weight, reps, -day) > (rec[0], rec[1], -rec[2]):
+            rec[0:3] = [weight, reps, day]
+        if (e1rm, -day) > (rec[3], -rec[6]):
+            rec[3:7] = [round(e1rm, 1), weight, reps, day]
+        if weight == 0 and (reps, -day) > (rec[9], -rec[10]):
+            rec[9:11] = [reps, day]
+        if weight > 0 and (reps, -day) > reps_at.get((exercise, weight), (0, 0)):
+            reps_at[exercise, weight] = (reps, day)
+
+    for (exercise, day), volume in sessions.items():
+        rec = best[exercise]
+        if (volume, -day) > (rec[7], -rec[8]):
+            rec[7:9] = [round(volume, 1), day]
+    return best, reps_at
+
+
+def update_records(user_id: str, rows: List[Tuple]) -> int:
+    """
+    Fold newly logged set rows into the user's record index
+
+    Args:
+        user_id: Owner of the sets
+        rows: (day, exercise, set number, weight kg, reps, rpe) tuples, each
+            (day, exercise) group holding that session's complete sets
+
+    Returns:
+        Number of exercises touched
+    """
+    if not rows:
+        return 0
+    best, reps_at = _fold(rows)
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.executemany(_UPSERT_RECORDS, [(user_id, exercise, *rec) for exercise, rec in best.items()])
+        conn.executemany(
+            _UPSERT_REP_RECORD,
+            [(user_id, exercise, weight, reps, day) for (exercise, weight), (reps, day) in reps_at.items()]
+        )
+    return len(best)
+
+
+def rebuild_records(user_id: str, exercises: Iterable[str], rows: List[Tuple]) -> int:
+    """
+    Replace the records of some exercises with ones recomputed from their full history
+
+    Needed after a correction, which can lower a record the index already holds.
+    """
+    exercises = list(exercises)
+    conn = get_connection(_SCHEMA)
+    with conn:
+        for table in ("personal_records", "rep_records"):
+            conn.executemany(
+                f"DELETE FROM {table} WHERE user_id = ? AND exercise = ?",
+                [(user_id, exercise) for exercise in exercises]
+            )
+    return update_records(user_id, rows)
+
+
+def get_records(user_id: str, exercises: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+    """
+    Records per exercise (primary-key reads, no history scan)
+
+    Returns:
+        exercise -> heaviest set, best estimated 1RM, best session volume,
+        best bodyweight reps and the rep-record frontier (for each weight,
+        the most reps, keeping only entries no heavier weight matches)
+    """
+    conn = get_connection(_SCHEMA)
+    query = "SELECT * FROM personal_records WHERE user_id = ?"
+    params: List = [user_id]
+    if exercises:
+        exercises = list(exercises)
+        query += f" AND exercise IN ({', '.join('?' for _ in exercises)})"
+        params += exercises
+    records = {}
+    for row in conn.execute(query, params).fetchall():
+        reps_rows = conn.execute(
+            "SELECT weight_kg, reps, day FROM rep_records WHERE user_id = ? AND exercise = ? ORDER BY weight_kg DESC",
+            (user_id, row["exercise"])
+        ).fetchall()
+        frontier, most_reps = [], 0
+        for weight, reps, day in reps_rows:
+            if reps > most_reps:
+                frontier.append((weight, reps, day))
+                most_reps = reps
+        records[row["exercise"]] = {
+            **{col: row[col] for col in _RECORD_COLUMNS},
+            "rep_records": frontier[:MAX_REP_RECORDS]
+        }
+    return records
@@ -0,0 +1,311 @@
+"""
+Progression Engine for FitCoach AI
+Per-exercise progression state advanced one session at a time
+
+Each exercise keeps a compact state row: the last session's top working
+weight, sets, reps and RPE, the best performance so far and how many
+sessions in a row neither beat it nor added load. Logging a session
+advances that row in O(1); the next-session prescription (double
+progression, RPE adjustments, deloads) is a pure function of the row, so
+suggestions never re-read the raw history. Sessions arriving out of order
+(imports, edits) trigger a replay of that exercise only.
+"""
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from tools.exercise_catalog import lookup_exercise
+from tools.workout_analytics import estimated_1rm, segment_starts
+from tools.workout_planner import PRESCRIPTIONS
+from utils.database import get_connection
+
+
+# Sessions in a row without a new best before a deload is prescribed
+DELOAD_AFTER_STALLS = 3
+DELOAD_FACTOR = 0.9
+# A session at or below this share of the working weight counts as the deload
+DELOAD_DETECT_SHARE = 0.95
+# Days off after which loads are eased back in
+BREAK_DAYS = 21
+BREAK_FACTOR = 0.9
+
+# RPE rules: this far under target adds load early; at or above MAX_RPE below the range takes load off
+EASY_RPE_MARGIN = 1.5
+RPE_TOLERANCE = 0.5
+MAX_RPE = 9.5
+
+# Load steps in kg: lower-body compounds, other compounds, isolation work
+INCREMENTS = {"lower": 5.0, "upper": 2.5, "isolation": 1.0}
+LOWER_BODY_PATTERNS = {"squat", "hinge", "lunge"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS progression_state (
+    user_id TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    last_day INTEGER NOT NULL,
+    sessions INTEGER NOT NULL,
+    weight_kg REAL NOT NULL,
+    sets INTEGER NOT NULL,
+    reps INTEGER NOT NULL,
+    rpe REAL,
+    best_metric REAL NOT NULL,
+    stalled_sessions INTEGER NOT NULL,
+    pre_deload_weight_kg REAL,
+    pre_deload_sets INTEGER,
+    PRIMARY KEY (user_id, exercise)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS progression_preferences (
+    user_id TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    rep_low INTEGER NOT NULL,
+    rep_high INTEGER NOT NULL,
+    target_rpe REAL NOT NULL,
+    PRIMARY KEY (user_id, exercise)
+) WITHOUT ROWID;
+"""
+
+_STATE_COLUMNS = ["exercise", "last_day", "sessions", "weight_kg", "sets", "reps", "rpe",
+                  "best_metric", "stalled_sessions", "pre_deload_weight_kg", "pre_deload_sets"]
+
+
+def _rep_range(spec: str) -> Tuple[int, int]:
+    low, high = spec.split("-")
+    return int(low), int(high)
+
+
+def default_preferences(exercise: str) -> Dict:
+    """Rep range and target RPE from the hypertrophy prescription for the exercise's mechanic"""
+    known = lookup_exercise(exercise)
+    mechanic = "isolation" if known and not known["compound"] else "compound"
+    _, reps, rpe, _ = PRESCRIPTIONS["hypertrophy"][mechanic]
+    low, high = _rep_range(reps)
+    return {"rep_low": low, "rep_high": high, "target_rpe": rpe}
+
+
+def load_increment(exercise: str) -> float:
+    """Smallest sensible load jump for an exercise"""
+    known = lookup_exercise(exercise)
+    if known and not known["compound"]:
+        return INCREMENTS["isolation"]
+    if known and known["pattern"] in LOWER_BODY_PATTERNS:
+        return INCREMENTS["lower"]
+    return INCREMENTS["upper"]
+
+
+def _round_load(weight: float, step: float) -> float:
+    """Round a percentage-based load to what can be loaded (2.5 kg plate pairs, or the step if smaller)"""
+    grain = min(step, INCREMENTS["upper"])
+    return round(round(weight / grain) * grain, 2)
+
+
+def _session_summaries(rows: List[Tuple]) -> Dict[str, List[Dict]]:
+    """
+    Exercise -> sessions in day order, each reduced to its top working weight
+
+    One sort by (exercise, day), then segment reductions over all sessions at once.
+    """
+    names, codes = np.unique(np.array([r[1] for r in rows], dtype=str), return_inverse=True)
+    day = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    order = np.lexsort((day, codes))
+    codes, day = codes[order], day[order]
+    weight = np.fromiter((r[3] for r in rows), dtype=np.float64, count=len(rows))[order]
+    reps = np.fromiter((r[4] for r in rows), dtype=np.float64, count=len(rows))[order]
+    rpe = np.fromiter((np.nan if r[5] is None else r[5] for r in rows), dtype=np.float64, count=len(rows))[order]
+
+    starts = segment_starts(codes.astype(np.int64) * (day.max() + 1) + day)
+    sizes = np.diff(np.append(starts, len(day)))
+    top_weight = np.maximum.reduceat(weight, starts)
+    top = weight == np.repeat(top_weight, sizes)
+    top_sets = np.add.reduceat(top.astype(np.int64), starts)
+    top_reps = np.minimum.reduceat(np.where(top, reps, np.inf), starts)
+    rated = top & ~np.isnan(rpe)
+    rpe_count = np.add.reduceat(rated.astype(np.int64), starts)
+    rpe_sum = np.add.reduceat(np.where(rated, rpe, 0.0), starts)
+    metric = np.where(top_weight > 0, np.maximum.reduceat(estimated_1rm(weight, reps, rpe), starts),
+                      np.maximum.reduceat(reps, starts))
+
+    sessions: Dict[str, List[Dict]] = {}
+    for i, start in enumerate(starts.tolist()):
+        sessions.setdefault(str(names[codes[start]]), []).append({
+            "day": int(day[start]),
+            "weight_kg": float(top_weight[i]),
+            "sets": int(top_sets[i]),
+            "reps": int(top_reps[i]),
+            "rpe": round(float(rpe_sum[i] / rpe_count[i]), 1) if rpe_count[i] else None,
+            "metric": float(metric[i])
+        })
+    return sessions
+
+
+def _advance(state: Optional[Dict], session: Dict, exercise: str) -> Dict:
+    """State after one more session"""
+    if state is None:
+        return {"exercise": exercise, "last_day": session["day"], "sessions": 1,
+                "weight_kg": session["weight_kg"], "sets": session["sets"], "reps": session["reps"],
+                "rpe": session["rpe"], "best_metric": session["metric"], "stalled_sessions": 0,
+                "pre_deload_weight_kg": None, "pre_deload_sets": None}
+
+    stalled = state["stalled_sessions"]
+    pre_deload, pre_deload_sets = state["pre_deload_weight_kg"], state["pre_deload_sets"]
+    if pre_deload is not None and session["weight_kg"] >= pre_deload * DELOAD_DETECT_SHARE:
+        pre_deload = pre_deload_sets = None
+    if stalled >= DELOAD_AFTER_STALLS and session["weight_kg"] <= state["weight_kg"] * DELOAD_DETECT_SHARE:
+        # The prescribed deload was taken: restart the count and return to the old load and sets next
+        stalled, pre_deload, pre_deload_sets = 0, state["weight_kg"], state["sets"]
+    elif session["metric"] > state["best_metric"] or session["weight_kg"] > state["weight_kg"]:
+        stalled = 0
+    else:
+        stalled += 1
+
+    return {**state, "last_day": session["day"], "sessions": state["sessions"] + 1,
+            "weight_kg": session["weight_kg"], "sets": session["sets"], "reps": session["reps"],
+            "rpe": session["rpe"], "best_metric": max(state["best_metric"], session["metric"]),
+            "stalled_sessions": stalled, "pre_deload_weight_kg": pre_deload,
+            "pre_deload_sets": pre_deload_sets}
+
+
+def _load_states(conn, user_id: str, exercises: Optional[List[str]] = None) -> Dict[str, Dict]:
+    query = f"SELECT {', '.join(_STATE_COLUMNS)} FROM progression_state WHERE user_id = ?"
+    params: List = [user_id]
+    if exercises:
+        query += f" AND exercise IN ({', '.join('?' for _ in exercises)})"
+        params += exercises
+    return {row["exercise"]: dict(row) for row in conn.execute(query, params).fetchall()}
+
+
+def update_progression(user_id: str, rows: List[Tuple]) -> Set[str]:
+    """
+    Advance progression state with newly logged sessions
+
+    Args:
+        user_id: Owner of the sets
+        rows: (day, exercise, set number, weight kg, reps, rpe) tuples holding
+            complete sessions
+
+    Returns:
+        Exercises whose new sessions are not after their last state update
+        (they need rebuild_progression from full history)
+    """
+    if not rows:
+        return set()
+    sessions = _session_summaries(rows)
+    conn = get_connection(_SCHEMA)
+    states = _load_states(conn, user_id, list(sessions))
+
+    stale, updated = set(), []
+    for exercise, items in sessions.items():
+        state = states.get(exercise)
+        if state is not None and items[0]["day"] <= state["last_day"]:
+            stale.add(exercise)
+            continue
+        for session in items:
+            state = _advance(state, session, exercise)
+        updated.append(state)
+
+    with conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO progression_state (user_id, {', '.join(_STATE_COLUMNS)}) "
+            f"VALUES (?, {', '.join('?' for _ in _STATE_COLUMNS)})",
+            [(user_id, *(state[col] for col in _STATE_COLUMNS)) for state in updated]
+        )
+    return stale
+
+
+def rebuild_progression(user_id: str, exercises: Iterable[str], rows: List[Tuple]) -> None:
+    """Replay the full history of some exercises from a fresh state"""
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.executemany(
+            "DELETE FROM progression_state WHERE user_id = ? AND exercise = ?",
+            [(user_id, exercise) for exercise in exercises]
+        )
+    update_progression(user_id, rows)
+
+
+def get_progression(user_id: str, exercises: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """Stored state per exercise"""
+    return _load_states(get_connection(_SCHEMA), user_id, exercises)
+
+
+def set_preferences(user_id: str, exercise: str, rep_low: int, rep_high: int, target_rpe: float) -> None:
+    """Store a custom rep range and target RPE for one exercise"""
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO progression_preferences (user_id, exercise, rep_low, rep_high, target_rpe) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (user_id, exercise, int(rep_low), int(rep_high), float(target_rpe))
+        )
+
+
+def get_preferences(user_id: str, exercises: Iterable[str]) -> Dict[str, Dict]:
+    """Rep range and target RPE per exercise (stored, else the defaults)"""
+    exercises = list(exercises)
+    prefs = {e: default_preferences(e) for e in exercises}
+    if exercises:
+        rows = get_connection(_SCHEMA).execute(
+            "SELECT exercise, rep_low, rep_high, target_rpe FROM progression_preferences "
+            f"WHERE user_id = ? AND exercise IN ({', '.join('?' for _ in exercises)})",
+            [user_id, *exercises]
+        ).fetchall()
+        for row in rows:
+            prefs[row["exercise"]] = {"rep_low": row["rep_low"], "rep_high": row["rep_high"],
+                                      "target_rpe": row["target_rpe"]}
+    return prefs
+
+
+def recommend(state: Dict, prefs: Dict, today: int) -> Dict:
+    """
+    Next-session prescription from an exercise's state
+
+    Rules, first match wins: ease back in after a long break; return to the
+    pre-deload load and sets; add load once every working set hit the top of
+    the range (double progression, so sessions stuck at the top never count
+    toward a deload); deload after repeated stalls; take load off when the
+    last session was a grind below the range; add load when RPE shows the
+    load is clearly too light; otherwise add a rep.
+
+    Returns:
+        Dictionary with action, next weight/sets/reps/target RPE and the reason
+    """
+    low, high, target = prefs["rep_low"], prefs["rep_high"], prefs["target_rpe"]
+    step = load_increment(state["exercise"])
+    weight, sets, reps, rpe = state["weight_kg"], state["sets"], state["reps"], state["rpe"]
+    days_off = today - state["last_day"]
+    rpe_known = rpe is not None and not math.isnan(rpe)
+
+    if weight == 0:
+        if reps >= high:
+            return {"action": "add_load", "weight_kg": None, "sets": sets, "reps": low, "target_rpe": target,
+                    "reason": f"Top of the {low}-{high} range reached with bodyweight; add load or a harder variation"}
+        return {"action": "add_reps", "weight_kg": 0.0, "sets": sets, "reps": min(reps + 1, high),
+                "target_rpe": target, "reason": "Add one rep per set until the top of the range"}
+
+    if days_off > BREAK_DAYS:
+        action, weight, reps = "return_from_break", _round_load(weight * BREAK_FACTOR, step), low
+        reason = f"{days_off} days since the last session; restart about 10% lighter"
+    elif state["pre_deload_weight_kg"] is not None:
+        action, weight, reps = "resume_after_deload", state["pre_deload_weight_kg"], low
+        sets = state["pre_deload_sets"] or sets
+        reason = "Deload done; return to the previous working weight at the bottom of the range"
+    elif reps >= high and (not rpe_known or rpe <= target + RPE_TOLERANCE):
+        action, weight, reps = "increase_weight", round(weight + step, 2), low
+        reason = f"All working sets reached {high} reps; add {step:g} kg and restart at {low}"
+    elif state["stalled_sessions"] >= DELOAD_AFTER_STALLS:
+        action, weight, sets = "deload", _round_load(weight * DELOAD_FACTOR, step), max(sets - 1, 1)
+        target = min(target, 7.0)
+        reason = f"No new best in {state['stalled_sessions']} sessions; one lighter session to recover"
+    elif rpe_known and rpe >= MAX_RPE and reps < low:
+        action, weight, reps = "reduce_weight", round(weight - step, 2), low
+        reason = f"Last session was RPE {rpe} below the {low}-{high} range; take a step off"
+    elif rpe_known and rpe <= target - EASY_RPE_MARGIN and reps >= low:
+        action, weight = "increase_weight", round(weight + step, 2)
+        reason = f"RPE {rpe} is well under the target {target:g}; add {step:g} kg at the same reps"
+    else:
+        action, reps = "add_reps", min(max(reps + 1, low), high)
+        reason = f"Keep {weight:g} kg and aim for {reps} reps on every set"
+
+    return {"action": action, "weight_kg": weight, "sets": sets, "reps": reps, "target_rpe": target,
+            "reason": reason}
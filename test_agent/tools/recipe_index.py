@@ -0,0 +1,298 @@
+"""
+Recipe Index for FitCoach AI
+Local recipe corpus over the food catalog with an ingredient -> recipe inverted index
+
+Recipes are written per serving in catalog foods. Core ingredients must be in
+the fridge; extras are added only when available. Macros are computed from the
+catalog nutrient matrix, never estimated.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from tools.food_catalog import (
+    FOOD_TAG_BITS, FOODS, NUTRIENT_MATRIX, allowed_by_bits, combine_tag_bits, lookup_food
+)
+
+
+# Typical calories of one meal - the target is the smaller of this and the remaining budget
+MEAL_CALORIE_CAPS = {"breakfast": 600, "lunch": 800, "dinner": 750, "snack": 300}
+DEFAULT_MEAL_CALORIE_CAP = 700
+
+# Portion scaling range applied to a recipe to hit the calorie target
+_MIN_SCALE = 0.6
+_MAX_SCALE = 1.5
+
+# Score weights: calorie fit, share of extras available, expiring items used
+_FIT_WEIGHT = 0.5
+_EXTRAS_WEIGHT = 0.2
+_EXPIRING_WEIGHT = 0.3
+
+_SLOT_CODES = {"B": "breakfast", "L": "lunch", "D": "dinner", "S": "snack"}
+
+# name, meal slots, prep minutes, ingredients (catalog food, grams per serving, core), steps
+_RECIPE_ROWS = [
+    ("Spinach & Tomato Scramble", "B", 10,
+     [("egg", 150, True), ("spinach", 60, True), ("tomato", 80, False), ("butter", 5, False),
+      ("whole wheat bread", 40, False)],
+     ["Wilt the spinach in a pan with the butter", "Add the beaten eggs and stir gently until just set",
+      "Serve with sliced tomato and toast"]),
+    ("Berry Protein Oats", "B", 8,
+     [("oats", 60, True), ("milk", 200, True), ("blueberries", 80, False), ("whey protein", 25, False),
+      ("chia seeds", 10, False)],
+     ["Simmer the oats in the milk for 4-5 minutes", "Take off the heat and stir in the protein powder",
+      "Top with berries and chia seeds"]),
+    ("Greek Yogurt Bowl", "BS", 5,
+     [("greek yogurt", 200, True), ("strawberries", 100, False), ("walnuts", 15, False), ("oats", 30, False)],
+     ["Spoon the yogurt into a bowl", "Top with sliced strawberries, oats and chopped walnuts"]),
+    ("Banana Peanut Butter Toast", "BS", 5,
+     [("whole wheat bread", 70, True), ("peanut butter", 20, True), ("banana", 100, True)],
+     ["Toast the bread", "Spread the peanut butter and top with banana slices"]),
+    ("Cottage Cheese Berry Bowl", "BS", 5,
+     [("cottage cheese", 200, True), ("blueberries", 80, False), ("almonds", 15, False)],
+     ["Add the cottage cheese to a bowl", "Top with blueberries and chopped almonds"]),
+    ("Pepper & Mushroom Omelette", "BLD", 12,
+     [("egg", 150, True), ("bell pepper", 60, True), ("mushrooms", 60, False), ("feta cheese", 30, False),
+      ("olive oil", 5, False)],
+     ["Saute the pepper and mushrooms in the oil for 4 minutes", "Pour in the beaten eggs and cook on low heat",
+      "Crumble the feta on top, fold and serve"]),
+    ("Avocado Egg Toast", "BL", 10,
+     [("whole wheat bread", 70, True), ("avocado", 70, True), ("egg", 100, False), ("tomato", 60, False)],
+     ["Toast the bread and mash the avocado on top", "Fry or poach the eggs and place them on the toast",
+      "Finish with tomato slices"]),
+    ("Bacon & Eggs with Spinach", "B", 12,
+     [("egg", 150, True), ("bacon", 40, True), ("spinach", 60, False), ("butter", 5, False)],
+     ["Crisp the bacon in a pan", "Fry the eggs in the butter", "Wilt the spinach in the same pan and serve"]),
+    ("Chicken, Rice & Broccoli", "LD", 25,
+     [("chicken breast", 150, True), ("rice", 200, True), ("broccoli", 150, False), ("olive oil", 10, False)],
+     ["Season and grill the chicken 6-7 minutes per side", "Steam the broccoli for 5 minutes",
+      "Serve over the rice with a drizzle of olive oil"]),
+    ("Salmon with Sweet Potato & Green Beans", "LD", 30,
+     [("salmon", 150, True), ("sweet potato", 200, True), ("green beans", 120, False), ("olive oil", 5, False)],
+     ["Roast the sweet potato cubes at 200C for 25 minutes", "Bake the salmon for the last 12 minutes",
+      "Boil the green beans for 5 minutes and serve together"]),
+    ("Beef & Pepper Stir-Fry", "LD", 20,
+     [("beef", 130, True), ("bell pepper", 100, True), ("rice", 180, False), ("zucchini", 100, False),
+      ("olive oil", 10, False)],
+     ["Slice the beef thinly and sear on high heat", "Add the peppers and zucchini and stir-fry 4 minutes",
+      "Serve over rice"]),
+    ("Turkey Tomato Pasta", "LD", 25,
+     [("turkey breast", 130, True), ("pasta", 180, True), ("tomato", 150, True), ("spinach", 50, False),
+      ("olive oil", 5, False)],
+     ["Cook the pasta", "Brown the diced turkey in the oil, add chopped tomatoes and simmer 10 minutes",
+      "Stir in the spinach and toss with the pasta"]),
+    ("Tuna Salad", "LD", 10,
+     [("tuna", 120, True), ("lettuce", 80, True), ("cucumber", 100, False), ("tomato", 100, False),
+      ("chickpeas", 80, False), ("olive oil", 10, False)],
+     ["Chop the vegetables", "Toss with the tuna and chickpeas", "Dress with olive oil"]),
+    ("Lentil & Carrot Stew", "LD", 35,
+     [("lentils", 250, True), ("carrot", 100, True), ("tomato", 100, False), ("spinach", 50, False),
+      ("olive oil", 10, False)],
+     ["Soften the diced carrot in the oil", "Add the tomatoes and cooked lentils and simmer 15 minutes",
+      "Stir in the spinach before serving"]),
+    ("Chickpea Quinoa Bowl", "LD", 20,
+     [("chickpeas", 150, True), ("quinoa", 150, True), ("cucumber", 80, False), ("tomato", 80, False),
+      ("hummus", 40, False)],
+     ["Cook the quinoa", "Top with chickpeas and chopped vegetables", "Finish with a spoon of hummus"]),
+    ("Tofu Veggie Stir-Fry", "LD", 20,
+     [("tofu", 200, True), ("broccoli", 120, True), ("rice", 180, False), ("bell pepper", 80, False),
+      ("olive oil", 10, False)],
+     ["Press and cube the tofu, then brown it in the oil", "Add the vegetables and stir-fry 5 minutes",
+      "Serve over rice"]),
+    ("Cod with Potatoes & Zucchini", "LD", 30,
+     [("cod", 180, True), ("potato", 250, True), ("zucchini", 150, False), ("olive oil", 10, False)],
+     ["Boil the potatoes for 15 minutes", "Bake the cod with the sliced zucchini and oil at 200C for 12 minutes",
+      "Serve together"]),
+    ("Shrimp Quinoa Bowl", "LD", 15,
+     [("shrimp", 150, True), ("quinoa", 150, True), ("avocado", 50, False), ("cucumber", 80, False)],
+     ["Cook the quinoa", "Sear the shrimp 2 minutes per side", "Top the quinoa with shrimp, avocado and cucumber"]),
+    ("Chicken Thigh Buckwheat Skillet", "LD", 30,
+     [("chicken thigh", 150, True), ("buckwheat", 180, True), ("mushrooms", 100, False), ("carrot", 60, False)],
+     ["Brown the chicken thighs on both sides", "Add the mushrooms and carrot and cook 8 minutes",
+      "Stir in the cooked buckwheat and heat through"]),
+    ("Pork Tenderloin with Cauliflower Mash", "LD", 30,
+     [("pork tenderloin", 150, True), ("cauliflower", 250, True), ("green beans", 100, False),
+      ("butter", 10, False)],
+     ["Sear the pork and roast at 200C for 15 minutes", "Boil the cauliflower and mash it with the butter",
+      "Serve with boiled green beans"]),
+    ("Polenta with Feta & Egg", "BLD", 15,
+     [("polenta", 250, True), ("feta cheese", 50, True), ("egg", 50, False), ("butter", 5, False)],
+     ["Cook the polenta and stir in the butter", "Top with crumbled feta", "Add a fried egg on top"]),
+    ("Bean & Tomato Chili", "LD", 35,
+     [("beans", 200, True), ("tomato", 150, True), ("beef", 100, False), ("bell pepper", 80, False),
+      ("rice", 100, False)],
+     ["Brown the beef if using", "Add the peppers, tomatoes and beans and simmer 20 minutes",
+      "Serve with rice"]),
+    ("Tempeh Spinach Salad", "LD", 15,
+     [("tempeh", 120, True), ("spinach", 80, True), ("cucumber", 80, False), ("tomato", 80, False),
+      ("olive oil", 10, False)],
+     ["Slice and pan-fry the tempeh until golden", "Toss the spinach and vegetables with the oil",
+      "Top with the tempeh"]),
+    ("Salmon Avocado Salad", "LD", 15,
+     [("salmon", 130, True), ("lettuce", 100, True), ("avocado", 70, False), ("cucumber", 80, False),
+      ("olive oil", 10, False)],
+     ["Pan-sear the salmon 4 minutes per side", "Toss the lettuce, cucumber and avocado with the oil",
+      "Flake the salmon over the salad"]),
+    ("Chicken Caesar-Style Salad", "LD", 20,
+     [("chicken breast", 130, True), ("lettuce", 120, True), ("cheddar cheese", 20, False),
+      ("whole wheat bread", 30, False), ("olive oil", 10, False)],
+     ["Grill and slice the chicken", "Cube and toast the bread into croutons",
+      "Toss the lettuce with oil, cheese, croutons and chicken"]),
+    ("Apple & Peanut Butter", "S", 2,
+     [("apple", 150, True), ("peanut butter", 20, True)],
+     ["Slice the apple and serve with the peanut butter"]),
+    ("Hummus Veggie Sticks", "S", 5,
+     [("hummus", 60, True), ("carrot", 80, True), ("cucumber", 80, False), ("bell pepper", 60, False)],
+     ["Cut the vegetables into sticks and serve with the hummus"]),
+    ("Banana Protein Shake", "BS", 3,
+     [("whey protein", 30, True), ("milk", 250, True), ("banana", 100, False)],
+     ["Blend everything until smooth"]),
+    ("Berry Soy Smoothie", "BS", 3,
+     [("soy milk", 250, True), ("banana", 100, True), ("strawberries", 100, False), ("oats", 20, False)],
+     ["Blend everything until smooth"]),
+    ("Nut & Seed Mix", "S", 1,
+     [("almonds", 15, True), ("walnuts", 15, True), ("pumpkin seeds", 10, False)],
+     ["Mix and portion into a small bowl"]),
+    ("Cheese & Cucumber Plate", "S", 5,
+     [("cheddar cheese", 40, True), ("cucumber", 150, True), ("whole wheat bread", 30, False)],
+     ["Slice the cheese and cucumber and serve with the bread"])
+]
+
+
+def _build_recipes(rows) -> List[Dict]:
+    """Resolve ingredient names to catalog ids"""
+    recipes = []
+    for idx, (name, slots, prep, ingredients, steps) in enumerate(rows):
+        recipes.append({
+            "id": idx,
+            "name": name,
+            "meal_types": [_SLOT_CODES[c] for c in slots],
+            "prep_time_minutes": prep,
+            "food_ids": np.array([lookup_food(food)["id"] for food, _, _ in ingredients]),
+            "grams": np.array([grams for _, grams, _ in ingredients], dtype=np.float64),
+            "core": np.array([core for _, _, core in ingredients]),
+            "instructions": steps
+        })
+    return recipes
+
+
+RECIPES = _build_recipes(_RECIPE_ROWS)
+
+
+def _build_postings(recipes: List[Dict]) -> Dict[int, np.ndarray]:
+    """Inverted index: catalog food id -> ids of recipes that need it as a core ingredient"""
+    postings = {}
+    for recipe in recipes:
+        for food_id in recipe["food_ids"][recipe["core"]]:
+            postings.setdefault(int(food_id), []).append(recipe["id"])
+    return {food_id: np.array(ids) for food_id, ids in postings.items()}
+
+
+INGREDIENT_POSTINGS = _build_postings(RECIPES)
+
+CORE_COUNTS = np.array([int(r["core"].sum()) for r in RECIPES])
+
+# Restriction bits of each recipe's core ingredients (extras are checked against the inventory)
+RECIPE_TAG_BITS = np.array(
+    [combine_tag_bits(FOOD_TAG_BITS[r["food_ids"][r["core"]]].tolist()) for r in RECIPES], dtype=np.uint32
+)
+
+
+def _format_suggestion(recipe: Dict, used: np.ndarray, scale: float, nutrients: np.ndarray) -> Dict:
+    """Meal dictionary in the same shape as the LLM suggestion"""
+    grams = recipe["grams"][used] * scale
+    food_ids = recipe["food_ids"][used]
+    item_calories = NUTRIENT_MATRIX[food_ids, 0] * grams / 100
+    total = nutrients.sum(axis=0)
+    missing_extras = [FOODS[fid]["name"] for fid in recipe["food_ids"][~used]]
+    tips = []
+    if abs(scale - 1) > 0.05:
+        tips.append(f"Portions scaled x{scale:.2f} to fit the calorie target")
+    if missing_extras:
+        tips.append(f"Also good with {', '.join(missing_extras)} if you have them (not counted)")
+    return {
+        "meal_name": recipe["name"],
+        "ingredients": [
+            {"item": FOODS[fid]["name"], "amount": f"{int(round(g / 5) * 5)}g", "calories": int(round(cal))}
+            for fid, g, cal in zip(food_ids, grams, item_calories)
+        ],
+        "instructions": recipe["instructions"],
+        "total_calories": int(round(total[0])),
+        "macros": {
+            "protein_g": round(float(total[1]), 1),
+            "carbs_g": round(float(total[2]), 1),
+            "fats_g": round(float(total[3]), 1)
+        },
+        "prep_time_minutes": recipe["prep_time_minutes"],
+        "tips": ". ".join(tips)
+    }
+
+
+def match_recipes(
+    available_ids: Iterable[int],
+    remaining_calories: float,
+    meal_type: Optional[str] = None,
+    required: int = 0,
+    forbidden: int = 0,
+    priority_ids: Iterable[int] = (),
+    limit: int = 5
+) -> List[Dict]:
+    """
+    Rank recipes that can be cooked from the available foods
+
+    Args:
+        available_ids: Catalog ids of foods in the fridge (already restriction-filtered)
+        remaining_calories: Calorie budget left for the day
+        meal_type: Optional "breakfast", "lunch", "dinner" or "snack"
+        required, forbidden: Restriction masks from food_catalog.restriction_masks
+        priority_ids: Catalog ids of foods expiring soon - recipes using them rank higher
+        limit: Maximum number of suggestions
+
+    Returns:
+        List of {"meal", "score", "uses_expiring"} dictionaries, best first
+    """
+    available = np.zeros(len(FOODS), dtype=bool)
+    available[list(available_ids)] = True
+    priority = np.zeros(len(FOODS), dtype=bool)
+    priority[list(priority_ids)] = True
+
+    # Count core hits through the postings - only recipes sharing an ingredient are touched
+    hits = np.zeros(len(RECIPES), dtype=np.int64)
+    for food_id in np.flatnonzero(available):
+        postings = INGREDIENT_POSTINGS.get(int(food_id))
+        if postings is not None:
+            hits[postings] += 1
+    candidates = (hits == CORE_COUNTS) & allowed_by_bits(RECIPE_TAG_BITS, required, forbidden)
+
+    target = min(remaining_calories, MEAL_CALORIE_CAPS.get(meal_type, DEFAULT_MEAL_CALORIE_CAP))
+    if target <= 0:
+        return []
+
+    ranked = []
+    for recipe_id in np.flatnonzero(candidates):
+        recipe = RECIPES[recipe_id]
+        if meal_type and meal_type not in recipe["meal_types"]:
+            continue
+        used = recipe["core"] | available[recipe["food_ids"]]
+        base = NUTRIENT_MATRIX[recipe["food_ids"][used]] * (recipe["grams"][used, None] / 100)
+        base_calories = base[:, 0].sum()
+        scale = float(np.clip(target / base_calories, _MIN_SCALE, _MAX_SCALE))
+        calories = base_calories * scale
+        # Even the smallest portion is over budget: leave it to the LLM fallback
+        if calories > remaining_calories:
+            continue
+
+        fit = 1.0 - min(abs(np.log(calories / target)), 1.0)
+        extras = ~recipe["core"]
+        extras_share = used[extras].mean() if extras.any() else 1.0
+        expiring = priority[recipe["food_ids"][used]]
+        score = _FIT_WEIGHT * fit + _EXTRAS_WEIGHT * extras_share + _EXPIRING_WEIGHT * min(expiring.sum(), 2) / 2
+
+        ranked.append({
+            "meal": _format_suggestion(recipe, used, scale, base * scale),
+            "score": round(float(score), 3),
+            "uses_expiring": [FOODS[fid]["name"] for fid in recipe["food_ids"][used][expiring]]
+        })
+
+    ranked.sort(key=lambda r: r["score"], reverse=True)
+    return ranked[:limit]
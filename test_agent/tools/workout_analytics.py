@@ -0,0 +1,255 @@
+"""
+Workout Analytics for FitCoach AI
+Strength and volume trends over logged sets, computed in whole-array passes
+
+Sets are sorted once by (exercise, day). Every per-exercise and per-week
+figure is then a segment reduction (np.*.reduceat) over that order, so a
+multi-year history costs one sort plus a few linear passes, not a Python
+loop per set.
+"""
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from tools.exercise_catalog import EXERCISES, MUSCLE_MATRIX, MUSCLES
+from tools.exercise_names import exercise_ids, exercise_name
+from utils.validators import as_column_arrays
+
+
+# Sets above this many reps (including reps in reserve) give unreliable 1RM estimates
+MAX_E1RM_REPS = 12
+# RPE below 6 is too far from failure to read reps in reserve from
+MAX_RESERVE_REPS = 4
+
+# An exercise is stalled after STALL_WEEKS without a new best while still being
+# trained (within ACTIVE_WEEKS) at least MIN_STALL_SESSIONS times in that span
+STALL_WEEKS = 4
+ACTIVE_WEEKS = 2
+MIN_STALL_SESSIONS = 3
+
+# Weekly tonnage trend: least-squares slope over the last complete weeks, as a share of their mean
+TREND_WEEKS = 8
+TREND_THRESHOLD = 0.02
+
+# Exercises listed when the caller does not name any (most trained first)
+MAX_EXERCISES = 15
+
+
+def estimated_1rm(weight, reps, rpe=None) -> np.ndarray:
+    """
+    Epley one-rep max per set; with RPE, reps left in reserve are added first
+
+    Sets without load or beyond MAX_E1RM_REPS get 0.
+    """
+    weight = np.asarray(weight, dtype=np.float64)
+    reps = np.asarray(reps, dtype=np.float64)
+    effective = reps
+    if rpe is not None:
+        rpe = np.asarray(rpe, dtype=np.float64)
+        effective = reps + np.where(np.isnan(rpe), 0.0, np.clip(10.0 - rpe, 0.0, MAX_RESERVE_REPS))
+    e1rm = np.where(effective <= 1, weight, weight * (1 + effective / 30))
+    return np.where((weight > 0) & (reps >= 1) & (effective <= MAX_E1RM_REPS), e1rm, 0.0)
+
+
+def _float_column(values) -> np.ndarray:
+    """Float array with None -> NaN (columns coming from JSON are object arrays)"""
+    if values.dtype == object:
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return values.astype(np.float64)
+
+
+def segment_starts(keys: np.ndarray) -> np.ndarray:
+    """Start index of each run of equal values in a sorted array"""
+    return np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+
+
+def _slope_share(values: np.ndarray) -> Optional[float]:
+    """Least-squares slope per step as a share of the mean, None when flat at zero"""
+    mean = values.mean()
+    if len(values) < 2 or mean <= 0:
+        return None
+    x = np.arange(len(values)) - (len(values) - 1) / 2
+    return float((x * (values - mean)).sum() / (x * x).sum() / mean)
+
+
+def _iso(ordinal: int) -> str:
+    return date.fromordinal(int(ordinal)).isoformat()
+
+
+def progress_report(data, weeks: int = 12, today: Optional[int] = None,
+                    max_exercises: Optional[int] = MAX_EXERCISES) -> Dict:
+    """
+    Strength, volume and stall analysis of a set history
+
+    Args:
+        data: DataFrame or mapping of columns day (date ordinal), exercise,
+            weight_kg and reps, optionally rpe and exercise_id (resolved from
+            the names when absent)
+        weeks: Length of the reporting window in weeks
+        today: Reference date ordinal, today by default
+        max_exercises: Cap on the per-exercise list (None for all)
+
+    Returns:
+        Dictionary with totals, weekly volume (sets, tonnage, sessions) for the
+        window, its trend, per-exercise progress and weekly sets per muscle
+    """
+    cols = as_column_arrays(data, ["day", "exercise", "weight_kg", "reps"], optional=["rpe", "exercise_id"])
+    today = today or date.today().toordinal()
+    if not len(cols["day"]):
+        return {"total_sets": 0, "total_workouts": 0, "weekly_volume": [], "exercises": []}
+
+    # One sort: by exercise id, then day
+    ids = cols["exercise_id"].astype(np.int64) if "exercise_id" in cols else exercise_ids(cols["exercise"])
+    ex_ids, codes = np.unique(ids, return_inverse=True)
+    order = np.lexsort((cols["day"], codes))
+    codes = codes[order]
+    day = cols["day"].astype(np.int64)[order]
+    weight = _float_column(cols["weight_kg"])[order]
+    reps = cols["reps"].astype(np.float64)[order]
+    rpe = _float_column(cols["rpe"])[order] if "rpe" in cols else None
+
+    tonnage = weight * reps
+    e1rm = estimated_1rm(weight, reps, rpe)
+    week = (day - 1) // 7  # date ordinal 1 is a Monday
+    this_week = (today - 1) // 7
+    first_week = this_week - weeks + 1
+
+    ex_starts = segment_starts(codes)
+    ex_codes = codes[ex_starts]
+    set_exercise = np.repeat(np.arange(len(ex_starts)), np.diff(np.append(ex_starts, len(codes))))
+
+    # Progress metric: e1RM for loaded exercises, best reps for bodyweight ones
+    loaded = np.maximum.reduceat(e1rm > 0, ex_starts)
+    perf = np.where(loaded[set_exercise], e1rm, reps)
+
+    # Sessions: first set of each (exercise, day)
+    new_session = np.ones(len(codes), dtype=bool)
+    new_session[1:] = (codes[1:] != codes[:-1]) | (day[1:] != day[:-1])
+
+    # Weekly bests per exercise, then the running best to find when each last improved
+    wk_key = codes.astype(np.int64) * (week.max() + 1) + week
+    wk_starts = segment_starts(wk_key)
+    wk_best = np.maximum.reduceat(perf, wk_starts)
+    wk_week = week[wk_starts]
+    wk_exercise = set_exercise[wk_starts]
+    offset = wk_exercise * (perf.max() + 1.0)
+    running = np.maximum.accumulate(wk_best + offset) - offset
+    improved = np.ones(len(wk_starts), dtype=bool)
+    improved[1:] = (wk_best[1:] > running[:-1]) | (wk_exercise[1:] != wk_exercise[:-1])
+    ex_wk_starts = segment_starts(wk_exercise)
+    last_pr_week = np.maximum.reduceat(np.where(improved, wk_week, -1), ex_wk_starts)
+
+    best = np.maximum.reduceat(perf, ex_starts)
+    best_day = np.maximum.reduceat(np.where(perf == best[set_exercise], day, 0), ex_starts)
+    last_day = np.maximum.reduceat(day, ex_starts)
+
+    recent = week > this_week - STALL_WEEKS
+    current = np.maximum.reduceat(np.where(recent, perf, 0), ex_starts)
+    baseline_mask = (week >= first_week) & (week < first_week + STALL_WEEKS)
+    baseline = np.maximum.reduceat(np.where(baseline_mask, perf, 0), ex_starts)
+    in_window = (week >= first_week) & (week <= this_week)
+    window_sets = np.add.reduceat(in_window.astype(np.int64), ex_starts)
+    window_tonnage = np.add.reduceat(np.where(in_window, tonnage, 0), ex_starts)
+    sessions = np.add.reduceat(new_session.astype(np.int64), ex_starts)
+    recent_sessions = np.add.reduceat((new_session & recent).astype(np.int64), ex_starts)
+
+    weeks_since_pr = this_week - last_pr_week
+    active = last_day > today - ACTIVE_WEEKS * 7
+    stalled = active & (weeks_since_pr >= STALL_WEEKS) & (recent_sessions >= MIN_STALL_SESSIONS)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where((baseline > 0) & (current > 0), (current - baseline) / baseline * 100, np.nan)
+
+    # Most trained in the window first, then most recent
+    ranking = np.lexsort((-last_day, -window_sets))
+    if max_exercises:
+        ranking = ranking[:max_exercises]
+    exercises = []
+    for i in ranking:
+        exercises.append({
+            "exercise": exercise_name(int(ex_ids[ex_codes[i]])),
+            "metric": "estimated_1rm_kg" if loaded[i] else "reps",
+            "best": round(float(best[i]), 1),
+            "best_date": _iso(best_day[i]),
+            "current": round(float(current[i]), 1) if current[i] > 0 else None,
+            "change_pct": round(float(change[i]), 1) if not np.isnan(change[i]) else None,
+            "sessions": int(sessions[i]),
+            "sets_in_window": int(window_sets[i]),
+            "tonnage_in_window_kg": round(float(window_tonnage[i])),
+            "last_trained": _iso(last_day[i]),
+            "weeks_since_best": int(weeks_since_pr[i]),
+            "stalled": bool(stalled[i])
+        })
+
+    # Weekly totals over all exercises for the window
+    slot = week[in_window] - first_week
+    weekly_sets = np.bincount(slot, minlength=weeks)
+    weekly_tonnage = np.bincount(slot, weights=tonnage[in_window], minlength=weeks)
+    session_days = np.unique(day[in_window])
+    weekly_sessions = np.bincount((session_days - 1) // 7 - first_week, minlength=weeks)
+    weekly_volume = [
+        {
+            "week_start": _iso((first_week + i) * 7 + 1),
+            "sessions": int(weekly_sessions[i]),
+            "sets": int(weekly_sets[i]),
+            "tonnage_kg": round(float(weekly_tonnage[i]))
+        }
+        for i in range(weeks)
+    ]
+
+    # Trend over complete weeks only (the current week is still in progress)
+    complete = weekly_tonnage[:-1][-TREND_WEEKS:]
+    slope = _slope_share(complete)
+    if slope is None:
+        volume_trend = "insufficient_data"
+    elif slope > TREND_THRESHOLD:
+        volume_trend = "increasing"
+    elif slope < -TREND_THRESHOLD:
+        volume_trend = "decreasing"
+    else:
+        volume_trend = "stable"
+
+    return {
+        "total_workouts": int(len(np.unique(day))),
+        "total_sets": int(len(day)),
+        "first_workout": _iso(day.min()),
+        "last_workout": _iso(day.max()),
+        "exercises_tracked": int(len(ex_starts)),
+        "weekly_volume": weekly_volume,
+        "volume_trend": volume_trend,
+        "tonnage_change_per_week_pct": round(slope * 100, 1) if slope is not None else None,
+        "exercises": exercises,
+        "weekly_sets_per_muscle": _muscle_sets(ex_ids[ex_codes], np.add.reduceat(recent.astype(np.float64), ex_starts))
+    }
+
+
+def _muscle_sets(ids: np.ndarray, recent_sets: np.ndarray) -> Dict[str, float]:
+    """Average weekly sets per muscle over the stall window, for exercises in the catalog"""
+    known = ids < len(EXERCISES)
+    per_muscle = recent_sets[known] @ MUSCLE_MATRIX[ids[known]] / STALL_WEEKS
+    return {m: round(float(v), 1) for m, v in zip(MUSCLES, per_muscle) if v > 0}
+
+
+def recommendations(report: Dict, today: Optional[int] = None) -> List[str]:
+    """Plain-language suggestions from a progress report"""
+    today = today or date.today().toordinal()
+    notes = []
+    if not report.get("total_sets"):
+        return ["No workouts logged yet. Log sessions (or import a Hevy export) to track progress."]
+
+    idle_days = today - date.fromisoformat(report["last_workout"]).toordinal()
+    if idle_days > ACTIVE_WEEKS * 7:
+        notes.append(f"No training logged for {idle_days} days; restart at about 90% of previous loads.")
+
+    for item in report["exercises"]:
+        if item["stalled"]:
+            notes.append(
+                f"{item['exercise']}: no new best in {item['weeks_since_best']} weeks. "
+                "Deload about 10% for a week, or change the rep range or variation."
+            )
+
+    if report["volume_trend"] == "decreasing":
+        notes.append("Weekly training volume is falling; check recovery, schedule and motivation.")
+    elif report["volume_trend"] == "increasing" and any(item["stalled"] for item in report["exercises"]):
+        notes.append("Volume is rising while some lifts stall; more volume may not be the fix, recovery might be.")
+    return notes
@@ -0,0 +1,234 @@
+"""
+Workout Log for FitCoach AI
+Per-user set history read back as columnar arrays for analytics
+
+One row per working set, keyed (user, day, exercise, set number) and
+clustered on that key (WITHOUT ROWID), so a user's history is one range
+scan in date order. Sets logged from chat are added to the day's session
+of that exercise; explicit corrections and the Hevy importer replace the
+whole (day, exercise) session instead. Every write also updates the
+personal record index (tools/personal_records.py) and the per-exercise
+progression state (tools/progression.py).
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from tools.exercise_names import exercise_ids, resolve_exercise
+from tools.personal_records import rebuild_records, update_records
+from tools.progression import rebuild_progression, update_progression
+from utils.database import get_connection
+
+
+LB_TO_KG = 0.45359237
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workout_sets (
+    user_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    exercise TEXT NOT NULL,
+    set_number INTEGER NOT NULL,
+    weight_kg REAL NOT NULL,
+    reps INTEGER NOT NULL,
+    rpe REAL,
+    PRIMARY KEY (user_id, day, exercise, set_number)
+) WITHOUT ROWID;
+"""
+
+# (day ordinal, exercise, set number, weight kg, reps, rpe or None)
+SetRow = Tuple[int, str, int, float, int, Optional[float]]
+
+
+def normalize_exercise(name: str) -> str:
+    """
+    Canonical name of an exercise (see tools/exercise_names.py)
+
+    Catalog name when the name or a known variant of it matches, else the
+    lowercased, single-spaced name. Canonical names map one-to-one to ids.
+    """
+    return resolve_exercise(name)[1]
+
+
+def _set_weight(entry: Dict) -> float:
+    """Load in kg from weight_kg, weight (kg) or weight_lbs"""
+    if entry.get("weight_kg") is not None:
+        return float(entry["weight_kg"])
+    if entry.get("weight_lbs") is not None:
+        return float(entry["weight_lbs"]) * LB_TO_KG
+    return float(entry.get("weight") or 0)
+
+
+def _expand_sets(exercise: Dict) -> List[Tuple[float, int, Optional[float]]]:
+    """(weight, reps, rpe) per set from a list of sets or a "sets x reps @ weight" summary"""
+    sets = exercise.get("sets")
+    if isinstance(sets, list):
+        return [(_set_weight(s), int(s.get("reps") or 0), s.get("rpe")) for s in sets]
+    count = int(sets or 1)
+    return [(_set_weight(exercise), int(exercise.get("reps") or 0), exercise.get("rpe"))] * count
+
+
+def history_rows(workouts: Iterable[Dict]) -> List[SetRow]:
+    """
+    Flatten workout sessions into set rows
+
+    Accepts sessions ({"date", "exercises": [{"name", "sets": [{"weight_kg", "reps", "rpe"}]}]}),
+    summary exercises ({"name", "sets": 3, "reps": 5, "weight": 100}) or flat
+    per-exercise entries carrying their own "date". Sessions without a date
+    are logged today.
+    """
+    rows: List[SetRow] = []
+    numbers: Dict[Tuple[int, str], int] = {}
+    today = date.today().isoformat()
+    for workout in workouts:
+        day = workout.get("date") or today
+        exercises = workout.get("exercises") or [workout]
+        for exercise in exercises:
+            name = exercise.get("name") or exercise.get("exercise")
+            if not name:
+                continue
+            key = (date.fromisoformat(str(exercise.get("date") or day)[:10]).toordinal(), normalize_exercise(name))
+            for weight, reps, rpe in _expand_sets(exercise):
+                if reps > 0:
+                    # Numbered per day and exercise, so a repeated block continues the count
+                    numbers[key] = numbers.get(key, 0) + 1
+                    rows.append((*key, numbers[key], round(weight, 2), reps,
+                                 float(rpe) if rpe is not None else None))
+    return rows
+
+
+def record_sets(user_id: str, rows: List[SetRow], append: bool = False,
+                maintain_indexes: bool = True) -> int:
+    """
+    Store set rows and keep the personal record index and progression state in step
+
+    Args:
+        user_id: Owner of the sets
+        rows: Set rows, each (day, exercise) group a complete session
+        append: Add the rows to already logged sessions (numbered after their
+            last set) instead of replacing those sessions
+        maintain_indexes: False for bulk loads that call rebuild_indexes once at the end
+
+    Returns:
+        Number of sets written
+    """
+    if not rows:
+        return 0
+    conn = get_connection(_SCHEMA)
+    keys = {(r[0], r[1]) for r in rows}
+    with conn:
+        if append:
+            rows, extended = _continue_numbering(conn, user_id, keys, rows)
+            touched = {exercise for _, exercise in extended}
+        else:
+            replaced = conn.executemany(
+                "DELETE FROM workout_sets WHERE user_id = ? AND day = ? AND exercise = ?",
+                [(user_id, day, exercise) for day, exercise in keys]
+            ).rowcount
+            touched = {r[1] for r in rows} if replaced > 0 else set()
+        conn.executemany(
+            "INSERT INTO workout_sets (user_id, day, exercise, set_number, weight_kg, reps, rpe) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(user_id, *row) for row in rows]
+        )
+
+    if not maintain_indexes:
+        return len(rows)
+    if touched:
+        # A correction can lower a record and sets added to a stored session change
+        # that session, so those exercises are rebuilt from history
+        rebuild_indexes(user_id, sorted(touched))
+    new_rows = [r for r in rows if r[1] not in touched]
+    if new_rows:
+        update_records(user_id, new_rows)
+        # Progression state advances in order; sessions older than the state replay their exercise
+        stale = update_progression(user_id, new_rows)
+        if stale:
+            rebuild_progression(user_id, stale, stored_rows(user_id, stale))
+    return len(rows)
+
+
+def delete_sessions(user_id: str, keys: Iterable[Tuple[int, str]]) -> int:
+    """
+    Delete whole (day, exercise) sessions; the caller rebuilds the indexes of their exercises
+
+    Returns:
+        Number of sets deleted
+    """
+    conn = get_connection(_SCHEMA)
+    with conn:
+        return conn.executemany(
+            "DELETE FROM workout_sets WHERE user_id = ? AND day = ? AND exercise = ?",
+            [(user_id, day, exercise) for day, exercise in keys]
+        ).rowcount
+
+
+def _continue_numbering(conn, user_id: str, keys, rows: List[SetRow]) -> Tuple[List[SetRow], Set[Tuple[int, str]]]:
+    """
+    Renumber appended rows after the last stored set of their session
+
+    Returns:
+        (renumbered rows, keys of the sessions that already had sets)
+    """
+    offsets = {}
+    for day, exercise in keys:
+        row = conn.execute(
+            "SELECT MAX(set_number) FROM workout_sets WHERE user_id = ? AND day = ? AND exercise = ?",
+            (user_id, day, exercise)
+        ).fetchone()
+        offsets[day, exercise] = row[0] or 0
+    rows = [(day, exercise, offsets[day, exercise] + number, *rest) for day, exercise, number, *rest in rows]
+    return rows, {key for key, offset in offsets.items() if offset}
+
+
+def rebuild_indexes(user_id: str, exercises: Iterable[str]) -> None:
+    """Recompute records and progression state from stored history, one exercise at a time"""
+    for exercise in exercises:
+        rows = stored_rows(user_id, [exercise])
+        rebuild_records(user_id, [exercise], rows)
+        rebuild_progression(user_id, [exercise], rows)
+
+
+def stored_rows(user_id: str, exercises: Iterable[str]) -> List[SetRow]:
+    """All logged sets of some exercises as set rows"""
+    exercises = list(exercises)
+    rows = get_connection(_SCHEMA).execute(
+        "SELECT day, exercise, set_number, weight_kg, reps, rpe FROM workout_sets "
+        f"WHERE user_id = ? AND exercise IN ({', '.join('?' for _ in exercises)})",
+        [user_id, *exercises]
+    ).fetchall()
+    return [tuple(row) for row in rows]
+
+
+def load_sets(user_id: str, exercises: Optional[Iterable[str]] = None,
+              since: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    A user's set history as columns
+
+    Returns:
+        Column name -> array (day, exercise, exercise_id, weight_kg, reps, rpe
+        with NaN where not logged), ordered by day
+    """
+    query = "SELECT day, exercise, weight_kg, reps, rpe FROM workout_sets WHERE user_id = ?"
+    params: List = [user_id]
+    if exercises:
+        names = [normalize_exercise(e) for e in exercises]
+        query += f" AND exercise IN ({', '.join('?' for _ in names)})"
+        params += names
+    if since:
+        query += " AND day >= ?"
+        params.append(date.fromisoformat(since).toordinal())
+    query += " ORDER BY day"
+
+    rows = get_connection(_SCHEMA).execute(query, params).fetchall()
+    count = len(rows)
+    exercise = np.array([r[1] for r in rows], dtype=object)
+    return {
+        "day": np.fromiter((r[0] for r in rows), dtype=np.int64, count=count),
+        "exercise": exercise,
+        "exercise_id": exercise_ids(exercise) if count else np.zeros(0, dtype=np.int64),
+        "weight_kg": np.fromiter((r[2] for r in rows), dtype=np.float64, count=count),
+        "reps": np.fromiter((r[3] for r in rows), dtype=np.int64, count=count),
+        "rpe": np.fromiter((np.nan if r[4] is None else r[4] for r in rows), dtype=np.float64, count=count)
+    }
+
@@ -0,0 +1,189 @@
+"""
+Workout Planner for FitCoach AI
+Deterministic program builder over the local exercise catalog
+
+A plan is a split (chosen by days per week and experience), a pattern
+template per session, one catalog exercise per pattern slot (filtered by
+equipment and level in one vectorized pass), and sets/reps/RPE/rest from
+the goal table. Repeated session types (Upper A / Upper B) rotate to the
+next-best exercise for each slot.
+"""
+from typing import Dict, List
+
+import numpy as np
+
+from tools.exercise_catalog import (
+    BODYWEIGHT_ONLY, EXERCISES, EXPERIENCE_LEVELS, IS_COMPOUND, MUSCLE_MATRIX, MUSCLES, PATTERN_INDEX, available_mask
+)
+
+
+# Session types by days per week; "beginner" overrides where simpler splits suit novices
+SPLITS = {
+    1: {"default": ["full_body"]},
+    2: {"default": ["full_body", "full_body"]},
+    3: {"default": ["push", "pull", "legs"], "beginner": ["full_body", "full_body", "full_body"]},
+    4: {"default": ["upper", "lower", "upper", "lower"]},
+    5: {"default": ["upper", "lower", "push", "pull", "legs"],
+        "beginner": ["upper", "lower", "full_body", "upper", "lower"]},
+    6: {"default": ["push", "pull", "legs", "push", "pull", "legs"],
+        "beginner": ["upper", "lower", "full_body", "upper", "lower", "full_body"]},
+    7: {"default": ["push", "pull", "legs", "push", "pull", "legs", "recovery"],
+        "beginner": ["upper", "lower", "full_body", "upper", "lower", "full_body", "recovery"]}
+}
+
+# Movement patterns per session type, most important first (cut to the session's slot count)
+SESSION_TEMPLATES = {
+    "full_body": ["squat", "horizontal_push", "horizontal_pull", "hinge", "vertical_push", "vertical_pull", "core"],
+    "upper": ["horizontal_push", "horizontal_pull", "vertical_push", "vertical_pull",
+              "shoulder_isolation", "biceps", "triceps"],
+    "lower": ["squat", "hinge", "lunge", "hamstring_isolation", "quad_isolation", "calves", "core"],
+    "push": ["horizontal_push", "vertical_push", "horizontal_push", "chest_isolation",
+             "shoulder_isolation", "triceps", "triceps"],
+    "pull": ["vertical_pull", "horizontal_pull", "horizontal_pull", "rear_delt", "biceps", "biceps", "core"],
+    "legs": ["squat", "hinge", "lunge", "quad_isolation", "hamstring_isolation", "calves", "core"],
+    "recovery": []
+}
+
+SESSION_LABELS = {
+    "full_body": "Full Body", "upper": "Upper", "lower": "Lower",
+    "push": "Push", "pull": "Pull", "legs": "Legs", "recovery": "Active Recovery"
+}
+
+# Goal -> mechanic -> (sets, reps, RPE, rest seconds)
+PRESCRIPTIONS = {
+    "strength": {"compound": (4, "3-5", 8.0, 180), "isolation": (3, "8-10", 8.0, 90)},
+    "hypertrophy": {"compound": (3, "6-10", 8.0, 120), "isolation": (3, "10-15", 9.0, 60)},
+    "endurance": {"compound": (3, "12-15", 7.0, 60), "isolation": (2, "15-20", 8.0, 45)},
+    "weight_loss": {"compound": (3, "8-12", 7.0, 75), "isolation": (2, "12-15", 8.0, 45)},
+    "general_fitness": {"compound": (3, "8-10", 7.0, 90), "isolation": (2, "10-12", 8.0, 60)}
+}
+
+# Experience -> set change, exercises per session, RPE change
+EXPERIENCE_ADJUSTMENTS = {
+    "beginner": {"set_delta": -1, "slots": 5, "rpe_delta": -1.0},
+    "intermediate": {"set_delta": 0, "slots": 6, "rpe_delta": 0.0},
+    "advanced": {"set_delta": 1, "slots": 7, "rpe_delta": 0.5}
+}
+
+# Conditioning added after sessions for these goals: (type, minutes, description)
+CONDITIONING = {
+    "weight_loss": ("intervals", 15, "Bike or rower: 30 s hard / 60 s easy"),
+    "endurance": ("steady_state", 25, "Zone 2 cardio at a conversational pace"),
+}
+
+RECOVERY_SESSION = {
+    "type": "mobility", "minutes": 30,
+    "description": "Easy walk or cycling (zone 1-2) plus 10 minutes of hip, thoracic and shoulder mobility"
+}
+
+MIN_SETS = 2
+
+
+def select_split(days_per_week: int, experience: str) -> List[str]:
+    """Session types for the week"""
+    options = SPLITS[min(max(days_per_week, 1), 7)]
+    return list(options.get(experience, options["default"]))
+
+
+def _session_exercises(session: str, variant: int, allowed: np.ndarray, slots: int) -> List[int]:
+    """
+    Pick one exercise per pattern slot of a session
+
+    variant rotates each slot to the next allowed exercise so repeated
+    sessions (A/B) differ; a pattern appearing twice in one session takes
+    two different exercises. Bodyweight-only variations are used only when
+    no loaded one is available; patterns with no allowed exercise are skipped.
+    """
+    chosen: List[int] = []
+    for pattern in SESSION_TEMPLATES[session]:
+        if len(chosen) == slots:
+            break
+        ids = PATTERN_INDEX.get(pattern)
+        if ids is None:
+            continue
+        candidates = ids[allowed[ids]]
+        candidates = candidates[~np.isin(candidates, chosen)]
+        loaded = candidates[~BODYWEIGHT_ONLY[candidates]]
+        if len(loaded):
+            candidates = loaded
+        if len(candidates):
+            chosen.append(int(candidates[variant % len(candidates)]))
+    return chosen
+
+
+def _prescription(exercise_id: int, goal: str, experience: str, first_slot: bool) -> Dict:
+    """Sets, reps, intensity and rest for one exercise"""
+    table = PRESCRIPTIONS[goal]["compound" if IS_COMPOUND[exercise_id] else "isolation"]
+    sets, reps, rpe, rest = table
+    adjust = EXPERIENCE_ADJUSTMENTS[experience]
+    sets = max(sets + adjust["set_delta"], MIN_SETS)
+    # The session's main lift gets one extra set for strength work
+    if first_slot and goal == "strength":
+        sets += 1
+    return {
+        "sets": sets,
+        "reps": reps,
+        "rpe": min(rpe + adjust["rpe_delta"], 10.0),
+        "rest_seconds": rest
+    }
+
+
+def build_plan(goal: str, experience: str, days_per_week: int, available_equipment: int) -> Dict:
+    """
+    Build a full weekly program
+
+    Args:
+        goal: Key of PRESCRIPTIONS
+        experience: Key of EXPERIENCE_ADJUSTMENTS
+        days_per_week: 1-7
+        available_equipment: Bit mask from exercise_catalog.equipment_mask
+
+    Returns:
+        Dictionary with split name, weekly_plan sessions and weekly sets per muscle
+    """
+    allowed = available_mask(available_equipment, EXPERIENCE_LEVELS[experience])
+    slots = EXPERIENCE_ADJUSTMENTS[experience]["slots"]
+    sessions = select_split(days_per_week, experience)
+    repeats = {s: sessions.count(s) for s in sessions}
+
+    weekly_sets = np.zeros(len(EXERCISES))
+    weekly_plan = []
+    seen: Dict[str, int] = {}
+    for day, session in enumerate(sessions, start=1):
+        variant = seen.get(session, 0)
+        seen[session] = variant + 1
+        name = SESSION_LABELS[session]
+        if repeats[session] > 1 and session != "recovery":
+            name += f" {'ABC'[variant]}"
+
+        if session == "recovery":
+            weekly_plan.append({"day": day, "name": name, "exercises": [], "conditioning": RECOVERY_SESSION})
+            continue
+
+        exercises = []
+        for slot, exercise_id in enumerate(_session_exercises(session, variant, allowed, slots)):
+            exercise = EXERCISES[exercise_id]
+            prescription = _prescription(exercise_id, goal, experience, slot == 0)
+            weekly_sets[exercise_id] += prescription["sets"]
+            exercises.append({
+                "exercise_id": exercise_id,
+                "name": exercise["name"],
+                "pattern": exercise["pattern"],
+                "muscles": exercise["primary_muscles"],
+                **prescription
+            })
+
+        entry = {"day": day, "name": name, "exercises": exercises}
+        if goal in CONDITIONING:
+            kind, minutes, description = CONDITIONING[goal]
+            entry["conditioning"] = {"type": kind, "minutes": minutes, "description": description}
+        weekly_plan.append(entry)
+
+    # Weekly hard sets per muscle in one matrix product (secondary muscles count half)
+    per_muscle = weekly_sets @ MUSCLE_MATRIX
+    return {
+        "split": " / ".join(dict.fromkeys(SESSION_LABELS[s] for s in sessions)),
+        "weekly_plan": weekly_plan,
+        "weekly_sets_per_muscle": {m: round(float(v), 1) for m, v in zip(MUSCLES, per_muscle) if v > 0},
+        "missing_muscles": [m for m, v in zip(MUSCLES, per_muscle) if v == 0]
+    }
@@ -2,8 +2,18 @@
 Workout Tools for FitCoach AI
 Handles workout planning, progress tracking, and Hevy integration
 """
+import time
+from datetime import date
 from typing import Dict, List, Optional
 
+from tools.data_integration_tools import import_hevy_workout
+from tools.exercise_catalog import EQUIPMENT_BITS, equipment_mask
+from tools.personal_records import get_records
+from tools.progression import get_preferences, get_progression, recommend, set_preferences
+from tools.workout_analytics import MAX_EXERCISES, progress_report, recommendations
+from tools.workout_log import history_rows, load_sets, normalize_exercise, record_sets
+from tools.workout_planner import EXPERIENCE_ADJUSTMENTS, PRESCRIPTIONS, build_plan
+
 
 def generate_workout_plan(
     goal: str,
@@ -23,82 +33,240 @@ def generate_workout_plan(
     Returns:
         Dictionary with weekly workout plan
     """
-    # TODO: Implement workout plan generation
-    # - Create splits based on days per week
-    # - Select exercises based on goal and equipment
-    # - Set appropriate volume and intensity
+    print(f"\n🏋️ [TOOL] generate_workout_plan(goal={goal}, experience={experience}, "
+          f"days={days_per_week}, equipment={equipment or 'full gym'})")
+    
+    goal = (goal or "general_fitness").lower()
+    experience = (experience or "beginner").lower()
+    if goal not in PRESCRIPTIONS:
+        return {"success": False, "error": f"Unknown goal '{goal}'. Use one of: {', '.join(PRESCRIPTIONS)}"}
+    if experience not in EXPERIENCE_ADJUSTMENTS:
+        return {"success": False, "error": f"Unknown experience '{experience}'. Use beginner, intermediate or advanced"}
+    if not 1 <= int(days_per_week) <= 7:
+        return {"success": False, "error": "days_per_week must be between 1 and 7"}
+    
+    started = time.perf_counter()
+    available = equipment_mask(equipment)
+    plan = build_plan(goal, experience, int(days_per_week), available)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    exercise_count = sum(len(day["exercises"]) for day in plan["weekly_plan"])
+    print(f"✅ [RESULT] {plan['split']}: {len(plan['weekly_plan'])} days, "
+          f"{exercise_count} exercise slots in {elapsed_ms:.1f} ms")
     
     return {
+        "success": True,
         "goal": goal,
         "experience": experience,
-        "days_per_week": days_per_week,
-        "weekly_plan": []
+        "days_per_week": int(days_per_week),
+        "split": plan["split"],
+        "equipment": [name for name, bit in EQUIPMENT_BITS.items() if available & bit],
+        "weekly_plan": plan["weekly_plan"],
+        "weekly_sets_per_muscle": plan["weekly_sets_per_muscle"],
+        "muscles_not_trained": plan["missing_muscles"],
+        "progression": "Add reps within the range; once every set reaches the top at the target RPE, "
+                       "add 2.5 kg (upper body) or 5 kg (lower body) and restart at the bottom of the range"
     }
 
 
-def import_hevy_data(hevy_export_file: str) -> Dict:
+def import_hevy_data(hevy_export_file: str, user_id: str = "default") -> Dict:
     """
     Import workout data from Hevy CSV export
     
     Args:
         hevy_export_file: Path to Hevy CSV export file
+        user_id: Owner of the workout history
+    
+    Returns:
+        Dictionary with import counts, exercises and date range (see
+        data_integration_tools.import_hevy_workout)
+    """
+    return import_hevy_workout(hevy_export_file, user_id)
+
+
+def analyze_workout_progress(
+    workout_history: Optional[List[Dict]] = None,
+    exercises: Optional[List[str]] = None,
+    weeks: int = 12,
+    replace_logged: bool = False,
+    user_id: str = "default"
+) -> Dict:
+    """
+    Analyze workout progress over the user's stored training history
+    
+    Args:
+        workout_history: Optional sessions to log first (e.g. a workout the
+            user just described); the analysis always runs on stored history
+        exercises: Limit the analysis to these exercises
+        weeks: Reporting window in weeks
+        replace_logged: The sessions correct ones already logged for the same
+            day and exercise (replace them instead of adding the sets)
+        user_id: Owner of the workout history
     
     Returns:
-        Dictionary with imported workout history
+        Dictionary with estimated 1RM progress and stall flags per exercise,
+        weekly volume and tonnage with their trend, and recommendations
     """
-    # TODO: Implement Hevy data import
-    # - Parse CSV file
-    # - Extract workout history
-    # - Organize by exercise and date
+    print(f"\n📈 [TOOL] analyze_workout_progress(logged={len(workout_history or [])}, "
+          f"exercises={exercises or 'all'}, weeks={weeks})")
+    
+    weeks = min(max(int(weeks or 12), 2), 104)
+    try:
+        logged = record_sets(user_id, history_rows(workout_history or []), append=not replace_logged)
+    except (TypeError, ValueError) as e:
+        return {"success": False, "error": f"Could not read workout_history: {e}"}
+    
+    started = time.perf_counter()
+    history = load_sets(user_id, exercises)
+    report = progress_report(history, weeks=weeks, max_exercises=None if exercises else MAX_EXERCISES)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    stalled = [e["exercise"] for e in report["exercises"] if e["stalled"]]
+    print(f"✅ [RESULT] {report['total_sets']} sets, {report['total_workouts']} workouts analysed "
+          f"in {elapsed_ms:.0f} ms; stalled: {stalled or 'none'}")
     
     return {
-        "workouts": [],
-        "exercises": [],
-        "total_sessions": 0
+        "success": True,
+        "sets_logged": logged,
+        **report,
+        "stalled_exercises": stalled,
+        "recommendations": recommendations(report)
     }
 
 
-def analyze_workout_progress(workout_history: List[Dict]) -> Dict:
+def get_personal_records(exercises: Optional[List[str]] = None, user_id: str = "default") -> Dict:
     """
-    Analyze workout progress over time
+    Look up personal records from the maintained record index
     
     Args:
-        workout_history: List of workout sessions
+        exercises: Exercises to look up (all recorded exercises by default)
+        user_id: Owner of the workout history
     
     Returns:
-        Dictionary with progress analysis
+        Dictionary with heaviest set, best estimated 1RM, best session volume,
+        bodyweight rep best and rep records per exercise
     """
-    # TODO: Implement progress analysis
-    # - Track volume progression
-    # - Identify strength gains
-    # - Find patterns and trends
-    # - Suggest areas for improvement
+    print(f"\n🏆 [TOOL] get_personal_records(exercises={exercises or 'all'})")
+    
+    names = [normalize_exercise(e) for e in exercises] if exercises else None
+    records = get_records(user_id, names)
+    
+    result = {}
+    for exercise, rec in records.items():
+        entry = {}
+        if rec["best_weight_kg"] > 0:
+            entry["heaviest_set"] = {"weight_kg": rec["best_weight_kg"], "reps": rec["best_weight_reps"],
+                                     "date": _iso_day(rec["best_weight_day"])}
+        if rec["best_e1rm_kg"] > 0:
+            entry["best_estimated_1rm"] = {"e1rm_kg": rec["best_e1rm_kg"], "weight_kg": rec["best_e1rm_weight_kg"],
+                                           "reps": rec["best_e1rm_reps"], "date": _iso_day(rec["best_e1rm_day"])}
+        if rec["best_session_volume_kg"] > 0:
+            entry["best_session_volume"] = {"tonnage_kg": rec["best_session_volume_kg"],
+                                            "date": _iso_day(rec["best_session_day"])}
+        if rec["best_bodyweight_reps"] > 0:
+            entry["best_bodyweight_reps"] = {"reps": rec["best_bodyweight_reps"],
+                                             "date": _iso_day(rec["best_bodyweight_reps_day"])}
+        entry["rep_records"] = [{"weight_kg": w, "reps": r, "date": _iso_day(d)} for w, r, d in rec["rep_records"]]
+        result[exercise] = entry
+    
+    missing = [n for n in names or [] if n not in result]
+    print(f"✅ [RESULT] Records for {len(result)} exercises" + (f", none logged for {missing}" if missing else ""))
     
     return {
-        "total_workouts": 0,
-        "volume_trend": "increasing",
-        "strength_gains": {},
-        "recommendations": []
+        "success": True,
+        "records": result,
+        "no_records": missing
     }
 
 
-def suggest_progressive_overload(current_exercises: List[Dict]) -> List[Dict]:
+def _iso_day(ordinal: int) -> str:
+    return date.fromordinal(int(ordinal)).isoformat()
+
+
+def suggest_progressive_overload(
+    current_exercises: Optional[List] = None,
+    replace_logged: bool = False,
+    user_id: str = "default"
+) -> Dict:
     """
-    Suggest progressive overload strategies
+    Suggest the next session's load, sets and reps per exercise
     
     Args:
-        current_exercises: List of current exercises with sets/reps/weight
+        current_exercises: Exercise names, or objects with name and optional
+            rep_range ("8-12"), target_rpe and today's performed sets (logged
+            before suggesting). Default: every exercise with history
+        replace_logged: The performed sets correct ones already logged for
+            the same day and exercise (replace them instead of adding the sets)
+        user_id: Owner of the workout history
     
     Returns:
-        List of suggestions for progression
+        Dictionary with one suggestion per exercise (action, next weight,
+        sets, reps, target RPE, reason, last session and records)
     """
-    # TODO: Implement progressive overload suggestions
-    # - Analyze current performance
-    # - Suggest weight increases
-    # - Recommend volume adjustments
-    # - Provide deload recommendations
+    print(f"\n📈 [TOOL] suggest_progressive_overload(exercises={len(current_exercises or [])})")
+    
+    names, performed = [], []
+    try:
+        for entry in current_exercises or []:
+            if isinstance(entry, str):
+                entry = {"name": entry}
+            name = normalize_exercise(entry.get("name") or entry.get("exercise") or "")
+            if not name:
+                continue
+            names.append(name)
+            if entry.get("rep_range") or entry.get("target_rpe"):
+                prefs = get_preferences(user_id, [name])[name]
+                rep_range = entry.get("rep_range")
+                if rep_range:
+                    low, high = (rep_range if isinstance(rep_range, list) else str(rep_range).split("-"))[:2]
+                    prefs.update(rep_low=int(low), rep_high=int(high))
+                set_preferences(user_id, name, prefs["rep_low"], prefs["rep_high"],
+                                float(entry.get("target_rpe") or prefs["target_rpe"]))
+            if entry.get("sets") and (entry.get("reps") or isinstance(entry["sets"], list)):
+                performed.append(entry)
+        logged = record_sets(user_id, history_rows(performed), append=not replace_logged)
+    except (TypeError, ValueError) as e:
+        return {"success": False, "error": f"Could not read current_exercises: {e}"}
+    
+    states = get_progression(user_id, names or None)
+    prefs = get_preferences(user_id, states)
+    records = get_records(user_id, list(states))
+    today = date.today().toordinal()
     
-    return []
+    suggestions = []
+    for exercise, state in sorted(states.items(), key=lambda item: -item[1]["last_day"]):
+        suggestion = {
+            "exercise": exercise,
+            **recommend(state, prefs[exercise], today),
+            "rep_range": f"{prefs[exercise]['rep_low']}-{prefs[exercise]['rep_high']}",
+            "last_session": {
+                "date": _iso_day(state["last_day"]),
+                "weight_kg": state["weight_kg"],
+                "sets": state["sets"],
+                "reps": state["reps"],
+                "rpe": state["rpe"]
+            },
+            "sessions_without_progress": state["stalled_sessions"]
+        }
+        record = records.get(exercise)
+        if record and record["best_e1rm_kg"] > 0:
+            suggestion["best_estimated_1rm_kg"] = record["best_e1rm_kg"]
+            rep_record = [r for w, r, _ in record["rep_records"] if w >= (suggestion["weight_kg"] or 0)]
+            if rep_record:
+                suggestion["rep_record_at_weight"] = rep_record[-1]
+        suggestions.append(suggestion)
+    
+    missing = [n for n in names if n not in states]
+    for s in suggestions:
+        print(f"  • {s['exercise']}: {s['action']} -> {s['weight_kg']} kg x {s['reps']} x {s['sets']}")
+    print(f"✅ [RESULT] {len(suggestions)} suggestions" + (f", no history for {missing}" if missing else ""))
+    
+    return {
+        "success": True,
+        "sets_logged": logged,
+        "suggestions": suggestions,
+        "no_history": missing
+    }
 
 
 # Tool definitions for OpenAI function calling
@@ -107,7 +275,7 @@ WORKOUT_TOOLS = [
         "type": "function",
         "function": {
             "name": "generate_workout_plan",
-            "description": "Generate a personalized workout plan based on goals, experience level, and available equipment",
+            "description": "Generate a complete weekly workout plan (split, exercises, sets, reps, RPE, rest, weekly sets per muscle) from goal, experience level and available equipment. Present the returned plan; do not invent one.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -141,17 +309,82 @@ WORKOUT_TOOLS = [
         "type": "function",
         "function": {
             "name": "analyze_workout_progress",
-            "description": "Analyze workout progress and provide insights on strength gains and volume trends",
+            "description": "Analyze the user's stored training history: estimated 1RM progress and stalls per exercise, weekly sets/tonnage and their trend, weekly sets per muscle, recommendations. Pass workout_history only to log sessions the user describes in chat.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "workout_history": {
                         "type": "array",
                         "items": {"type": "object"},
-                        "description": "List of workout sessions with exercises, sets, reps, and weights"
+                        "description": "Optional new sessions to log first: [{date: YYYY-MM-DD, exercises: [{name, sets: [{weight_kg, reps, rpe}]}]}]"
+                    },
+                    "exercises": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Only analyze these exercises (default: the most trained ones)"
+                    },
+                    "weeks": {
+                        "type": "integer",
+                        "minimum": 2,
+                        "maximum": 104,
+                        "description": "Reporting window in weeks (default 12)"
+                    },
+                    "replace_logged": {
+                        "type": "boolean",
+                        "description": "True only when the user corrects sets already logged for that day and exercise; otherwise the sets are added"
+                    }
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_personal_records",
+            "description": "Look up the user's personal records (heaviest set, best estimated 1RM, best session volume, rep records per weight) for logged exercises. Use for questions like 'what's my best bench?'.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "exercises": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Exercise names (default: all exercises with records)"
+                    }
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "suggest_progressive_overload",
+            "description": "Next-session weight, sets, reps and target RPE per exercise from the user's stored progression (double progression, RPE adjustments, deloads after stalls, easing back after breaks). Use the returned numbers as given. Include today's performed sets to log them first.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "current_exercises": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string"},
+                                "rep_range": {"type": "string", "description": "Preferred rep range, e.g. '8-12' (saved)"},
+                                "target_rpe": {"type": "number", "description": "Preferred target RPE (saved)"},
+                                "sets": {"type": "array", "items": {"type": "object"}, "description": "Sets just performed: [{weight_kg, reps, rpe}]"},
+                                "date": {"type": "string", "description": "Date of the performed sets (YYYY-MM-DD), default today"}
+                            },
+                            "required": ["name"]
+                        },
+                        "description": "Exercises to suggest for (default: all exercises with history)"
+                    },
+                    "replace_logged": {
+                        "type": "boolean",
+                        "description": "True only when the user corrects sets already logged for that day and exercise; otherwise the performed sets are added"
                     }
                 },
-                "required": ["workout_history"]
+                "required": []
             }
         }
     }
@@ -11,6 +11,7 @@ from dotenv import load_dotenv
 # Add parent directory to path to import agent
 sys.path.append(str(Path(__file__).parent.parent))
 from agent.fitness_agent import FitnessAgent
+from utils.uploads import collect_garbage, release_user, store_file
 
 # Load environment variables
 load_dotenv()
@@ -41,25 +42,19 @@ def chat_with_agent(message, history, image_path=None):
     if agent is None:
         return history + [("Agent not initialized", "❌ Please check your OpenAI API key in .env file")]
     
-    # Build message with image reference if provided
-    if image_path:
-        # Save image to data folder
-        image_name = os.path.basename(image_path)
-        save_path = os.path.join("data", "uploads", image_name)
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        
-        # Copy image
-        import shutil
-        shutil.copy(image_path, save_path)
-        
-        # Add image reference to message
-        full_message = f"{message}\n\n[Image uploaded: {save_path}]"
-    else:
-        full_message = message
-    
     try:
-        # Get agent response
-        response = agent.chat(full_message)
+        # Build message with image reference if provided
+        if image_path:
+            # Link the image into the content-addressed upload store (no second copy)
+            save_path = store_file(image_path, user_id=agent.user_id)["path"]
+            
+            # Add image reference to message
+            full_message = f"{message}\n\n[Image uploaded: {save_path}]"
+        else:
+            full_message = message
+        
+        # Get agent response (the image is attached to the turn, the path stays in the text for tools)
+        response = agent.chat(full_message, image_paths=[save_path] if image_path else None)
         
         # Add to history
         history.append((message, response))
@@ -75,6 +70,7 @@ def reset_conversation():
     global agent
     if agent:
         agent.reset_conversation()
+        release_user(agent.user_id)
     return []
 
 def create_ui():
@@ -183,6 +179,7 @@ def create_ui():
 if __name__ == "__main__":
     # Create necessary directories
     os.makedirs("data/uploads", exist_ok=True)
+    collect_garbage()
     
     # Create and launch UI
     demo = create_ui()
@@ -0,0 +1 @@
+"""FitCoach AI Utilities Module"""
@@ -0,0 +1,57 @@
+"""
+SQLite storage for FitCoach AI user data
+One database file (DATABASE_PATH in .env), one connection per thread
+"""
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+DEFAULT_DATABASE_PATH = "data/users/fitness_db.sqlite"
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_initialized_schemas = set()
+
+
+def get_database_path() -> str:
+    """Database file from the DATABASE_PATH environment variable"""
+    return os.getenv("DATABASE_PATH", DEFAULT_DATABASE_PATH)
+
+
+def get_connection(schema: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Get this thread's connection to the user database
+
+    Args:
+        schema: Optional CREATE ... IF NOT EXISTS script of the calling store,
+            executed once per connection
+
+    Returns:
+        sqlite3 connection with Row factory, WAL journal and autocommit off
+    """
+    path = get_database_path()
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        connections[path] = conn
+
+    if schema:
+        key = (id(conn), schema)
+        if key not in _initialized_schemas:
+            with _schema_lock:
+                conn.executescript(schema)
+                _initialized_schemas.add(key)
+
+    return conn
@@ -0,0 +1,210 @@
+"""
+Local image preparation for FitCoach AI vision tools
+Downscaled thumbnails and aligned before/after composites, cached on disk
+
+Vision models resize large photos before looking at them, so sending a
+12 MP original only costs upload time. A thumbnail at the model's working
+resolution carries the same detail. For transformations both photos are
+cropped to the person, scaled to the same body height and placed side by
+side in one image that fits two 512 px tiles (about 425 image tokens
+instead of about 1530 for two full-resolution photos).
+"""
+import hashlib
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageOps
+
+from utils.uploads import THUMB_DIR
+
+
+# Longest side of single-photo thumbnails (the model works at 768 x 1024 and below)
+THUMBNAIL_MAX_SIDE = 1024
+
+# Composite bounds: one row of 512 px tiles, at most two across
+COMPOSITE_HEIGHT = 512
+COMPOSITE_MAX_WIDTH = 1024
+COMPOSITE_LABEL_HEIGHT = 24
+
+# Subject detection runs on a small grayscale copy
+_DETECT_SIDE = 256
+# Share of edge pixels trimmed on each side when taking the subject box
+_EDGE_TRIM = 0.02
+# Margin around the detected subject, as a share of its size
+_SUBJECT_MARGIN = 0.06
+# A box shorter than this share of the frame is treated as a failed detection; a
+# standing person is tall but often narrow, so width only has to clear a small floor
+_MIN_SUBJECT_HEIGHT_SHARE = 0.25
+_MIN_SUBJECT_WIDTH_SHARE = 0.05
+
+JPEG_QUALITY = 85
+
+
+def _file_digest(image_path: str) -> str:
+    """SHA-256 of the file contents"""
+    hasher = hashlib.sha256()
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+@lru_cache(maxsize=512)
+def _cached_digest(image_path: str, mtime_ns: int, size: int) -> str:
+    """Digest memoized per file version, so repeated calls skip reading the file"""
+    return _file_digest(image_path)
+
+
+def content_digest(image_path: str) -> str:
+    """Content hash of an image file (cache key for everything derived from it)"""
+    stat = os.stat(image_path)
+    return _cached_digest(os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+
+
+def load_image(image_path: str) -> Image.Image:
+    """Open a photo upright (EXIF orientation applied) in RGB"""
+    with Image.open(image_path) as image:
+        return ImageOps.exif_transpose(image).convert("RGB")
+
+
+def _cached_output(name: str) -> Tuple[Path, bool]:
+    """Cache path for a derived image and whether it already exists (hits are touched)"""
+    path = THUMB_DIR / name
+    if path.exists():
+        os.utime(path)
+        return path, True
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path, False
+
+
+def _save_jpeg(image: Image.Image, path: Path) -> None:
+    """Write atomically so a concurrent reader never sees a partial file (or a concurrent writer's)"""
+    staged = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    image.save(staged, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    os.replace(staged, path)
+
+
+def cached_thumbnail(image_path: str, max_side: int = THUMBNAIL_MAX_SIDE) -> str:
+    """
+    JPEG copy of a photo with its longest side at most max_side
+
+    Returns:
+        Path of the cached thumbnail
+    """
+    path, hit = _cached_output(f"{content_digest(image_path)[:32]}_{max_side}.jpg")
+    if hit:
+        return str(path)
+
+    image = load_image(image_path)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    _save_jpeg(image, path)
+    return str(path)
+
+
+def subject_box(image: Image.Image) -> Tuple[int, int, int, int]:
+    """
+    Bounding box of the person in a photo
+
+    Uses the spread of strong edges on a small grayscale copy: backgrounds in
+    progress photos (walls, mirrors, doors) are smooth compared to a body
+    outline. Falls back to the whole frame when the box looks implausible.
+
+    Returns:
+        (left, top, right, bottom) in pixels of the given image
+    """
+    width, height = image.size
+    scale = _DETECT_SIDE / max(width, height)
+    small = np.asarray(image.convert("L").resize(
+        (max(int(width * scale), 1), max(int(height * scale), 1)), Image.BILINEAR
+    ), dtype=np.float32)
+
+    gx = np.abs(np.diff(small, axis=1))[:-1, :]
+    gy = np.abs(np.diff(small, axis=0))[:, :-1]
+    magnitude = gx + gy
+    threshold = magnitude.mean() + magnitude.std()
+    ys, xs = np.nonzero(magnitude > threshold)
+    if len(xs) < 50:
+        return 0, 0, width, height
+
+    x0, x1 = np.quantile(xs, [_EDGE_TRIM, 1 - _EDGE_TRIM])
+    y0, y1 = np.quantile(ys, [_EDGE_TRIM, 1 - _EDGE_TRIM])
+    margin_x = (x1 - x0) * _SUBJECT_MARGIN
+    margin_y = (y1 - y0) * _SUBJECT_MARGIN
+    left = max(int((x0 - margin_x) / scale), 0)
+    right = min(int((x1 + margin_x) / scale) + 1, width)
+    top = max(int((y0 - margin_y) / scale), 0)
+    bottom = min(int((y1 + margin_y) / scale) + 1, height)
+
+    if right - left < width * _MIN_SUBJECT_WIDTH_SHARE or bottom - top < height * _MIN_SUBJECT_HEIGHT_SHARE:
+        return 0, 0, width, height
+    return left, top, right, bottom
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Approximate gpt-4o image tokens at high detail (85 + 170 per 512 px tile)"""
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * int(np.ceil(width / 512)) * int(np.ceil(height / 512))
+
+
+def transformation_composite(before_path: str, after_path: str) -> Dict:
+    """
+    Side-by-side BEFORE | AFTER image of two progress photos
+
+    Each photo is cropped to the detected person and scaled so both bodies
+    have the same height, then the pair is labeled and fitted into
+    COMPOSITE_MAX_WIDTH x COMPOSITE_HEIGHT.
+
+    Returns:
+        Dictionary with composite path, size, estimated image tokens for the
+        composite and for the two originals, and whether it came from cache
+    """
+    key = f"{content_digest(before_path)[:16]}_{content_digest(after_path)[:16]}_pair.jpg"
+    path, hit = _cached_output(key)
+
+    originals = []
+    for photo in (before_path, after_path):
+        with Image.open(photo) as image:
+            originals.append(estimate_image_tokens(*image.size))
+
+    if not hit:
+        body_height = COMPOSITE_HEIGHT - COMPOSITE_LABEL_HEIGHT
+        panels = []
+        for photo in (before_path, after_path):
+            image = load_image(photo)
+            crop = image.crop(subject_box(image))
+            panel_width = max(int(crop.width * body_height / crop.height), 1)
+            panels.append(crop.resize((panel_width, body_height), Image.LANCZOS))
+
+        # Wide crops (arms out, landscape photos) shrink together to keep the bodies matched
+        total_width = sum(p.width for p in panels)
+        if total_width > COMPOSITE_MAX_WIDTH:
+            shrink = COMPOSITE_MAX_WIDTH / total_width
+            panels = [p.resize((max(int(p.width * shrink), 1), max(int(p.height * shrink), 1)), Image.LANCZOS)
+                      for p in panels]
+
+        composite = Image.new("RGB", (sum(p.width for p in panels), COMPOSITE_HEIGHT), "white")
+        draw = ImageDraw.Draw(composite)
+        x = 0
+        for label, panel in zip(("BEFORE", "AFTER"), panels):
+            composite.paste(panel, (x, COMPOSITE_LABEL_HEIGHT + (body_height - panel.height) // 2))
+            draw.text((x + 6, 6), label, fill="black")
+            x += panel.width
+        _save_jpeg(composite, path)
+
+    with Image.open(path) as image:
+        size = image.size
+    return {
+        "path": str(path),
+        "width": size[0],
+        "height": size[1],
+        "image_tokens": estimate_image_tokens(*size),
+        "original_image_tokens": sum(originals),
+        "from_cache": hit
+    }
@@ -0,0 +1,56 @@
+"""
+Speculative work for FitCoach AI
+Vision stages started before the model asks for them, joined if it does
+
+Only side-effect-free functions are submitted (vision calls, image encoding);
+logging and saving stay in the tool that the model actually calls.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+# Results older than this are not worth joining (the file may have changed)
+JOIN_TIMEOUT_SECONDS = 120
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+_pending: Dict[Hashable, Future] = {}
+_lock = threading.Lock()
+
+
+def submit(key: Hashable, fn: Callable, *args, **kwargs) -> None:
+    """Start fn(*args, **kwargs) in the background unless the same key is already running"""
+    with _lock:
+        if key in _pending:
+            return
+        _pending[key] = _executor.submit(fn, *args, **kwargs)
+    print(f"🔮 [PREFETCH] Started {key[0] if isinstance(key, tuple) else key}")
+
+
+def take(key: Hashable) -> Tuple[bool, Optional[Any]]:
+    """
+    Claim a speculative result, waiting for it if still running
+
+    Returns:
+        (True, result) on a hit; (False, None) when nothing was prefetched or it failed
+    """
+    with _lock:
+        future = _pending.pop(key, None)
+    if future is None:
+        return False, None
+    try:
+        result = future.result(timeout=JOIN_TIMEOUT_SECONDS)
+    except Exception as e:
+        print(f"⚠️ [PREFETCH] Speculative run failed, running normally: {str(e)}")
+        return False, None
+    print(f"🔮 [PREFETCH] Hit {key[0] if isinstance(key, tuple) else key}")
+    return True, result
+
+
+def discard(*keys: Hashable) -> None:
+    """Drop results nobody asked for (running work finishes and is garbage collected)"""
+    with _lock:
+        for key in keys:
+            future = _pending.pop(key, None)
+            if future is not None:
+                future.cancel()
@@ -0,0 +1,277 @@
+"""
+Upload store for FitCoach AI
+Content-addressed image storage shared by the API server and the Gradio UI
+
+Every upload is hashed (SHA-256) while it is streamed to a temporary file
+and then moved to blobs/<first two hex chars>/<hash><ext>. The same photo
+uploaded twice, by one user or by several, is stored once. A reference row
+per (user, blob) keeps a blob alive; blobs without a reference inside the
+retention window are deleted by collect_garbage().
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from utils.database import get_connection
+from utils.vision import sniff_image_type
+
+
+UPLOAD_DIR = Path("data/uploads")
+BLOB_DIR = UPLOAD_DIR / "blobs"
+TMP_DIR = UPLOAD_DIR / "tmp"
+# Derived images (thumbnails, composites), see utils/image_prep.py
+THUMB_DIR = UPLOAD_DIR / "thumbs"
+# Where api/server.py serves THUMB_DIR
+THUMB_URL_PREFIX = "/api/thumbs"
+
+# OpenAI vision accepts images up to 20 MB
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+# Days a blob is kept after its last reference
+UPLOAD_RETENTION_DAYS = 30
+
+# Untracked and temporary files younger than this may belong to an upload in flight
+STALE_FILE_SECONDS = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_blobs (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS upload_refs (
+    user_id TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    filename TEXT,
+    last_used_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, sha256)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_upload_refs_blob ON upload_refs (sha256, last_used_at);
+"""
+
+
+class UploadTooLarge(ValueError):
+    """Upload exceeds MAX_UPLOAD_BYTES"""
+
+
+class UnsupportedUpload(ValueError):
+    """Upload is not a recognized image format"""
+
+
+def thumb_url(path: str) -> str:
+    """URL under which the API serves a file in THUMB_DIR"""
+    return f"{THUMB_URL_PREFIX}/{Path(path).resolve().relative_to(THUMB_DIR.resolve()).as_posix()}"
+
+
+def _blob_path(digest: str, extension: str) -> Path:
+    """Location of a blob in the sharded store"""
+    return BLOB_DIR / digest[:2] / f"{digest}{extension}"
+
+
+def _new_tmp_path() -> Path:
+    """Unique temporary file inside the store (same filesystem, so moves are renames)"""
+    TMP_DIR.mkdir(parents=True, exist_ok=True)
+    return TMP_DIR / f"{uuid.uuid4().hex}.part"
+
+
+def _commit_blob(tmp_path: Optional[Path], source: Optional[Path], digest: str,
+                 extension: str, size: int, user_id: str, filename: Optional[str]) -> str:
+    """
+    Move a hashed file into the store (or drop it if the blob exists) and reference it
+
+    Exactly one of tmp_path (our own temporary copy) or source (a file to
+    link or copy in) is given.
+
+    Returns:
+        Blob path as a string
+    """
+    blob_path = _blob_path(digest, extension)
+    if blob_path.exists():
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+        print(f"♻️ [UPLOADS] Duplicate of {blob_path.name}, stored once")
+    else:
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        if tmp_path is not None:
+            os.replace(tmp_path, blob_path)
+        else:
+            try:
+                os.link(source, blob_path)
+            except OSError:
+                staged = _new_tmp_path()
+                shutil.copyfile(source, staged)
+                os.replace(staged, blob_path)
+
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO upload_blobs (sha256, path, size, created_at) VALUES (?, ?, ?, datetime('now'))",
+            (digest, str(blob_path), size)
+        )
+        conn.execute(
+            """
+            INSERT INTO upload_refs (user_id, sha256, filename, last_used_at)
+            VALUES (?, ?, ?, datetime('now'))
+            ON CONFLICT (user_id, sha256) DO UPDATE SET
+                filename = COALESCE(excluded.filename, filename),
+                last_used_at = excluded.last_used_at
+            """,
+            (user_id, digest, filename)
+        )
+    return str(blob_path)
+
+
+async def store_upload(upload, user_id: str = "default") -> Dict:
+    """
+    Stream an uploaded file into the store without blocking the event loop
+
+    Args:
+        upload: FastAPI/Starlette UploadFile (anything with async read(size) and filename)
+        user_id: Owner of the reference
+
+    Returns:
+        Dictionary with path, sha256, size and duplicate flag
+
+    Raises:
+        UploadTooLarge: If the stream exceeds MAX_UPLOAD_BYTES
+        UnsupportedUpload: If the content is not a JPEG, PNG, GIF or WebP image
+    """
+    declared = getattr(upload, "size", None)
+    if declared is not None and declared > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f"{upload.filename} is {declared} bytes (limit {MAX_UPLOAD_BYTES})")
+
+    hasher = hashlib.sha256()
+    size = 0
+    extension = None
+    tmp_path = await asyncio.to_thread(_new_tmp_path)
+    buffer = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        while True:
+            chunk = await upload.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if extension is None:
+                extension = sniff_image_type(chunk[:16])
+                if extension is None:
+                    raise UnsupportedUpload(f"{upload.filename} is not a supported image")
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise UploadTooLarge(f"{upload.filename} exceeds {MAX_UPLOAD_BYTES} bytes")
+            hasher.update(chunk)
+            await asyncio.to_thread(buffer.write, chunk)
+        if extension is None:
+            raise UnsupportedUpload(f"{upload.filename} is empty")
+    except BaseException:
+        await asyncio.to_thread(buffer.close)
+        tmp_path.unlink(missing_ok=True)
+        raise
+    await asyncio.to_thread(buffer.close)
+
+    digest = hasher.hexdigest()
+    duplicate = _blob_path(digest, extension).exists()
+    path = await asyncio.to_thread(_commit_blob, tmp_path, None, digest, extension,
+                                   size, user_id, upload.filename)
+    return {"path": path, "sha256": digest, "size": size, "duplicate": duplicate}
+
+
+def store_file(source_path: str, user_id: str = "default") -> Dict:
+    """
+    Put an existing file (e.g. a Gradio temp upload) into the store
+
+    The file is hashed in one streaming pass, then hard-linked into the store
+    when possible so the bytes exist once; copied only across filesystems.
+
+    Returns:
+        Dictionary with path, sha256, size and duplicate flag
+
+    Raises:
+        UploadTooLarge, UnsupportedUpload: As for store_upload
+    """
+    source = Path(source_path)
+    size = source.stat().st_size
+    if size > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f"{source.name} is {size} bytes (limit {MAX_UPLOAD_BYTES})")
+
+    hasher = hashlib.sha256()
+    with source.open("rb") as f:
+        extension = sniff_image_type(f.read(16))
+        if extension is None:
+            raise UnsupportedUpload(f"{source.name} is not a supported image")
+        f.seek(0)
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+
+    digest = hasher.hexdigest()
+    duplicate = _blob_path(digest, extension).exists()
+    path = _commit_blob(None, source, digest, extension, size, user_id, source.name)
+    return {"path": path, "sha256": digest, "size": size, "duplicate": duplicate}
+
+
+def release_user(user_id: str) -> int:
+    """Drop all of a user's upload references; blobs go at the next collection"""
+    conn = get_connection(_SCHEMA)
+    with conn:
+        cursor = conn.execute("DELETE FROM upload_refs WHERE user_id = ?", (user_id,))
+    return cursor.rowcount
+
+
+def collect_garbage(retention_days: int = UPLOAD_RETENTION_DAYS) -> Tuple[int, int]:
+    """
+    Delete expired references, unreferenced blobs, untracked files, stale temp files and old thumbnails
+
+    Returns:
+        (blobs deleted, bytes freed)
+    """
+    conn = get_connection(_SCHEMA)
+    with conn:
+        conn.execute(
+            "DELETE FROM upload_refs WHERE last_used_at < datetime('now', ?)",
+            (f"-{int(retention_days)} days",)
+        )
+        orphans = conn.execute(
+            """
+            SELECT sha256, path, size FROM upload_blobs b
+            WHERE NOT EXISTS (SELECT 1 FROM upload_refs r WHERE r.sha256 = b.sha256)
+            """
+        ).fetchall()
+        conn.executemany("DELETE FROM upload_blobs WHERE sha256 = ?", [(r["sha256"],) for r in orphans])
+        tracked = {row["path"] for row in conn.execute("SELECT path FROM upload_blobs")}
+
+    deleted, freed = 0, 0
+    for row in orphans:
+        Path(row["path"]).unlink(missing_ok=True)
+        deleted += 1
+        freed += row["size"]
+
+    # Files the database does not know about (crash between move and insert)
+    cutoff = time.time() - STALE_FILE_SECONDS
+    if BLOB_DIR.exists():
+        for blob in BLOB_DIR.glob("*/*"):
+            stat = blob.stat()
+            if str(blob) not in tracked and stat.st_mtime < cutoff:
+                blob.unlink(missing_ok=True)
+                deleted += 1
+                freed += stat.st_size
+    if TMP_DIR.exists():
+        for part in TMP_DIR.glob("*.part"):
+            if part.stat().st_mtime < cutoff:
+                part.unlink(missing_ok=True)
+    # Derived images are cheap to rebuild; drop the ones unused for the retention window
+    if THUMB_DIR.exists():
+        thumb_cutoff = time.time() - retention_days * 86400
+        for thumb in THUMB_DIR.glob("*.jpg"):
+            if thumb.stat().st_mtime < thumb_cutoff:
+                thumb.unlink(missing_ok=True)
+
+    if deleted:
+        print(f"🧹 [UPLOADS] Removed {deleted} unreferenced blob(s), {freed / 1024 / 1024:.1f} MB freed")
+    return deleted, freed
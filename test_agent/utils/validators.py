@@ -0,0 +1,43 @@
+"""
+Input validation helpers for FitCoach AI
+"""
+from typing import Dict, List
+
+import numpy as np
+
+
+def as_column_arrays(data, columns: List[str], optional: List[str] = ()) -> Dict[str, np.ndarray]:
+    """
+    Coerce columnar batch input to equal-length numpy arrays
+
+    Args:
+        data: pandas DataFrame or mapping of column name -> array-like
+        columns: Required column names
+        optional: Column names to include when present
+
+    Returns:
+        Dictionary of column name -> 1-D numpy array
+
+    Raises:
+        ValueError: If a required column is missing or lengths differ
+    """
+    arrays = {}
+    for name in list(columns) + list(optional):
+        if name not in data:
+            if name in columns:
+                raise ValueError(f"Missing required column: {name}")
+            continue
+        arrays[name] = np.asarray(data[name]).ravel()
+
+    lengths = {len(a) for a in arrays.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    return arrays
+
+
+def to_result_frame(result: Dict[str, np.ndarray], data):
+    """Return a DataFrame aligned with the input when the input was a DataFrame"""
+    if hasattr(data, "columns") and hasattr(data, "index"):
+        import pandas as pd
+        return pd.DataFrame(result, index=data.index)
+    return result
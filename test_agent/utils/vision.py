@@ -0,0 +1,84 @@
+"""
+Image helpers for FitCoach AI vision tools
+Encoding photos for OpenAI Vision requests and parsing their JSON replies
+"""
+import base64
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+IMAGE_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp'
+}
+
+# File signatures -> extension
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif")
+]
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Image extension from the first 16 bytes of a file, None if not a supported image"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def encode_image(image_path: str) -> Tuple[str, str]:
+    """
+    Read an image as base64
+
+    Returns:
+        (base64 data, mime type)
+    """
+    with open(image_path, "rb") as image_file:
+        raw = image_file.read()
+    extension = sniff_image_type(raw[:16]) or Path(image_path).suffix.lower()
+    return base64.b64encode(raw).decode('utf-8'), IMAGE_MIME_TYPES.get(extension, 'image/jpeg')
+
+
+def image_content_part(image_path: str, detail: str = "auto") -> Dict:
+    """Chat message content part carrying the image as a data URL"""
+    image_data, mime_type = encode_image(image_path)
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:{mime_type};base64,{image_data}",
+            "detail": detail
+        }
+    }
+
+
+def extract_json(result_text: str) -> Dict:
+    """
+    Parse a JSON object from a model reply
+    Strips markdown code fences and text after the last closing brace.
+
+    Raises:
+        json.JSONDecodeError: If no valid JSON object remains
+    """
+    if "```json" in result_text:
+        json_start = result_text.find("```json") + 7
+        json_end = result_text.find("```", json_start)
+        result_text = result_text[json_start:json_end if json_end != -1 else len(result_text)]
+    elif "```" in result_text:
+        json_start = result_text.find("```") + 3
+        json_end = result_text.find("```", json_start)
+        result_text = result_text[json_start:json_end if json_end != -1 else len(result_text)]
+
+    result_text = result_text.strip()
+    last_brace = result_text.rfind('}')
+    if last_brace != -1:
+        result_text = result_text[:last_brace + 1]
+    return json.loads(result_text)